@@ -1,38 +1,151 @@
 import logging
 import pandas as pd
+import threading
 import zipfile
 import os
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
 
-from pilates.utils.io import read_datastore
+from pilates.utils.io import (
+    convert_to_table_format, copy_table, read_arrow_csv, read_datastore,
+    table_schema, write_zipped_csv)
 logger = logging.getLogger("activitysim.post")
 
 
-def _load_asim_outputs(settings):
-    output_tables_settings = settings['asim_output_tables']
-    prefix = output_tables_settings['prefix']
-    output_tables = output_tables_settings['tables']
-    asim_output_dict = {}
-    for table_name in output_tables:
-        file_name = "%s%s.csv" % (prefix, table_name)
-        file_path = os.path.join(
-            settings['asim_local_output_folder'], file_name)
+# parsed dtypes of the ActivitySim output tables. IDs are read as int64,
+# except in plans where trips and tours are missing for activities, other
+# integers as int32 and repeated labels as categoricals. Columns missing
+# from a table are ignored.
+asim_output_dtypes = {
+    'households': {
+        'household_id': 'int64', 'home_zone_id': 'int64', 'hhsize': 'int32',
+        'num_workers': 'int32', 'auto_ownership': 'int32'},
+    'persons': {
+        'person_id': 'int64', 'household_id': 'int64', 'age': 'int32',
+        'PNUM': 'int32', 'home_zone_id': 'int64'},
+    'tours': {
+        'tour_id': 'int64', 'person_id': 'int64', 'household_id': 'int64',
+        'tour_type': 'category', 'tour_category': 'category',
+        'tour_mode': 'category', 'primary_purpose': 'category',
+        'composition': 'category', 'stop_frequency': 'category',
+        'atwork_subtour_frequency': 'category'},
+    'trips': {
+        'trip_id': 'int64', 'tour_id': 'int64', 'person_id': 'int64',
+        'household_id': 'int64', 'primary_purpose': 'category',
+        'purpose': 'category', 'trip_mode': 'category'},
+    'joint_tour_participants': {
+        'participant_id': 'int64', 'tour_id': 'int64',
+        'household_id': 'int64', 'person_id': 'int64'},
+    'plans': {
+        'trip_id': 'float64', 'person_id': 'int64', 'tour_id': 'float64',
+        'PlanElementIndex': 'int32', 'ActivityElement': 'category',
+        'ActivityType': 'category', 'trip_mode': 'category'},
+}
+
+
+class AsimOutputTables(MutableMapping):
+    """
+    Lazy mapping of ActivitySim output tables by table name. Each table is
+    parsed from its .csv file on first access, and `load` parses several of
+    them at once in parallel threads. Tables can be replaced or added like
+    in a dict.
+
+    Parameters:
+    ------------
+    - paths: dict of .csv file paths, by table name.
+    - dtypes: dict of column dtypes by table name, see `read_arrow_csv`.
+    - num_threads: int. Number of tables parsed at once, defaults to all.
+    """
+
+    def __init__(self, paths, dtypes=None, num_threads=None):
+        self.paths = dict(paths)
+        self.dtypes = dtypes or {}
+        self.num_threads = num_threads
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _read(self, table_name):
+        logger.info("Reading {0} asim output table.".format(table_name))
         if table_name == 'persons':
             index_col = 'person_id'
         elif table_name == 'households':
             index_col = 'household_id'
         else:
             index_col = None
-        table = pd.read_csv(file_path, index_col=index_col)
+        table = read_arrow_csv(
+            self.paths[table_name], self.dtypes.get(table_name, None),
+            index_col=index_col)
 
         if 'block_id' in table.columns:
             table['block_id'] = table['block_id'].astype(str).str.zfill(15)
         if 'lcm_county_id' in table.columns:
             table['lcm_county_id'] = table['lcm_county_id'].astype(
                 str).str.zfill(5)
+        return table
+
+    def load(self, table_names=None):
+        """
+        Parses the given tables, all of them by default, if they have not
+        been parsed yet.
+        """
+        if table_names is None:
+            table_names = list(self)
+        with self._lock:
+            to_read = [
+                table_name for table_name in table_names
+                if table_name not in self._tables]
+            if not to_read:
+                return
+            num_threads = self.num_threads or len(to_read)
+            with ThreadPoolExecutor(
+                    max_workers=max(1, min(num_threads, len(to_read)))
+            ) as executor:
+                tables = dict(zip(to_read, executor.map(self._read, to_read)))
+            self._tables.update(tables)
+
+    def is_loaded(self, table_name):
+        """ Whether a table has been parsed or set. """
+        return table_name in self._tables
+
+    def __getitem__(self, table_name):
+        if table_name not in self._tables:
+            if table_name not in self.paths:
+                raise KeyError(table_name)
+            self.load([table_name])
+        return self._tables[table_name]
+
+    def __setitem__(self, table_name, table):
+        self._tables[table_name] = table
+
+    def __delitem__(self, table_name):
+        if table_name not in self:
+            raise KeyError(table_name)
+        self._tables.pop(table_name, None)
+        self.paths.pop(table_name, None)
+
+    def __iter__(self):
+        yield from self.paths
+        for table_name in self._tables:
+            if table_name not in self.paths:
+                yield table_name
+
+    def __len__(self):
+        return len(set(self.paths) | set(self._tables))
 
-        asim_output_dict[table_name] = table
 
-    return asim_output_dict
+def _load_asim_outputs(settings):
+    output_tables_settings = settings['asim_output_tables']
+    prefix = output_tables_settings['prefix']
+    output_tables = output_tables_settings['tables']
+    paths = {}
+    for table_name in output_tables:
+        file_name = "%s%s.csv" % (prefix, table_name)
+        paths[table_name] = os.path.join(
+            settings['asim_local_output_folder'], file_name)
+
+    return AsimOutputTables(
+        paths, asim_output_dtypes,
+        num_threads=settings.get('asim_output_read_threads', None))
 
 
 def _get_usim_datastore_fname(settings, io, year=None):
@@ -70,11 +183,14 @@ def _prepare_updated_tables(
 
     # ensure we preserve all columns originally in the urbansim outputs
     required_cols = {}
+    schemas = {}
     for table_name in tables_updated_by_asim:
         h5_key = table_name
         if prefix:
             h5_key = os.path.join(str(prefix), h5_key)
-        required_cols[table_name] = list(usim_output_store[h5_key].columns)
+        schemas[table_name] = table_schema(usim_output_store, h5_key)
+        required_cols[table_name] = list(schemas[table_name].columns)
+    usim_output_store.close()
 
     # This is the inverse process of asim_pre._update_persons_table()
     p_cols_to_include = required_cols['persons']
@@ -121,9 +237,6 @@ def _prepare_updated_tables(
             'households'][required_cols['households']]
 
     for table_name in tables_updated_by_asim:
-        h5_key = table_name
-        if prefix:
-            h5_key = os.path.join(str(prefix), h5_key)
         logger.info(
             "Validating data schemas for table {0}.".format(table_name))
 
@@ -137,14 +250,12 @@ def _prepare_updated_tables(
 
         # make sure data types match
         else:
-            dtypes = usim_output_store[h5_key].dtypes.to_dict()
+            dtypes = schemas[table_name].dtypes.to_dict()
             for col in required_cols[table_name]:
                 if asim_output_dict[table_name][col].dtype != dtypes[col]:
                     asim_output_dict[table_name][col] = asim_output_dict[
                         table_name][col].astype(dtypes[col])
 
-    usim_output_store.close()
-
     # specific dtype required conversions
     asim_output_dict['households']['block_id'] = asim_output_dict[
         'households']['block_id'].astype(str)
@@ -159,12 +270,30 @@ def create_beam_input_data(settings, forecast_year, asim_output_dict):
     outpath = os.path.join(asim_output_data_dir, archive_name)
     logger.info('Merging results back into UrbanSim format and storing as .zip!')
 
-    with zipfile.ZipFile(outpath, 'w') as csv_zip:
+    # tables are stored uncompressed unless a deflate level (1-9) is set
+    compresslevel = settings.get('asim_outputs_zip_compression_level', None)
+    if compresslevel is None:
+        compression = zipfile.ZIP_STORED
+    else:
+        compression = zipfile.ZIP_DEFLATED
+
+    with zipfile.ZipFile(
+            outpath, 'w', compression=compression,
+            compresslevel=compresslevel) as csv_zip:
 
-        # copy asim outputs into archive
+        # copy asim outputs into archive. Tables that were never parsed are
+        # unchanged, their .csv files are copied as they are in chunks.
+        # Parsed tables may have been updated and are streamed in row chunks.
         for table_name in asim_output_dict.keys():
             logger.info("Zipping {0} asim table to output archive!".format(table_name))
-            csv_zip.writestr(table_name + ".csv", asim_output_dict[table_name].to_csv())
+            if isinstance(asim_output_dict, AsimOutputTables) and \
+                    not asim_output_dict.is_loaded(table_name):
+                csv_zip.write(
+                    asim_output_dict.paths[table_name],
+                    arcname=table_name + ".csv")
+            else:
+                write_zipped_csv(
+                    csv_zip, table_name + ".csv", asim_output_dict[table_name])
     logger.info("Done creating .zip archive!")
 
 
@@ -232,15 +361,18 @@ def create_usim_input_data(
         new_input_store[table_name] = asim_output_dict[table_name]
         updated_tables.append(table_name)
 
-    # 2. copy USIM OUTPUTS into new input data store if not present already
+    # 2. copy USIM OUTPUTS into new input data store if not present already.
+    # These and the static inputs below are unchanged, so they are copied at
+    # the HDF5 level without going through pandas.
     logger.info((
         "Passing last set of UrbanSim outputs through to the new "
         "Urbansim input store!"))
-    for h5_key in output_store.keys():
+    for h5_key in usim_output_store.keys():
         table_name = h5_key.split('/')[-1]
         if table_name not in updated_tables:
             if os.path.join('/', table_prefix_year, table_name) == h5_key:
-                new_input_store[table_name] = usim_output_store[h5_key]
+                copy_table(
+                    usim_output_store, h5_key, new_input_store, table_name)
                 updated_tables.append(table_name)
 
     # 3. copy USIM INPUTS into new input data store if not present already
@@ -250,7 +382,10 @@ def create_usim_input_data(
     for h5_key in og_input_store.keys():
         table_name = h5_key.split('/')[-1]
         if table_name not in updated_tables:
-            new_input_store[table_name] = og_input_store[h5_key]
+            copy_table(og_input_store, h5_key, new_input_store, table_name)
+
+    convert_to_table_format(
+        new_input_store, settings.get('usim_table_format_tables', None) or [])
 
     og_input_store.close()
     new_input_store.close()
@@ -263,6 +398,7 @@ def create_next_iter_inputs(settings, year, forecast_year):
 
     tables_updated_by_asim = ['households', 'persons']
     asim_output_dict = _load_asim_outputs(settings)
+    asim_output_dict.load(tables_updated_by_asim)
     asim_output_dict = _prepare_updated_tables(
         settings, forecast_year, asim_output_dict, tables_updated_by_asim,
         prefix=forecast_year)
@@ -1,6 +1,9 @@
 import os
 import glob
+import json
 import openmatrix as omx
+import tables
+import h5py
 import pandas as pd
 from pandas.api.types import is_string_dtype
 from pandas.api.types import is_numeric_dtype
@@ -14,12 +17,18 @@ import time
 import yaml
 import matplotlib.pyplot as plt
 from multiprocessing import Pool
+from functools import partial
+from scipy.spatial import cKDTree
 
 from pilates.utils.geog import get_block_geoms,\
      map_block_to_taz, get_zone_from_points, \
-     get_taz_geoms, get_county_block_geoms, geoid_to_zone_map
+     get_taz_geoms, get_county_block_geoms, get_zone_index, \
+     geoms_cache_path, read_geoms_cache, write_geoms_cache, project_zones, \
+     zone_system_name
 
-from pilates.utils.io import read_datastore
+from pilates.utils.io import read_datastore, read_cached_skims, \
+     skims_cache_settings, write_tables
+from pilates.activitysim.skim_qa import clear_stats
 
 logger = logging.getLogger("activitysim.pre")
 
@@ -54,16 +63,7 @@ def zone_order(settings, year):
     Numpy Array. One dimension array, the index of the array represents the order.
 
     """
-    zone_type = settings['skims_zone_type']
-    mapping = geoid_to_zone_map(settings, year)
-
-    if zone_type == 'taz':
-        num_taz = len(set(mapping.values()))
-        order = np.array(range(1, num_taz + 1)).astype(str)
-    else:
-        order = pd.DataFrame.from_dict(mapping, orient = 'index', columns = ['zone_id']).astype(int)
-        order = np.array(order.sort_values('zone_id').index)
-    return order
+    return get_zone_index(settings, year).order
 
 def read_skims(settings, mode='a', data_dir=None):
     """
@@ -101,10 +101,20 @@ def read_zone_geoms(settings, year,
                     asim_zone_id_col='TAZ',
                     default_zone_id_col='zone_id'):
     """
-    Returns a GeoPandas dataframe with the zones geometries.
+    Returns a GeoPandas dataframe with the zones geometries. Geometries are
+    read from the GeoParquet zone geometry cache, falling back on the WKT
+    table of earlier runs in the .h5 datastore and then on downloading them.
     """
-    store, table_prefix_year = read_datastore(settings, year)
     zone_type = settings['skims_zone_type']
+    cache_fpath = geoms_cache_path(settings, zone_type + '_zone_geoms')
+    zones = read_geoms_cache(cache_fpath)
+
+    if zones is not None:
+        logger.info(
+            "Loading {0} zone geometries from cache!".format(zone_type))
+        return zone_id_to_taz(zones, asim_zone_id_col, default_zone_id_col)
+
+    store, table_prefix_year = read_datastore(settings, year)
     zone_key = '/{0}_zone_geoms'.format(zone_type)
 
     if zone_key in store.keys():
@@ -114,7 +124,8 @@ def read_zone_geoms(settings, year,
         zones = store[zone_key]
 
         if 'geometry' in zones.columns:
-            zones['geometry'] = zones['geometry'].apply(wkt.loads)
+            zones['geometry'] = gpd.GeoSeries.from_wkt(
+                zones['geometry'].values, index=zones.index)
             zones = gpd.GeoDataFrame(
                 zones, geometry='geometry', crs='EPSG:4326')
         else:
@@ -128,21 +139,14 @@ def read_zone_geoms(settings, year,
             zones = get_taz_geoms(settings, zone_id_col_out=default_zone_id_col)
             zones.set_index(default_zone_id_col, inplace=True)
         else:
-            mapping = geoid_to_zone_map(settings, year)
+            zone_index = get_zone_index(settings, year)
             zones = get_block_geoms(settings)
             assert is_string_dtype(zones['GEOID']), "GEOID dtype should be str"
-            zones[default_zone_id_col] = zones['GEOID'].replace(mapping)
+            zones[default_zone_id_col] = zone_index.lookup(
+                zones['GEOID'], keep_missing=True)
             zones.set_index(default_zone_id_col, inplace = True)
             assert zones.index.inferred_type == 'string', "zone_id dtype should be str"
 
-        # save zone geoms in .h5 datastore so we don't
-        # have to do this again
-        out_zones = pd.DataFrame(zones.copy())
-        out_zones['geometry'] = out_zones['geometry'].apply( lambda x: x.wkt)
-
-        logger.info("Storing zone geometries to .h5 datastore!")
-        store[zone_key] = out_zones
-
     store.close()
 
     # Sort zones by zone_id.
@@ -151,14 +155,20 @@ def read_zone_geoms(settings, year,
     zones.index = zones.index.astype(int)
     zones = zones.sort_index()
     zones.index = zones.index.astype(str)
+
+    # save zone geoms in the geometry cache so we don't
+    # have to do this again
+    logger.info("Storing zone geometries to {0}!".format(cache_fpath))
+    write_geoms_cache(zones, cache_fpath)
     return zone_id_to_taz(zones, asim_zone_id_col, default_zone_id_col)
 
 ####################################
 #### RAW BEAM SKIMS TO SKIMS.OMX ###
 ####################################
-def read_skim(filename):
+def read_skim(filename, cache_dir=None, max_bytes=None):
     logger.info("Loading raw beam skims from disk: {}".format(filename))
-    df = pd.read_csv(filename, index_col=None, header=0, dtype=beam_skims_types)
+    df = read_cached_skims(
+        filename, cache_dir, dtype=beam_skims_types, max_bytes=max_bytes)
     return df
 
 def _load_raw_beam_skims(settings):
@@ -176,14 +186,16 @@ def _load_raw_beam_skims(settings):
     path_to_beam_skims = os.path.join(
         settings['beam_local_output_folder'], skims_fname)
 
+    cache_kwargs = skims_cache_settings(settings)
+
     try:
         if '.csv' in path_to_beam_skims:
-            skims = read_skim(path_to_beam_skims)
+            skims = read_skim(path_to_beam_skims, **cache_kwargs)
         else: # path is a folder with multiple files
             all_files = glob.glob(path_to_beam_skims + "/*")
             agents = len(all_files)
             pool = Pool(processes=agents)
-            result = pool.map(read_skim, all_files)
+            result = pool.map(partial(read_skim, **cache_kwargs), all_files)
             skims = pd.concat(result, axis=0, ignore_index=True)
     except KeyError:
         raise KeyError(
@@ -223,7 +235,10 @@ def _create_skim_object(settings, overwrite=True, output_dir=None):
 
 def _raw_beam_skims_preprocess(settings, year, skims_df):
     """
-    Validates and preprocess raw beam skims.
+    Validates and preprocess raw beam skims. Numeric columns are cleaned in
+    place: inf and zero values are considered missing. The number of inf and
+    zero values found per column is logged and stored in
+    skims_df.attrs['beam_skims_cleaning'].
 
     parameter
     ----------
@@ -236,31 +251,44 @@ def _raw_beam_skims_preprocess(settings, year, skims_df):
     Pandas dataFrame. Skims
     """
     # Validations:
-    origin_taz = skims_df.origin.unique()
-    destination_taz = skims_df.origin.unique()
-    assert len(origin_taz) == len(destination_taz)
-
     order = zone_order(settings, year)
-
-    test_1 = set(origin_taz).issubset(set(order))
-    test_2 = set(destination_taz).issubset(set(order))
-    test_3 = len(set(order) - set(origin_taz))
-    test_4 = len(set(order) - set(destination_taz))
-    assert test_1, 'There are {} missing origin zone ids in BEAM skims'.format(test_3)
-    assert test_2, 'There are {} missing destination zone ids in BEAM skims'.format(test_4)
+    order_index = pd.Index(order)
+    for col in ['origin', 'destination']:
+        positions = order_index.get_indexer(pd.unique(skims_df[col].values))
+        known = positions[positions != -1]
+        missing = len(order) - len(np.unique(known))
+        assert len(known) == len(positions), \
+            'There are {0} missing {1} zone ids in BEAM skims'.format(
+                missing, col)
 
     # Preprocess skims:
-    df_clean = skims_df.copy()
-    df_clean['DIST_miles'] = df_clean['DIST_meters'] * (0.621371 / 1000)
-    df_clean['DDIST_miles'] = df_clean['DDIST_meters'] * (0.621371 / 1000)
-    df_clean = df_clean.replace({np.inf : np.nan, 0: np.nan}) ## TEMPORARY FIX
-
-    inf = np.isinf(df_clean['DDIST_miles']).values.sum() > 0
-    zeros = (df_clean['DDIST_miles'] == 0).sum() > 0
+    dtype = np.float32 if settings.get('skims_float32', False) else float
+    counts = {}
+    for col in skims_df.columns:
+        if not is_numeric_dtype(skims_df[col]):
+            continue
+        values = skims_df[col].values
+        inf = values == np.inf
+        zeros = values == 0
+        counts[col] = {'inf': int(inf.sum()), 'zero': int(zeros.sum())}
+        if counts[col]['inf'] or counts[col]['zero'] or values.dtype != dtype:
+            values = values.astype(dtype)
+            values[inf | zeros] = np.nan ## TEMPORARY FIX
+            skims_df[col] = values
+        if counts[col]['inf'] or counts[col]['zero']:
+            logger.info(
+                "Replaced {0} inf and {1} zero values of {2} with NaN.".format(
+                    counts[col]['inf'], counts[col]['zero'], col))
+    skims_df['DIST_miles'] = skims_df['DIST_meters'] * (0.621371 / 1000)
+    skims_df['DDIST_miles'] = skims_df['DDIST_meters'] * (0.621371 / 1000)
+    skims_df.attrs['beam_skims_cleaning'] = counts
+
+    inf = np.isinf(skims_df['DDIST_miles']).values.sum() > 0
+    zeros = (skims_df['DDIST_miles'] == 0).sum() > 0
     if (inf) or (zeros):
         raise ValueError('Origin-Destination distances contains inf or zero values.')
 
-    return df_clean
+    return skims_df
 
 def _create_skims_by_mode(settings, skims_df):
     """
@@ -292,6 +320,72 @@ def _create_skims_by_mode(settings, skims_df):
     del skims_df
     return auto_df, transit_df
 
+def _od_positions(df, origin, destination, order):
+    """ Map the origin and destination zones of a skims dataframe to their
+    positions in the OD matrix.
+
+    Parameters:
+    -----------
+    - df: Pandas dataframe.
+        Clean skims
+    - origin: str.
+        Name of the column for origin.
+    - destination:
+        Name of the column for destination.
+    - order: array
+        raw and colum order for the OD metrix. The values in order should be of the same type of
+        the values in the origin and destiantion column.
+
+    Returns:
+    ---------
+    - two integer numpy arrays with the row and column position of every record in df.
+    """
+    zone_index = pd.Index(order)
+
+    # factorize first so the (slow) zone ID lookup only runs on unique
+    # values. The trailing -1 catches the null sentinel code.
+    orig_codes, orig_zones = pd.factorize(df[origin])
+    dest_codes, dest_zones = pd.factorize(df[destination])
+    orig_idx = np.append(zone_index.get_indexer(orig_zones), -1)[orig_codes]
+    dest_idx = np.append(zone_index.get_indexer(dest_zones), -1)[dest_codes]
+    assert (orig_idx >= 0).all(), 'There are missing origins'
+    assert (dest_idx >= 0).all(), 'There are missing destinations'
+    return orig_idx, dest_idx
+
+def _flat_od_index(orig_idx, dest_idx, num_zones):
+    """ Combines row and column positions into positions in the flattened
+    num_zones x num_zones matrix. Raises if an OD pair is repeated.
+    """
+    flat_idx = orig_idx.astype(np.int64) * num_zones + dest_idx
+    seen = np.zeros(num_zones * num_zones, dtype=bool)
+    seen[flat_idx] = True
+    if np.count_nonzero(seen) != len(flat_idx):
+        raise ValueError("Index contains duplicate entries, cannot reshape")
+    return flat_idx
+
+def _scatter_od_matrix(flat_idx, values, num_zones, fill_na=0):
+    """ Scatter skim values into a dense num_zones x num_zones matrix.
+
+    Parameters:
+    -----------
+    - flat_idx: integer array.
+        Position of every value in the flattened matrix (see `_flat_od_index`).
+    - values: array
+        Skim values, same length as flat_idx.
+    - num_zones: int
+    - fill_na: Default = 0. OD pairs without a value, or with a NaN value, are filled with fill_na.
+
+    Returns:
+    ---------
+    - numpy square 0-D matrix
+    """
+    mtx = np.full(num_zones * num_zones, np.nan)
+    mtx[flat_idx] = values
+    mtx = mtx.reshape(num_zones, num_zones)
+    if not (isinstance(fill_na, float) and np.isnan(fill_na)):
+        mtx[np.isnan(mtx)] = fill_na
+    return mtx
+
 def _build_od_matrix(df, origin, destination, metric, order, fill_na=0):
     """ Tranform skims from pandas dataframe to numpy square matrix (O-D matrix format)
     Parameters:
@@ -313,37 +407,123 @@ def _build_od_matrix(df, origin, destination, metric, order, fill_na=0):
     ---------
     - numpy square 0-D matrix
     """
-    vals = df.pivot(index = origin,
-                    columns = destination,
-                    values = metric)
+    num_zones = len(order)
+    orig_idx, dest_idx = _od_positions(df, origin, destination, order)
+    flat_idx = _flat_od_index(orig_idx, dest_idx, num_zones)
+    return _scatter_od_matrix(flat_idx, df[metric].values, num_zones, fill_na)
+
+def _skim_groups(df, keys, order):
+    """ Partitions clean skims in a single pass.
 
+    Parameters:
+    -----------
+    - df: Pandas dataframe.
+        Clean skims
+    - keys: str or list.
+        Column(s) to group by, e.g. ['pathType', 'timePeriod'].
+    - order: array
+        zone_id order of the OD matrices.
+
+    Returns:
+    ---------
+    - dict mapping every group key to the positions in the flattened OD
+      matrix of its records, and an array with the row numbers of those
+      records in df.
+    """
     num_zones = len(order)
+    orig_idx, dest_idx = _od_positions(df, 'origin', 'destination', order)
+    groups = {}
+    for key, rows in df.groupby(keys, sort=False).indices.items():
+        flat_idx = _flat_od_index(orig_idx[rows], dest_idx[rows], num_zones)
+        groups[key] = (flat_idx, rows)
+    return groups
+
+def _build_group_matrices(df, group, columns, num_zones, fill_na=0):
+    """ Builds the OD matrix of every column for one skims group.
+
+    Parameters:
+    -----------
+    - df: Pandas dataframe.
+        Clean skims the group was computed from (see `_skim_groups`).
+    - group: tuple or None.
+        (flat_idx, rows) of the group. None if the group has no records.
+    - columns: list.
+        Names of the skims columns to build matrices for.
+    - num_zones: int
+    - fill_na: see `_scatter_od_matrix`.
 
-    if (num_zones,num_zones) != vals.shape:
+    Returns:
+    ---------
+    - dict of numpy square O-D matrices keyed by column name.
+    """
+    if group is None:
+        group = (np.array([], dtype=np.int64), np.array([], dtype=np.int64))
+    flat_idx, rows = group
+    matrices = {}
+    for column in columns:
+        if column not in matrices:
+            values = df[column].values[rows]
+            matrices[column] = _scatter_od_matrix(
+                flat_idx, values, num_zones, fill_na)
+    return matrices
+
+def zone_centroids(zones, crs='EPSG:3857'):
+    """
+    Projected centroids of the zones, in zone position order.
 
-        missing_rows = list(set(order) - set(vals.index)) #Missing origins
-        missing_cols = list(set(order) - set(vals.columns)) #Missing destinations
-        axis = 0
+    Parameters:
+    -------------
+    - zones: geoPandas or Pandas DataFrame,
+        Dataframe with the zones information, indexed by zone_id. If Pandas
+        DataFrame, it expects a geometry column for which wkt.loads can be read.
+    - crs: str,
+        CRS in meters the centroids are computed in.
 
-        if len(missing_rows) == 0:
-            missing_rows = vals.index
+    Returns
+    --------
+    numpy array of shape (num_zones, 2). Row i holds the x, y coordinates of
+    the centroid of zone_id i + 1.
+    """
+    if isinstance(zones, pd.core.frame.DataFrame):
+        zones = zones.copy()
+        zones.geometry = zones.geometry.astype(str).apply(wkt.loads)
+        zones = gpd.GeoDataFrame(zones, geometry='geometry', crs='EPSG:4326')
 
-        if len(missing_cols) == 0:
-            missing_cols = vals.columns
+    assert isinstance(zones, gpd.geodataframe.GeoDataFrame), "Zones needs to be a GeoPandas dataframe"
 
-        else:
-            axis = 1
+    labels = (np.arange(len(zones)) + 1).astype(str)
+    positions = zones.index.get_indexer(labels)
+    if (positions == -1).any():
+        raise KeyError(
+            "Zones {0} not found in zone geometries".format(
+                list(labels[positions == -1][:10])))
 
-        array = np.empty((len(missing_rows), len(missing_cols)))
-        array[:] = np.nan
-        empty_df = pd.DataFrame(array, index = missing_rows, columns = missing_cols)
-        vals = pd.concat((vals,empty_df), axis = axis)
+    centroids = zones.geometry.to_crs(crs).centroid.values[positions]
+    return np.column_stack([centroids.x, centroids.y])
 
-    assert vals.index.isin(order).all(), 'There are missing origins'
-    assert vals.columns.isin(order).all(), 'There are missing destinations'
-    assert (num_zones, num_zones) == vals.shape, 'Origin-Destination matrix is not square'
+# Projected zone centroids, by (zone system, crs)
+_zone_centroids = {}
 
-    return vals.loc[order, order].fillna(fill_na).values
+def read_zone_centroids(settings, year, crs='EPSG:3857'):
+    """
+    Returns the projected zone centroids array of `zone_centroids`. Zones are
+    projected once per zone system and crs and cached, see `project_zones`.
+    The year is not part of the cache key: zone geometries are not stored by
+    year (see `read_zone_geoms`), the year only locates the datastore they
+    fall back on.
+    """
+    zone_system = zone_system_name(settings)
+    key = (zone_system, crs)
+    if key not in _zone_centroids:
+        zones = project_zones(read_zone_geoms(settings, year), crs, zone_system)
+        labels = (np.arange(len(zones)) + 1).astype(str)
+        positions = zones.index.get_indexer(labels)
+        if (positions == -1).any():
+            raise KeyError(
+                "Zones {0} not found in zone geometries".format(
+                    list(labels[positions == -1][:10])))
+        _zone_centroids[key] = zones.centroids[positions]
+    return _zone_centroids[key]
 
 def impute_distances(zones, origin, destination):
     """
@@ -352,39 +532,81 @@ def impute_distances(zones, origin, destination):
 
     Parameters:
     -------------
-    - zones: geoPandas or Pandas DataFrame,
-        Dataframe with the zones information. If Pandas DataFrame, it expects a geometry column
-        for which wkt.loads can be read.
+    - zones: numpy array, geoPandas or Pandas DataFrame,
+        Zone centroids array as returned by `zone_centroids`, or Dataframe
+        with the zones information. If Pandas DataFrame, it expects a
+        geometry column for which wkt.loads can be read.
     - origin: list, array-like.
-        list of origins. Origins should correspond to the zone identifier in zones.
+        list of origins. Origins should correspond to the zone position in zones.
         Origin should be the same lenght as destination.
     - destination: list, array-like,
-        list of destination. Destinations should correspond to the zone identifier in zones
+        list of destination. Destinations should correspond to the zone position in zones
 
     Returns
     --------
     numpy array of shape (len(origin),). Imputed distance for all OD pairs
     """
     assert len(origin) == len(destination), 'parameters "origin" and "destination" should have the same lenght'
-    origin = (origin + 1).astype(str)
-    destination = (destination + 1).astype(str)
-
-    if isinstance(zones, pd.core.frame.DataFrame):
-        zones.geometry = zones.geometry.astype(str).apply(wkt.loads)
-        zones = gpd.GeoDataFrame(zones, geometry='geometry', crs='EPSG:4326')
-
-    assert isinstance(zones, gpd.geodataframe.GeoDataFrame), "Zones needs to be a GeoPandas dataframe"
-
-    gdf = zones.copy()
-
-    #Tranform gdf to CRS in meters
-    gdf = gdf.to_crs('EPSG:3857')
-
-    # Select origin and destination pairs
-    orig = gdf.loc[origin].reset_index(drop = True).geometry.centroid
-    dest = gdf.loc[destination].reset_index(drop = True).geometry.centroid
 
-    return orig.distance(dest).replace({0:100}).values * (0.621371 / 1000)
+    if not isinstance(zones, np.ndarray):
+        zones = zone_centroids(zones)
+
+    delta = zones[np.asarray(origin)] - zones[np.asarray(destination)]
+    dist = np.sqrt(delta[:, 0] * delta[:, 0] + delta[:, 1] * delta[:, 1])
+    dist[dist == 0] = 100
+
+    return dist * (0.621371 / 1000)
+
+def _skim_storage_kwargs(settings):
+    """ PyTables storage options of skims.omx matrices. Defaults match the
+    OMX defaults (zlib, level 1, shuffle, automatic chunk shape)."""
+    filters = tables.Filters(
+        complevel=settings.get('skims_complevel', 1),
+        complib=settings.get('skims_complib', 'zlib'),
+        shuffle=True)
+    chunkshape = settings.get('skims_chunkshape', None)
+    if chunkshape:
+        chunkshape = tuple(chunkshape)
+    return {'filters': filters, 'chunkshape': chunkshape}
+
+def _link_skim_matrix(skims, names, matrix):
+    """ Stores matrix under every name in names as HDF5 hard links. OMX
+    readers resolve them as regular matrices, but the data is stored once.
+    """
+    for name in names:
+        skims.create_hard_link(skims.root.data, name, matrix)
+
+def _zero_skim_matrix(skims, num_zones, settings):
+    """ Returns the all-zero matrix shared by every measure without BEAM
+    skims, creating it on first use. It lives outside of the OMX data group,
+    so it is only seen through its links."""
+    if 'zeros' not in skims.root:
+        skims.create_carray(
+            skims.root, 'zeros', atom=tables.Float64Atom(dflt=0.0),
+            shape=(num_zones, num_zones), **_skim_storage_kwargs(settings))
+    return skims.root.zeros
+
+def _create_skim_matrix(skims, names, num_zones, settings):
+    """ Creates an empty num_zones x num_zones matrix stored under every name
+    in names. Cells that are never written read as zero and take no space on
+    disk."""
+    matrix = skims.create_matrix(
+        names[0], atom=tables.Float64Atom(dflt=0.0),
+        shape=(num_zones, num_zones), **_skim_storage_kwargs(settings))
+    _link_skim_matrix(skims, names[1:], matrix)
+    return matrix
+
+def _write_skim_matrix(skims, names, mtx, num_zones, settings):
+    """ Writes mtx once and links it under every name in names. If mtx is
+    None, names are linked to the shared all-zero matrix instead."""
+    if mtx is None:
+        matrix = _zero_skim_matrix(skims, num_zones, settings)
+        _link_skim_matrix(skims, names, matrix)
+        return matrix
+    matrix = skims.create_matrix(
+        names[0], obj=mtx, **_skim_storage_kwargs(settings))
+    _link_skim_matrix(skims, names[1:], matrix)
+    return matrix
 
 def _distance_skims(settings, year, auto_df, order, data_dir=None):
     """
@@ -411,92 +633,179 @@ def _distance_skims(settings, year, auto_df, order, data_dir=None):
     if missing.any():
         orig, dest = np.where(missing == True)
         logger.info("Imputing {} missing distance skims.".format(len(orig)))
-        zones = read_zone_geoms(settings, year)
-        imputed_dist = impute_distances(zones, orig, dest)
+        centroids = read_zone_centroids(settings, year)
+        imputed_dist = impute_distances(centroids, orig, dest)
         mx_dist[orig, dest] = imputed_dist
     assert not np.isnan(mx_dist).any()
 
     # Distance matrices
-    skims['DIST'] = mx_dist
-    skims['DISTBIKE'] = mx_dist
-    skims['DISTWALK'] = mx_dist
+    _write_skim_matrix(
+        skims, ['DIST', 'DISTBIKE', 'DISTWALK'], mx_dist, len(order), settings)
     skims.close()
 
+def _transit_paths_by_beam_path(settings):
+    """ EXP and TRN paths are written out using the LOC path skims. Returns
+    a dict of the ActivitySim transit paths built from each BEAM path."""
+    paths_by_beam_path = {}
+    for path in settings['transit_paths']:
+        path_ = path.replace('EXP', 'LOC')
+        path_ = path_.replace('TRN', 'LOC')
+        paths_by_beam_path.setdefault(path_, []).append(path)
+    return paths_by_beam_path
+
+def _transit_group_skims(settings, transit_df, groups, path_, period, num_taz):
+    """ Transit skims of one BEAM path and period.
+
+    Returns:
+    ---------
+    - list of (names, matrix) tuples. matrix is None for all-zero skims.
+    """
+    measure_map = settings['beam_asim_transit_measure_map']
+    paths = _transit_paths_by_beam_path(settings)[path_]
+    columns = [col for col in measure_map.values() if col]
+    matrices = _build_group_matrices(
+        transit_df, groups.get((path_, period)), columns, num_taz, fill_na=0)
+
+    skims = []
+    for measure in measure_map.keys():
+        if (measure == 'FAR') or (measure == 'BOARDS'):
+            mtx = matrices[measure_map[measure]]
+        elif measure_map[measure]:
+            # activitysim estimated its models using transit skims from Cube
+            # which store time values as scaled integers (e.g. x100), so their
+            # models also divide transit skim values by 100. Since our skims
+            # aren't coming out of Cube, we multiply by 100 to negate the division.
+            # This only applies for travel times.
+            mtx = matrices[measure_map[measure]] * 100
+        else:
+            mtx = None
+        names = ['{0}_{1}__{2}'.format(path, measure, period) for path in paths]
+        skims.append((names, mtx))
+    return skims
+
+def _auto_period_skims(settings, auto_df, groups, period, num_taz, distances):
+    """ Auto skims of one period. Missing values are imputed from distances.
+
+    Returns:
+    ---------
+    - list of (names, matrix) tuples. matrix is None for all-zero skims.
+    """
+    paths = settings['hwy_paths']
+    measure_map = settings['beam_asim_hwy_measure_map']
+    columns = [col for col in measure_map.values() if col]
+
+    # all hwy paths of a period share the same skims
+    matrices = _build_group_matrices(
+        auto_df, groups.get(period), columns, num_taz, fill_na=np.nan)
+
+    skims = []
+    for measure in measure_map.keys():
+        if measure_map[measure]:
+            mtx = matrices[measure_map[measure]].copy()
+            missing = np.isnan(mtx)
+
+            if missing.any():
+                orig, dest = np.where(missing == True)
+                missing_measure = distances[orig, dest]
+
+                if measure == 'DIST':
+                    mtx[orig, dest] = missing_measure
+                elif measure == 'TIME':
+                    mtx[orig, dest] = missing_measure * (60/40) # Assumes average speed of 40 miles/hour
+                else:
+                    mtx[orig, dest] = 0 ## Assumes no toll or payment
+        else:
+            mtx = None
+        names = ['{0}_{1}__{2}'.format(path, measure, period) for path in paths]
+        skims.append((names, mtx))
+    return skims
+
 def _transit_skims(settings, transit_df, order, data_dir=None):
     """ Generate transit OMX skims"""
 
     logger.info("Creating transit skims.")
-    transit_paths = settings['transit_paths']
     periods = settings['periods']
-    measure_map = settings['beam_asim_transit_measure_map']
     skims = read_skims(settings, mode='a', data_dir=data_dir)
     num_taz = len(order)
-    df = transit_df.copy()
 
-    for path in transit_paths:
-        path_ = path.replace('EXP', 'LOC')
-        path_ = path_.replace('TRN', 'LOC')
+    groups = _skim_groups(transit_df, ['pathType', 'timePeriod'], order)
+    for path_ in _transit_paths_by_beam_path(settings).keys():
         for period in periods:
-            df_ = df[(df.pathType == path_) & (df.timePeriod == period)]
-            for measure in measure_map.keys():
-                name = '{0}_{1}__{2}'.format(path, measure, period)
-                if (measure == 'FAR') or (measure == 'BOARDS'):
-                    mtx = _build_od_matrix(df_, 'origin', 'destination',
-                                            measure_map[measure], order,
-                                            fill_na = 0)
-                elif measure_map[measure]:
-                    # activitysim estimated its models using transit skims from Cube
-                    # which store time values as scaled integers (e.g. x100), so their
-                    # models also divide transit skim values by 100. Since our skims
-                    # aren't coming out of Cube, we multiply by 100 to negate the division.
-                    # This only applies for travel times.
-                    mtx = _build_od_matrix(df_, 'origin', 'destination',
-                                            measure_map[measure], order) * 100
-
-                else:
-                    mtx = np.zeros((num_taz, num_taz))
-                skims[name] = mtx
+            for names, mtx in _transit_group_skims(
+                    settings, transit_df, groups, path_, period, num_taz):
+                _write_skim_matrix(skims, names, mtx, num_taz, settings)
     skims.close()
-    del df, df_
+    del groups
 
 def _auto_skims(settings, auto_df, order, data_dir=None):
     logger.info("Creating drive skims.")
 
     # Open skims object
     periods = settings['periods']
-    paths = settings['hwy_paths']
-    measure_map = settings['beam_asim_hwy_measure_map']
     skims = read_skims(settings, mode='a', data_dir=data_dir)
     num_taz = len(order)
+    distances = np.array(skims['DIST'])
 
-    df = auto_df.copy()
+    groups = _skim_groups(auto_df, 'timePeriod', order)
     for period in periods:
-        df_ = df[df['timePeriod'] == period]
-        for path in paths:
-            for measure in measure_map.keys():
-                name = '{0}_{1}__{2}'.format(path, measure, period)
-                if measure_map[measure]:
-                    mtx = _build_od_matrix(df_, 'origin', 'destination',
-                                           measure_map[measure], order,
-                                           fill_na = np.nan)
-                    missing = np.isnan(mtx)
-
-                    if missing.any():
-                        distances = np.array(skims['DIST'])
-                        orig, dest = np.where(missing == True)
-                        missing_measure = distances[orig, dest]
+        for names, mtx in _auto_period_skims(
+                settings, auto_df, groups, period, num_taz, distances):
+            _write_skim_matrix(skims, names, mtx, num_taz, settings)
+    skims.close()
+    del groups
+
+# Data shared with the skim builder processes, set by _init_skim_worker
+_skim_worker_data = {}
+
+def _init_skim_worker(data):
+    _skim_worker_data.update(data)
+
+def _run_skim_task(task):
+    """ Builds the skims of one (mode, BEAM path, period) task in a worker
+    process."""
+    mode, path_, period = task
+    data = _skim_worker_data
+    if mode == 'auto':
+        return _auto_period_skims(
+            data['settings'], data['auto_df'], data['auto_groups'], period,
+            data['num_taz'], data['distances'])
+    return _transit_group_skims(
+        data['settings'], data['transit_df'], data['transit_groups'], path_,
+        period, data['num_taz'])
+
+def _parallel_skims(settings, auto_df, transit_df, order, num_processes,
+                    data_dir=None):
+    """ Builds auto and transit skims with a pool of processes, one task per
+    period and BEAM path. Matrices are streamed back to this process, the
+    only one writing to skims.omx.
+    """
+    logger.info(
+        "Creating drive and transit skims with {0} processes.".format(
+            num_processes))
+    periods = settings['periods']
+    skims = read_skims(settings, mode='a', data_dir=data_dir)
+    num_taz = len(order)
 
-                        if measure == 'DIST':
-                            mtx[orig, dest] = missing_measure
-                        elif measure == 'TIME':
-                            mtx[orig, dest] = missing_measure * (60/40) # Assumes average speed of 40 miles/hour
-                        else:
-                            mtx[orig, dest] = 0 ## Assumes no toll or payment
-                else:
-                    mtx = np.zeros((num_taz, num_taz))
-                skims[name] = mtx
+    data = {
+        'settings': settings,
+        'auto_df': auto_df,
+        'transit_df': transit_df,
+        'auto_groups': _skim_groups(auto_df, 'timePeriod', order),
+        'transit_groups': _skim_groups(
+            transit_df, ['pathType', 'timePeriod'], order),
+        'num_taz': num_taz,
+        'distances': np.array(skims['DIST'])}
+    tasks = [('auto', None, period) for period in periods]
+    tasks += [
+        ('transit', path_, period)
+        for path_ in _transit_paths_by_beam_path(settings).keys()
+        for period in periods]
+
+    with Pool(num_processes, _init_skim_worker, (data,)) as pool:
+        for task_skims in pool.imap_unordered(_run_skim_task, tasks):
+            for names, mtx in task_skims:
+                _write_skim_matrix(skims, names, mtx, num_taz, settings)
     skims.close()
-    del df, df_
 
 
 def _create_offset(settings, order, data_dir=None):
@@ -511,6 +820,469 @@ def _create_offset(settings, order, data_dir=None):
     skims.close()
 
 
+#############################################
+#### STREAMING RAW BEAM SKIMS TO SKIMS.OMX ###
+#############################################
+def _beam_skims_files(settings):
+    """ List of raw BEAM skims files, in the order they are loaded. """
+    skims_fname = settings.get('skims_fname', False)
+    path_to_beam_skims = os.path.join(
+        settings['beam_local_output_folder'], skims_fname)
+    if '.csv' in path_to_beam_skims:
+        return [path_to_beam_skims]
+    return glob.glob(path_to_beam_skims + "/*")
+
+def _clean_skim_values(values):
+    """ Same cleaning as `_raw_beam_skims_preprocess`: inf and zero values
+    are considered missing."""
+    values = values.astype(float)
+    values[(values == np.inf) | (values == 0)] = np.nan
+    return values
+
+def _patch_omx_matrix(matrix, orig_idx, dest_idx, values, rows_per_block):
+    """ Writes values into cells (orig_idx, dest_idx) of an on-disk matrix.
+    Only the rows holding these cells are read and written, in runs of at
+    most rows_per_block consecutive rows. If a cell is repeated, the last
+    value wins. Stored QA statistics of the matrix are invalidated.
+    """
+    if len(orig_idx) == 0:
+        return
+    clear_stats(matrix)
+    sort = np.argsort(orig_idx, kind='stable')
+    orig_idx, dest_idx, values = orig_idx[sort], dest_idx[sort], values[sort]
+    rows = np.unique(orig_idx)
+    starts = np.r_[0, np.flatnonzero(np.diff(rows) != 1) + 1]
+    stops = np.r_[starts[1:], len(rows)]
+    for run_start, run_stop in zip(starts, stops):
+        for start in range(run_start, run_stop, rows_per_block):
+            lo = rows[start]
+            hi = rows[min(start + rows_per_block, run_stop) - 1] + 1
+            first, last = np.searchsorted(orig_idx, [lo, hi])
+            block = matrix[lo:hi]
+            block[orig_idx[first:last] - lo, dest_idx[first:last]] = \
+                values[first:last]
+            matrix[lo:hi] = block
+
+def _row_blocks(num_zones, rows_per_block):
+    for lo in range(0, num_zones, rows_per_block):
+        yield lo, min(lo + rows_per_block, num_zones)
+
+def _stream_raw_beam_skims(settings, order, staging, chunk_size):
+    """ Reads raw BEAM skims chunk by chunk and appends the clean values of
+    every group to on-disk buckets, one per block of rows of the OD
+    matrices. Every chunk is only split by row block, so BEAM skims that are
+    not sorted by origin cost the same as sorted ones, and no matrix is
+    written until every record has been read (see `_read_staged_skims`).
+
+    Parameters:
+    ------------
+    - settings:
+    - order: numpy.array
+        zone_id order to create the num_zones x num_zones skim matrix.
+    - staging: tables.File
+        Open file that holds the buckets.
+    - chunk_size: int
+        Number of skims records held in memory at once.
+
+    Returns:
+    --------
+    - dict of buckets keyed by (group, row block number). The group is the
+      period for auto skims, (pathType, period) for transit skims and
+      'DIST' for the period-independent distance skims. Each bucket holds
+      a 'flat_idx' array with the position of every record in the flattened
+      row block and an array per skims column, in file order.
+    """
+    periods = settings['periods']
+    hwy_paths = settings['hwy_paths']
+    transit_paths = settings['transit_paths']
+    hwy_columns = sorted(set(
+        col for col in settings['beam_asim_hwy_measure_map'].values() if col))
+    transit_columns = sorted(set(
+        col for col in settings['beam_asim_transit_measure_map'].values()
+        if col))
+    dist_column = settings['beam_asim_hwy_measure_map']['DIST']
+    transit_beam_paths = sorted(set(
+        path.replace('EXP', 'LOC').replace('TRN', 'LOC')
+        for path in transit_paths))
+
+    # only read the columns that end up in skims.omx
+    raw_columns = {
+        col.replace('_miles', '_meters')
+        for col in hwy_columns + transit_columns}
+    usecols = ['timePeriod', 'pathType', 'origin', 'destination'] + sorted(
+        raw_columns)
+    dtypes = {col: beam_skims_types[col] for col in usecols}
+    dtypes.update({'timePeriod': 'category', 'pathType': 'category'})
+
+    num_zones = len(order)
+    rows_per_block = max(1, chunk_size // num_zones)
+    buckets = {}
+
+    def append(group, block, columns, flat_idx, values, rows):
+        key = (group, block)
+        if key not in buckets:
+            node = staging.create_group(
+                staging.root, 'b{0}'.format(len(buckets)))
+            staging.create_earray(
+                node, 'flat_idx', tables.Int64Atom(), (0,))
+            for col in columns:
+                staging.create_earray(node, col, tables.Float64Atom(), (0,))
+            buckets[key] = node
+        node = buckets[key]
+        node.flat_idx.append(flat_idx[rows])
+        for col in columns:
+            node._f_get_child(col).append(values[col][rows])
+
+    def append_group(group, columns, rows, blocks, flat_idx, values):
+        if len(rows) == 0:
+            return
+        rows = rows[np.argsort(blocks[rows], kind='stable')]
+        bounds = np.flatnonzero(np.diff(blocks[rows])) + 1
+        for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(rows)]):
+            append(
+                group, blocks[rows[start]], columns, flat_idx, values,
+                rows[start:stop])
+
+    for path in _beam_skims_files(settings):
+        logger.info("Streaming raw beam skims from disk: {}".format(path))
+        reader = pd.read_csv(
+            path, usecols=usecols, dtype=dtypes, chunksize=chunk_size)
+        for chunk in reader:
+            orig_idx, dest_idx = _od_positions(
+                chunk, 'origin', 'destination', order)
+            blocks = orig_idx // rows_per_block
+            flat_idx = (orig_idx - blocks * rows_per_block).astype(
+                np.int64) * num_zones + dest_idx
+            values = {}
+            for col in raw_columns:
+                values[col] = _clean_skim_values(chunk[col].values)
+                if col.endswith('_meters'):
+                    miles = col.replace('_meters', '_miles')
+                    values[miles] = values[col] * (0.621371 / 1000)
+
+            path_type = chunk['pathType'].astype(str).values
+            period = chunk['timePeriod'].astype(str).values
+            is_hwy = np.isin(path_type, hwy_paths)
+
+            append_group(
+                'DIST', [dist_column], np.flatnonzero(is_hwy), blocks,
+                flat_idx, values)
+            for period_ in periods:
+                append_group(
+                    period_, hwy_columns,
+                    np.flatnonzero(is_hwy & (period == period_)), blocks,
+                    flat_idx, values)
+                for path_ in transit_beam_paths:
+                    append_group(
+                        (path_, period_), transit_columns,
+                        np.flatnonzero(
+                            (path_type == path_) & (period == period_)),
+                        blocks, flat_idx, values)
+            del chunk, values
+    return buckets
+
+def _read_staged_skims(buckets, group, column, lo, hi, num_zones,
+                       rows_per_block):
+    """ Rows lo to hi of the OD matrix of a group and column, built from its
+    bucket (see `_stream_raw_beam_skims`). Cells without records are NaN,
+    and the last record of a repeated cell wins."""
+    mtx = np.full((hi - lo) * num_zones, np.nan)
+    bucket = buckets.get((group, lo // rows_per_block))
+    if bucket is not None:
+        mtx[bucket.flat_idx[:]] = bucket._f_get_child(column)[:]
+    return mtx.reshape(hi - lo, num_zones)
+
+def _stream_skims_to_omx(settings, year, order, data_dir, chunk_size):
+    """ Bounded-memory alternative to building skims.omx from a fully loaded
+    BEAM skims dataframe. Values are streamed into on-disk buckets by row
+    block and then written to skims.omx one block of rows at a time,
+    applying the same missing value rules as `_distance_skims`,
+    `_auto_skims` and `_transit_skims`. Unlike the in-memory path, repeated
+    OD pairs are not rejected: the last record in the file wins.
+    """
+    logger.info(
+        "Streaming BEAM skims into skims.omx in chunks of {0} records.".format(
+            chunk_size))
+    periods = settings['periods']
+    hwy_paths = settings['hwy_paths']
+    hwy_measure_map = settings['beam_asim_hwy_measure_map']
+    transit_measure_map = settings['beam_asim_transit_measure_map']
+    num_zones = len(order)
+    rows_per_block = max(1, chunk_size // num_zones)
+
+    staging_path = os.path.join(data_dir, 'skims_staging.h5')
+    staging = tables.open_file(staging_path, 'w')
+    skims = read_skims(settings, mode='a', data_dir=data_dir)
+    try:
+        buckets = _stream_raw_beam_skims(settings, order, staging, chunk_size)
+
+        def read_staged(group, column, lo, hi):
+            return _read_staged_skims(
+                buckets, group, column, lo, hi, num_zones, rows_per_block)
+
+        # Distance skims
+        logger.info("Creating distance skims.")
+        dist_column = hwy_measure_map['DIST']
+        dist_matrix = _create_skim_matrix(
+            skims, ['DIST', 'DISTBIKE', 'DISTWALK'], num_zones, settings)
+        for lo, hi in _row_blocks(num_zones, rows_per_block):
+            dist = read_staged('DIST', dist_column, lo, hi)
+            missing = np.isnan(dist)
+            if missing.any():
+                orig, dest = np.where(missing)
+                logger.info(
+                    "Imputing {} missing distance skims.".format(len(orig)))
+                centroids = read_zone_centroids(settings, year)
+                dist[orig, dest] = impute_distances(centroids, orig + lo, dest)
+            assert not np.isnan(dist).any()
+            dist_matrix[lo:hi] = dist
+
+        # Auto skims
+        logger.info("Creating drive skims.")
+        for period in periods:
+            for measure, column in hwy_measure_map.items():
+                names = ['{0}_{1}__{2}'.format(path, measure, period)
+                         for path in hwy_paths]
+                if not column:
+                    _write_skim_matrix(skims, names, None, num_zones, settings)
+                    continue
+                matrix = _create_skim_matrix(skims, names, num_zones, settings)
+                for lo, hi in _row_blocks(num_zones, rows_per_block):
+                    mtx = read_staged(period, column, lo, hi)
+                    missing = np.isnan(mtx)
+                    if missing.any():
+                        missing_measure = dist_matrix[lo:hi][missing]
+                        if measure == 'DIST':
+                            mtx[missing] = missing_measure
+                        elif measure == 'TIME':
+                            mtx[missing] = missing_measure * (60/40) # Assumes average speed of 40 miles/hour
+                        else:
+                            mtx[missing] = 0 ## Assumes no toll or payment
+                    matrix[lo:hi] = mtx
+
+        # Transit skims
+        logger.info("Creating transit skims.")
+        for path_, paths in _transit_paths_by_beam_path(settings).items():
+            for period in periods:
+                for measure, column in transit_measure_map.items():
+                    names = ['{0}_{1}__{2}'.format(path, measure, period)
+                             for path in paths]
+                    if not column:
+                        _write_skim_matrix(
+                            skims, names, None, num_zones, settings)
+                        continue
+                    matrix = _create_skim_matrix(
+                        skims, names, num_zones, settings)
+                    for lo, hi in _row_blocks(num_zones, rows_per_block):
+                        mtx = read_staged((path_, period), column, lo, hi)
+                        mtx[np.isnan(mtx)] = 0
+                        if (measure != 'FAR') and (measure != 'BOARDS'):
+                            # see _transit_group_skims for the x100 scaling
+                            mtx = mtx * 100
+                        matrix[lo:hi] = mtx
+    finally:
+        skims.close()
+        staging.close()
+        os.remove(staging_path)
+
+def _skim_objects(skims_path):
+    """ HDF5 object of every skims.omx matrix, by matrix name. Names hard
+    linked to the same matrix (see `_write_skim_matrix`) share an object."""
+    with h5py.File(skims_path, 'r') as f:
+        data = f['data']
+        return {
+            name: h5py.h5g.get_objinfo(data.id, name.encode()).objno
+            for name in data.keys()}
+
+def _patch_skim_matrices(skims, objects, names, orig_idx, dest_idx, values,
+                         rows_per_block):
+    """ Patches the matrices stored under names, writing every matrix once
+    however many names are linked to it."""
+    patched = set()
+    for name in names:
+        if objects[name] not in patched:
+            _patch_omx_matrix(
+                skims[name], orig_idx, dest_idx, values, rows_per_block)
+            patched.add(objects[name])
+
+def _skims_deltas_path(data_dir):
+    return os.path.join(data_dir, 'skims_deltas.json')
+
+def read_skims_deltas(data_dir):
+    """ Skims patch files (see `merge_current_skims`) the skims.omx of a
+    folder has not been patched with yet. """
+    path = _skims_deltas_path(data_dir)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+def _write_skims_deltas(data_dir, delta_paths):
+    path = _skims_deltas_path(data_dir)
+    if not delta_paths:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    os.makedirs(data_dir, exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(delta_paths, f)
+    os.replace(path + '.tmp', path)
+
+def add_skims_delta(settings, patch_path, data_dir=None):
+    """ Records a skims patch file written by `merge_current_skims` after a
+    BEAM run. The pending files are listed next to skims.omx, so a restart
+    between BEAM and ActivitySim still patches the skims with them. """
+    if data_dir is None:
+        data_dir = settings['asim_local_input_folder']
+    _write_skims_deltas(data_dir, read_skims_deltas(data_dir) + [patch_path])
+
+def _read_skims_patches(settings, year, patch_paths, order):
+    """ Merged BEAM skims records of the OD pairs of the skims patch files,
+    cleaned like the full BEAM skims. An OD pair found in several files
+    keeps the records of the latest one, which are sorted by their position
+    in the merged BEAM skims.
+
+    Returns:
+    --------
+    - pandas.DataFrame of the records.
+    - numpy.array of the flat OD position of every record, see
+      `_patch_skims_from_beam_deltas`.
+    """
+    dtype = dict(beam_skims_types, merged_pos=np.int64)
+    patches = []
+    for patch_num, path in enumerate(patch_paths):
+        df = pd.read_csv(path, dtype=dtype)
+        orig_idx, dest_idx = _od_positions(df, 'origin', 'destination', order)
+        df['flat_idx'] = orig_idx.astype(np.int64) * len(order) + dest_idx
+        df['patch_num'] = patch_num
+        patches.append(df)
+    df = pd.concat(patches, ignore_index=True)
+    latest = df.groupby('flat_idx')['patch_num'].transform('max')
+    df = df[df['patch_num'].values == latest.values]
+    df = df.sort_values('merged_pos', kind='mergesort').reset_index(drop=True)
+    flat_idx = df['flat_idx'].values
+    df = df.drop(columns=['merged_pos', 'flat_idx', 'patch_num'])
+    return _raw_beam_skims_preprocess(settings, year, df), flat_idx
+
+def _patch_skims_from_beam_deltas(settings, year, delta_paths, order,
+                                  data_dir=None):
+    """ Updates an existing skims.omx in place after BEAM iterations that
+    only produced partial skims, instead of rebuilding every matrix.
+
+    Every patch file holds all the merged BEAM skims records of the OD
+    pairs of a partial BEAM skims file (see `merge_current_skims`), so the
+    skims of these OD pairs are rebuilt from the patch files alone,
+    following the same rules as `_distance_skims`, `_auto_skims` and
+    `_transit_skims`:
+
+    - distances, from the last auto record of every OD pair in the merged
+      skims, or imputed.
+    - auto skims in every period, since the distances their missing values
+      are imputed from may have changed.
+    - transit skims of the (path, period, OD) combinations with records.
+
+    Every matrix is patched once, however many names are linked to it, and
+    only its rows holding patched cells are written.
+
+    Parameters:
+    ------------
+    - settings:
+    - year:
+    - delta_paths: list
+        Skims patch files written since skims.omx was last updated, see
+        `add_skims_delta`.
+    - order: numpy.array
+        zone_id order of the skim matrices.
+    """
+    periods = settings['periods']
+    hwy_paths = settings['hwy_paths']
+    hwy_measure_map = settings['beam_asim_hwy_measure_map']
+    transit_measure_map = settings['beam_asim_transit_measure_map']
+    num_zones = len(order)
+    rows_per_block = max(1, (
+        settings.get('skims_chunk_size', None) or 1000000) // num_zones)
+
+    patch_df, flat = _read_skims_patches(settings, year, delta_paths, order)
+    path_type = patch_df['pathType'].astype(str).values
+    period_ = patch_df['timePeriod'].astype(str).values
+    is_hwy = np.isin(path_type, hwy_paths)
+
+    if data_dir is None:
+        data_dir = settings['asim_local_input_folder']
+    objects = _skim_objects(os.path.join(data_dir, 'skims.omx'))
+    skims = read_skims(settings, mode='a', data_dir=data_dir)
+
+    # Distance skims
+    flat_idx = np.unique(flat)
+    logger.info("Patching skims of {0} OD pairs.".format(len(flat_idx)))
+    rows = np.flatnonzero(is_hwy)
+    # the last record of every OD pair, as in _distance_skims
+    rows = rows[~pd.Series(flat[rows]).duplicated(keep='last').values]
+    dist_column = hwy_measure_map['DIST']
+    dist = np.full(len(flat_idx), np.nan)
+    dist[np.searchsorted(flat_idx, flat[rows])] = \
+        patch_df[dist_column].values[rows]
+    orig_idx, dest_idx = flat_idx // num_zones, flat_idx % num_zones
+    missing = np.isnan(dist)
+    if missing.any():
+        logger.info("Imputing {} missing distance skims.".format(missing.sum()))
+        centroids = read_zone_centroids(settings, year)
+        dist[missing] = impute_distances(
+            centroids, orig_idx[missing], dest_idx[missing])
+    _patch_skim_matrices(
+        skims, objects, ['DIST', 'DISTBIKE', 'DISTWALK'], orig_idx, dest_idx,
+        dist, rows_per_block)
+
+    # Auto skims
+    for period in periods:
+        period_rows = np.flatnonzero(is_hwy & (period_ == period))
+        positions = np.searchsorted(flat_idx, flat[period_rows])
+        if len(np.unique(positions)) != len(positions):
+            raise ValueError("Index contains duplicate entries, cannot reshape")
+        for measure, column in hwy_measure_map.items():
+            if not column:
+                continue
+            values = np.full(len(flat_idx), np.nan)
+            values[positions] = patch_df[column].values[period_rows]
+            missing = np.isnan(values)
+            if measure == 'DIST':
+                values[missing] = dist[missing]
+            elif measure == 'TIME':
+                values[missing] = dist[missing] * (60/40) # Assumes average speed of 40 miles/hour
+            else:
+                values[missing] = 0 ## Assumes no toll or payment
+            names = ['{0}_{1}__{2}'.format(path, measure, period)
+                     for path in hwy_paths]
+            _patch_skim_matrices(
+                skims, objects, names, orig_idx, dest_idx, values,
+                rows_per_block)
+
+    # Transit skims
+    for path_, paths in _transit_paths_by_beam_path(settings).items():
+        for period in periods:
+            rows = np.flatnonzero((path_type == path_) & (period_ == period))
+            if len(rows) == 0:
+                continue
+            cells = flat[rows]
+            if len(np.unique(cells)) != len(cells):
+                raise ValueError(
+                    "Index contains duplicate entries, cannot reshape")
+            orig_idx, dest_idx = cells // num_zones, cells % num_zones
+            for measure, column in transit_measure_map.items():
+                if not column:
+                    continue
+                values = patch_df[column].values[rows].astype(float)
+                values[np.isnan(values)] = 0
+                if (measure != 'FAR') and (measure != 'BOARDS'):
+                    # see _transit_group_skims for the x100 scaling
+                    values = values * 100
+                names = ['{0}_{1}__{2}'.format(path, measure, period)
+                         for path in paths]
+                _patch_skim_matrices(
+                    skims, objects, names, orig_idx, dest_idx, values,
+                    rows_per_block)
+    skims.close()
+
 def create_skims_from_beam(settings, year,
                            output_dir=None,
                            overwrite=True):
@@ -524,10 +1296,44 @@ def create_skims_from_beam(settings, year,
     if static_skims:
         overwrite = False
 
-    new = _create_skim_object(settings, overwrite, output_dir=output_dir)
+    # Optional incremental mode: patch the existing skims with the partial
+    # BEAM skims produced since they were built (see run_traffic_assignment)
+    delta_paths = read_skims_deltas(output_dir)
+    skims_exist = os.path.exists(os.path.join(output_dir, 'skims.omx'))
+    incremental = settings.get('incremental_skims', False) and overwrite \
+        and skims_exist and (len(delta_paths) > 0)
+    if incremental and not all(os.path.exists(p) for p in delta_paths):
+        logger.warning(
+            "Skims patch files not found, rebuilding skims.omx instead.")
+        incremental = False
+    if delta_paths and not overwrite:
+        logger.warning(
+            "skims.omx is not up to date with the last {0} BEAM runs.".format(
+                len(delta_paths)))
+
+    if incremental:
+        order = zone_order(settings, year)
+        _patch_skims_from_beam_deltas(
+            settings, year, delta_paths, order, data_dir=output_dir)
+        new = False
+    else:
+        new = _create_skim_object(settings, overwrite, output_dir=output_dir)
+    if overwrite:
+        # skims are now up to date with every BEAM skims produced so far
+        _write_skims_deltas(output_dir, [])
     validation = settings.get('asim_validation', False)
 
-    if new:
+    # Optional bounded-memory mode: number of BEAM skims records to read at
+    # once instead of loading the whole file.
+    chunk_size = settings.get('skims_chunk_size', None)
+
+    if new and chunk_size:
+        order = zone_order(settings, year)
+        _stream_skims_to_omx(
+            settings, year, order, output_dir, chunk_size)
+        _create_offset(settings, order, data_dir=output_dir)
+
+    elif new:
         order = zone_order(settings, year)
         skims_df = _load_raw_beam_skims(settings)
         skims_df = _raw_beam_skims_preprocess(settings, year, skims_df)
@@ -535,8 +1341,13 @@ def create_skims_from_beam(settings, year,
 
         # Create skims
         _distance_skims(settings, year, auto_df, order, data_dir=output_dir)
-        _auto_skims(settings, auto_df, order, data_dir=output_dir)
-        _transit_skims(settings, transit_df, order, data_dir=output_dir)
+        num_processes = settings.get('skims_num_processes', 1)
+        if num_processes > 1:
+            _parallel_skims(settings, auto_df, transit_df, order,
+                            num_processes, data_dir=output_dir)
+        else:
+            _auto_skims(settings, auto_df, order, data_dir=output_dir)
+            _transit_skims(settings, transit_df, order, data_dir=output_dir)
 
         # Create offset
         _create_offset(settings, order, data_dir=output_dir)
@@ -685,59 +1496,56 @@ def _get_part_time_enrollment(state_fips):
     assert s.index.name == 'unitid'
     return s
 
+def _index_positions(ids, index):
+    """ Position of every id in index, -1 for null or unknown ids. Ids are
+    factorized first so each distinct id is only looked up once."""
+    codes, uniques = pd.factorize(ids)
+    return np.append(index.get_indexer(uniques), -1)[codes]
+
 def _update_persons_table(persons, households, blocks, asim_zone_id_col='TAZ'):
 
-    # assign zones
-    persons[asim_zone_id_col] = blocks[asim_zone_id_col].reindex(
-        households['block_id'].reindex(persons['household_id']).values).values
+    # assign zones and home coordinates, joining persons to blocks
+    # through households by position (-1 where either is missing)
+    household_blocks = _index_positions(
+        households['block_id'].values, blocks.index)
+    home_blocks = np.append(household_blocks, -1)[
+        households.index.get_indexer(persons['household_id'])]
+    home_blocks = blocks[[asim_zone_id_col, 'x', 'y']].reset_index(
+        drop=True).reindex(home_blocks)
+    persons[asim_zone_id_col] = home_blocks[asim_zone_id_col].values
     persons[asim_zone_id_col] = persons[asim_zone_id_col].astype(str)
 
     # create new column variables
-    age_mask_1 = persons.age >= 18
-    age_mask_2 = persons.age.between(18, 64, inclusive=True)
-    age_mask_3 = persons.age >= 65
-    work_mask = persons.worker == 1
-    student_mask = persons.student == 1
-    type_1 = ((age_mask_1) & (work_mask) & (~student_mask)) * 1  # Full time
-    type_4 = ((age_mask_2) & (~work_mask) & (~student_mask)) * 4
-    type_5 = ((age_mask_3) & (~work_mask) & (~student_mask)) * 5
-    type_3 = ((age_mask_1) & (student_mask)) * 3
-    type_6 = (persons.age.between(16, 17, inclusive=True)) * 6
-    type_7 = (persons.age.between(6, 16, inclusive=True)) * 7
-    type_8 = (persons.age.between(0, 5, inclusive=True)) * 8
-    type_list = [
-        type_1, type_3, type_4, type_5, type_6, type_7, type_8]
-    for x in type_list:
-        type_1.where(type_1 != 0, x, inplace=True)
-    persons['ptype'] = type_1
-
-    pemploy_1 = ((persons.worker == 1) & (persons.age >= 16)) * 1
-    pemploy_3 = ((persons.worker == 0) & (persons.age >= 16)) * 3
-    pemploy_4 = (persons.age < 16) * 4
-    type_list = [pemploy_1, pemploy_3, pemploy_4]
-    for x in type_list:
-        pemploy_1.where(pemploy_1 != 0, x, inplace=True)
-    persons['pemploy'] = pemploy_1
-
-    pstudent_1 = (persons.age <= 18) * 1
-    pstudent_2 = ((persons.student == 1) & (persons.age > 18)) * 2
-    pstudent_3 = (persons.student == 0) * 3
-    type_list = [pstudent_1, pstudent_2, pstudent_3]
-    for x in type_list:
-        pstudent_1.where(pstudent_1 != 0, x, inplace=True)
-    persons['pstudent'] = pstudent_1
-
-    persons_w_res_blk = pd.merge(
-        persons, households[['block_id']],
-        left_on='household_id', right_index=True)
-    persons_w_xy = pd.merge(
-        persons_w_res_blk, blocks[['x', 'y']],
-        left_on='block_id', right_index=True)
-    persons['home_x'] = persons_w_xy['x']
-    persons['home_y'] = persons_w_xy['y']
-
-    del persons_w_res_blk
-    del persons_w_xy
+    age = persons['age'].values
+    work_mask = (persons['worker'] == 1).values
+    student_mask = (persons['student'] == 1).values
+    adult_mask = age >= 18
+    age_16p_mask = age >= 16
+
+    # conditions are in priority order: the first one that holds wins
+    persons['ptype'] = np.select([
+        adult_mask & work_mask & ~student_mask,  # Full time
+        adult_mask & student_mask,
+        adult_mask & (age <= 64) & ~work_mask & ~student_mask,
+        (age >= 65) & ~work_mask & ~student_mask,
+        (age >= 16) & (age <= 17),
+        (age >= 6) & (age <= 16),
+        (age >= 0) & (age <= 5)], [1, 3, 4, 5, 6, 7, 8], default=0)
+
+    persons['pemploy'] = np.select([
+        work_mask & age_16p_mask,
+        (persons['worker'] == 0).values & age_16p_mask,
+        age < 16], [1, 3, 4], default=0)
+
+    persons['pstudent'] = np.select([
+        age <= 18,
+        student_mask & (age > 18),
+        (persons['student'] == 0).values], [1, 2, 3], default=0)
+
+    persons['home_x'] = home_blocks['x'].values
+    persons['home_y'] = home_blocks['y'].values
+
+    del home_blocks
 
     # clean up dataframe structure
     # TODO: move this to annotate_persons.yaml in asim settings
@@ -778,49 +1586,70 @@ def _update_households_table(households, blocks, asim_zone_id_col='TAZ'):
 
     return households
 
-def _update_jobs_table(
-        jobs, blocks, state_fips, county_codes, local_crs,
-        asim_zone_id_col='TAZ'):
+def _update_jobs_table(jobs, blocks, local_crs, asim_zone_id_col='TAZ'):
 
     # assign zones
-    jobs[asim_zone_id_col] = blocks[asim_zone_id_col].reindex(
-        jobs['block_id']).values
+    job_blocks = blocks[[asim_zone_id_col, 'square_meters_land']].reset_index(
+        drop=True).reindex(_index_positions(jobs['block_id'].values, blocks.index))
+    jobs[asim_zone_id_col] = job_blocks[asim_zone_id_col].values
 
     jobs[asim_zone_id_col] = jobs[asim_zone_id_col].astype(str)
 
     # make sure jobs are only assigned to blocks with land area > 0
     # so that employment density distributions don't contain Inf/NaN
-    blocks = blocks[['square_meters_land']]
-    jobs['square_meters_land'] = blocks.reindex(
-        jobs['block_id'])['square_meters_land'].values
+    jobs['square_meters_land'] = job_blocks['square_meters_land'].values
+    del job_blocks
     jobs_w_no_land = jobs[jobs['square_meters_land'] == 0]
     blocks_to_reassign = jobs_w_no_land['block_id'].unique()
     num_reassigned = len(blocks_to_reassign)
 
-    if num_reassigned > 0:
-
-        logger.info("Reassigning jobs out of blocks with no land area!")
-        blocks_gdf = get_block_geoms(state_fips, county_codes)
-        blocks_gdf.set_index('GEOID', inplace=True)
-        blocks_gdf['square_meters_land'] = blocks[
-            'square_meters_land'].reindex(blocks_gdf.index)
-        blocks_gdf = blocks_gdf.to_crs(local_crs)
-
-        for block_id in tqdm(
-                blocks_to_reassign,
-                desc="Redistributing jobs from blocks:"):
-
-            candidate_mask = (
-                blocks_gdf.index.values != block_id) & (
-                blocks_gdf['square_meters_land'] > 0)
-            new_block_id = blocks_gdf[candidate_mask].distance(
-                blocks_gdf.loc[block_id, 'geometry']).idxmin()
-
-            jobs.loc[
-                jobs['block_id'] == block_id, 'block_id'] = new_block_id
-
-    else:
+    if num_reassigned == 0:
         logger.info("No block IDs to reassign in the jobs table!")
+        return num_reassigned, jobs
+
+    # nearest block with land, by projected block centroid
+    blocks_xy = gpd.GeoSeries(
+        gpd.points_from_xy(blocks['x'], blocks['y']),
+        index=blocks.index, crs='EPSG:4326').to_crs(local_crs)
+    blocks_xy = np.column_stack([blocks_xy.x.values, blocks_xy.y.values])
+    locatable = np.isfinite(blocks_xy).all(axis=1)
+    candidate_mask = (blocks['square_meters_land'] > 0).values & locatable
+
+    # blocks without a centroid keep their jobs
+    query_pos = blocks.index.get_indexer(blocks_to_reassign)
+    unlocatable = ~locatable[query_pos]
+    if unlocatable.any():
+        logger.warning(
+            "Not reassigning jobs out of {0} blocks with no land area and "
+            "no coordinates, e.g. {1}".format(
+                unlocatable.sum(),
+                list(blocks_to_reassign[unlocatable][:10])))
+        blocks_to_reassign = blocks_to_reassign[~unlocatable]
+        query_pos = query_pos[~unlocatable]
+        num_reassigned = len(blocks_to_reassign)
+
+    # so do all jobs if there is no block to move them to
+    if (num_reassigned > 0) and not candidate_mask.any():
+        logger.warning(
+            "Not reassigning jobs out of {0} blocks with no land area, no "
+            "block has both land area and coordinates!".format(
+                num_reassigned))
+        num_reassigned = 0
+    if num_reassigned == 0:
+        return num_reassigned, jobs
+
+    logger.info(
+        "Reassigning jobs out of {0} blocks with no land area!".format(
+            num_reassigned))
+    tree = cKDTree(blocks_xy[candidate_mask])
+    _, nearest = tree.query(blocks_xy[query_pos])
+    new_block_ids = pd.Series(
+        blocks.index.values[candidate_mask][nearest],
+        index=blocks_to_reassign)
+
+    to_reassign = jobs['block_id'].isin(blocks_to_reassign)
+    jobs.loc[to_reassign, 'block_id'] = jobs.loc[
+        to_reassign, 'block_id'].map(new_block_ids)
 
     return num_reassigned, jobs
 
@@ -845,21 +1674,22 @@ def _update_blocks_table(settings, year, blocks,
 
     if zone_id_col not in blocks.columns:
 
-        mapping = geoid_to_zone_map(settings, year)
+        zone_index = get_zone_index(settings, year)
 
         if zone_type == 'block':
             logger.info("Mapping block IDs")
-            blocks[zone_id_col] = blocks.index.astype(str).replace(mapping)
+            blocks[zone_id_col] = zone_index.lookup(
+                blocks.index.astype(str), keep_missing=True)
 
         elif zone_type == 'block_group':
             logger.info("Mapping blocks to block group IDS")
-            blocks[zone_id_col] = blocks.block_group_id.astype(str).replace(
-                mapping)
+            blocks[zone_id_col] = zone_index.lookup(
+                blocks.block_group_id.astype(str), keep_missing=True)
 
         elif zone_type == 'taz':
             logger.info("Mapping block IDs to TAZ")
-            blocks[zone_id_col] = blocks.index.astype(str)
-            blocks[zone_id_col] = blocks[zone_id_col].replace(mapping)
+            blocks[zone_id_col] = zone_index.lookup(
+                blocks.index.astype(str), keep_missing=True)
 
         geoid_to_zone_mapping_updated = True
 
@@ -1027,7 +1857,7 @@ def enrollment_tables(settings, zones,
         enrollment_df = enrollment[['x', 'y']].copy()
         enrollment_df.index.name = 'school_id'
         enrollment[asim_zone_id_col] = get_zone_from_points(
-            enrollment_df, zones, local_crs)
+            enrollment_df, zones, local_crs, zone_system_name(settings))
 
         enrollment = enrollment.dropna(subset = [asim_zone_id_col])
         enrollment[asim_zone_id_col] = enrollment[asim_zone_id_col].astype(str)
@@ -1037,6 +1867,133 @@ def enrollment_tables(settings, zones,
 
     return enrollment
 
+# Zone attributes of the land use table aggregated from the UrbanSim tables,
+# as name: (table, column, aggregation, bucket). Counts only include records
+# with a non-null column value within the bucket. Buckets are (operator,
+# *values) tuples, see `_bucket_mask`.
+LAND_USE_ZONE_AGGREGATIONS = {
+    'TOTHH': ('households', None, 'count', None),
+    'TOTPOP': ('persons', None, 'count', None),
+    'EMPRES': ('households', 'workers', 'sum', None),
+    'HHINCQ1': ('households', 'income', 'count', ('lt', 30000)),
+    'HHINCQ2': ('households', 'income', 'count', ('between', 30000, 59999)),
+    'HHINCQ3': ('households', 'income', 'count', ('between', 60000, 99999)),
+    'HHINCQ4': ('households', 'income', 'count', ('ge', 100000)),
+    'AGE0004': ('persons', 'age', 'count', ('between', 0, 4)),
+    'AGE0519': ('persons', 'age', 'count', ('between', 5, 19)),
+    'AGE2044': ('persons', 'age', 'count', ('between', 20, 44)),
+    'AGE4564': ('persons', 'age', 'count', ('between', 45, 64)),
+    'AGE64P': ('persons', 'age', 'count', ('ge', 65)),
+    'AGE62P': ('persons', 'age', 'count', ('ge', 62)),
+    'TOTEMP': ('jobs', None, 'count', None),
+    'RETEMPN': ('jobs', 'sector_id', 'count', ('isin', ['44-45'])),
+    'FPSEMPN': ('jobs', 'sector_id', 'count', ('isin', ['52', '54'])),
+    'HEREMPN': ('jobs', 'sector_id', 'count', ('isin', ['61', '62', '71'])),
+    'AGREMPN': ('jobs', 'sector_id', 'count', ('isin', ['11'])),
+    'MWTEMPN': ('jobs', 'sector_id', 'count', (
+        'isin', ['42', '31-33', '32', '48-49'])),
+    'OTHEMPN': ('jobs', 'sector_id', 'count', ('notin', [
+        '44-45', '52', '54', '61', '62', '71', '11', '42', '31-33', '32',
+        '48-49'])),
+    'TOTACRE': ('blocks', 'TOTACRE', 'sum', None),
+    'HSENROLL': ('schools', 'enrollment', 'sum', None),
+    'COLLFTE': ('colleges', 'full_time_enrollment', 'sum', None),
+    'COLLPTE': ('colleges', 'part_time_enrollment', 'sum', None),
+}
+
+def _bucket_mask(values, bucket, factorized=None):
+    """ Boolean mask of the non-null values within bucket. Buckets are
+    ('lt', x), ('ge', x), ('between', lo, hi) (inclusive), ('isin', list)
+    or ('notin', list). Set buckets are evaluated on the distinct values,
+    pass `factorized` (the output of pd.factorize(values)) to reuse them
+    across buckets."""
+    if bucket is None:
+        return pd.notnull(values)
+    op = bucket[0]
+    if op == 'lt':
+        return values < bucket[1]
+    elif op == 'ge':
+        return values >= bucket[1]
+    elif op == 'between':
+        return (values >= bucket[1]) & (values <= bucket[2])
+    elif op in ['isin', 'notin']:
+        codes, uniques = factorized or pd.factorize(values)
+        in_bucket = pd.Index(uniques).isin(bucket[1])
+        if op == 'notin':
+            in_bucket = ~in_bucket
+        # null values have code -1
+        return np.append(in_bucket, False)[codes]
+    raise ValueError("Unknown bucket operator {0}".format(op))
+
+def aggregate_by_zone(zone_index, tables, aggregations,
+                      asim_zone_id_col='TAZ'):
+    """
+    Counts and sums records of several tables by zone. Zone ids of every
+    table are mapped to zone positions once, and every attribute is then
+    computed with a single np.bincount pass. Float sums group by zone
+    position instead, to keep pandas' summation and its exact results.
+
+    Results match a groupby on the zone id column reindexed to zone_index
+    and filled with 0: attributes are integers only if every zone has at
+    least one record, floats otherwise.
+
+    Parameters:
+    ------------
+    - zone_index: pandas Index. Zone ids of the output.
+    - tables: dict of pandas DataFrames with an asim_zone_id_col column.
+    - aggregations: dict, see LAND_USE_ZONE_AGGREGATIONS.
+
+    Returns:
+    ---------
+    dict of pandas Series indexed by zone_index, in aggregations order.
+    """
+    num_zones = len(zone_index)
+    positions = {}
+    factorized = {}
+    results = {}
+    for name, (table_name, column, how, bucket) in aggregations.items():
+        table = tables[table_name]
+        if table_name not in positions:
+            positions[table_name] = _index_positions(
+                table[asim_zone_id_col].values, zone_index)
+        pos = positions[table_name]
+        mask = pos != -1
+        if (bucket is not None) and (bucket[0] in ['isin', 'notin']) and \
+                ((table_name, column) not in factorized):
+            factorized[(table_name, column)] = pd.factorize(
+                table[column].values)
+
+        if how == 'count':
+            if column is not None:
+                mask &= _bucket_mask(
+                    table[column].values, bucket,
+                    factorized.get((table_name, column)))
+            agg = np.bincount(pos[mask], minlength=num_zones)
+            present = agg > 0
+        elif how == 'sum':
+            values = table[column].values
+            if bucket is not None:
+                mask &= _bucket_mask(
+                    values, bucket, factorized.get((table_name, column)))
+            weights = values[mask]
+            present = np.bincount(pos[mask], minlength=num_zones) > 0
+            if np.issubdtype(weights.dtype, np.integer):
+                agg = np.bincount(
+                    pos[mask], weights=weights, minlength=num_zones).astype(
+                    np.int64)
+            else:
+                # pandas' own float summation, on integer zone positions
+                sums = pd.Series(weights).groupby(pos[mask]).sum()
+                agg = np.zeros(num_zones)
+                agg[sums.index.values] = sums.values
+        else:
+            raise ValueError("Unknown aggregation {0}".format(how))
+
+        if not present.all():
+            agg = agg.astype(float)
+        results[name] = pd.Series(agg, index=zone_index)
+    return results
+
 def _create_land_use_table(
         settings, region, zones, state_fips, county_codes, local_crs,
         households, persons, jobs, blocks, asim_zone_id_col='TAZ'):
@@ -1064,29 +2021,19 @@ def _create_land_use_table(
         zones['TRACT'] = zones['TRACT'].astype(str)
         zones['BLKGRP'] = zones['BLKGRP'].astype(str)
 
-    zones['TOTHH'] = households[asim_zone_id_col].groupby(households[asim_zone_id_col]).count().reindex(zones.index).fillna(0)
-    zones['TOTPOP'] = persons[asim_zone_id_col].groupby(persons[asim_zone_id_col]).count().reindex(zones.index).fillna(0)
-    zones['EMPRES'] = households[[asim_zone_id_col,'workers']].groupby(asim_zone_id_col)['workers'].sum().reindex(zones.index).fillna(0)
-    zones['HHINCQ1'] = households.loc[households['income'] < 30000, [asim_zone_id_col,'income']].groupby(asim_zone_id_col)['income'].count().reindex(zones.index).fillna(0)
-    zones['HHINCQ2'] = households.loc[households['income'].between(30000, 59999), [asim_zone_id_col,'income']].groupby(asim_zone_id_col)['income'].count().reindex(zones.index).fillna(0)
-    zones['HHINCQ3'] = households.loc[households['income'].between(60000, 99999), [asim_zone_id_col,'income']].groupby(asim_zone_id_col)['income'].count().reindex(zones.index).fillna(0)
-    zones['HHINCQ4'] = households.loc[households['income'] >= 100000, [asim_zone_id_col,'income']].groupby(asim_zone_id_col)['income'].count().reindex(zones.index).fillna(0)
-    zones['AGE0004'] = persons.loc[persons['age'].between(0,4), [asim_zone_id_col, 'age']].groupby(asim_zone_id_col)['age'].count().reindex(zones.index).fillna(0)
-    zones['AGE0519'] = persons.loc[persons['age'].between(5,19), [asim_zone_id_col, 'age']].groupby(asim_zone_id_col)['age'].count().reindex(zones.index).fillna(0)
-    zones['AGE2044'] = persons.loc[persons['age'].between(20,44), [asim_zone_id_col, 'age']].groupby(asim_zone_id_col)['age'].count().reindex(zones.index).fillna(0)
-    zones['AGE4564'] = persons.loc[persons['age'].between(45,64), [asim_zone_id_col, 'age']].groupby(asim_zone_id_col)['age'].count().reindex(zones.index).fillna(0)
-    zones['AGE64P'] = persons.loc[persons['age'] >= 65, [asim_zone_id_col, 'age']].groupby(asim_zone_id_col)['age'].count().reindex(zones.index).fillna(0)
-    zones['AGE62P'] = persons.loc[persons['age'] >= 62, [asim_zone_id_col, 'age']].groupby(asim_zone_id_col)['age'].count().reindex(zones.index).fillna(0)
+    zone_attrs = aggregate_by_zone(zones.index, {
+        'households': households, 'persons': persons, 'jobs': jobs,
+        'blocks': blocks, 'schools': schools, 'colleges': colleges},
+        LAND_USE_ZONE_AGGREGATIONS, asim_zone_id_col)
+
+    for attr in ['TOTHH', 'TOTPOP', 'EMPRES', 'HHINCQ1', 'HHINCQ2', 'HHINCQ3',
+                 'HHINCQ4', 'AGE0004', 'AGE0519', 'AGE2044', 'AGE4564',
+                 'AGE64P', 'AGE62P']:
+        zones[attr] = zone_attrs[attr]
     zones['SHPOP62P'] = (zones.AGE62P / zones.TOTPOP).reindex(zones.index).fillna(0)
-    zones['TOTEMP'] = jobs[asim_zone_id_col].groupby(jobs[asim_zone_id_col]).count().reindex(zones.index).fillna(0)
-    zones['RETEMPN'] = jobs.loc[jobs['sector_id'].isin(['44-45']), [asim_zone_id_col, 'sector_id']].groupby(asim_zone_id_col)['sector_id'].count().reindex(zones.index).fillna(0)
-    zones['FPSEMPN'] = jobs.loc[jobs['sector_id'].isin(['52', '54']), [asim_zone_id_col, 'sector_id']].groupby(asim_zone_id_col)['sector_id'].count().reindex(zones.index).fillna(0)
-    zones['HEREMPN'] = jobs.loc[jobs['sector_id'].isin(['61', '62', '71']), [asim_zone_id_col, 'sector_id']].groupby(asim_zone_id_col)['sector_id'].count().reindex(zones.index).fillna(0)
-    zones['AGREMPN'] = jobs.loc[jobs['sector_id'].isin(['11']), [asim_zone_id_col, 'sector_id']].groupby(asim_zone_id_col)['sector_id'].count().reindex(zones.index).fillna(0)
-    zones['MWTEMPN'] = jobs.loc[jobs['sector_id'].isin(['42', '31-33', '32', '48-49']), [asim_zone_id_col, 'sector_id']].groupby(asim_zone_id_col)['sector_id'].count().reindex(zones.index).fillna(0)
-    zones['OTHEMPN'] = jobs.loc[~jobs['sector_id'].isin(['44-45', '52', '54', '61', '62', '71', '11', '42', '31-33', '32', '48-49']), [asim_zone_id_col, 'sector_id']].groupby(asim_zone_id_col)['sector_id'].count().reindex(zones.index).fillna(0)
-    zones['TOTACRE'] = blocks[['TOTACRE', asim_zone_id_col]].groupby(asim_zone_id_col)['TOTACRE'].sum().reindex(zones.index).fillna(0)
-    zones['HSENROLL'] = schools[['enrollment', asim_zone_id_col]].groupby(asim_zone_id_col)['enrollment'].sum().reindex(zones.index).fillna(0)
+    for attr in ['TOTEMP', 'RETEMPN', 'FPSEMPN', 'HEREMPN', 'AGREMPN',
+                 'MWTEMPN', 'OTHEMPN', 'TOTACRE', 'HSENROLL']:
+        zones[attr] = zone_attrs[attr]
     zones['TOPOLOGY'] = 1 # FIXME
     zones['employment_density'] = zones.TOTEMP / zones.TOTACRE
     zones['pop_density'] = zones.TOTPOP / zones.TOTACRE
@@ -1100,14 +2047,8 @@ def _create_land_use_table(
         zones, [-6.17833544, 17.55155703, 2.0786466],
         ['pop_density', 'hh_density', 'employment_density'],
         ['employment_density', 'pop_density', 'hh_density'])
-    zones['COLLFTE'] = colleges[[
-        asim_zone_id_col, 'full_time_enrollment']].groupby(
-        asim_zone_id_col)['full_time_enrollment'].sum().reindex(
-        zones.index).fillna(0)
-    zones['COLLPTE'] = colleges[[
-        asim_zone_id_col, 'part_time_enrollment']].groupby(
-        asim_zone_id_col)['part_time_enrollment'].sum().reindex(
-        zones.index).fillna(0)
+    zones['COLLFTE'] = zone_attrs['COLLFTE']
+    zones['COLLPTE'] = zone_attrs['COLLPTE']
     zones['TERMINAL'] = 0
     zones['area_type_metric'] = _compute_area_type_metric(zones)
     zones['area_type'] = _compute_area_type(zones)
@@ -1117,6 +2058,45 @@ def _create_land_use_table(
     return zones
 
 
+# Columns this module adds to the ActivitySim input tables, always written
+# when a column whitelist is set in settings['asim_input_columns']
+ASIM_ANNOTATED_COLUMNS = {
+    'households': ['TAZ', 'HHT'],
+    'persons': [
+        'household_id', 'TAZ', 'ptype', 'pemploy', 'pstudent', 'home_x',
+        'home_y'],
+    'land_use': list(LAND_USE_ZONE_AGGREGATIONS.keys()) + [
+        'SHPOP62P', 'TOPOLOGY', 'employment_density', 'pop_density',
+        'hh_density', 'hq1_density', 'PRKCST', 'OPRKCST', 'TERMINAL',
+        'area_type_metric', 'area_type', 'COUNTY'],
+}
+
+def _asim_input_columns(settings, table_name, df):
+    """
+    Columns of an ActivitySim input table to write. If a whitelist is set
+    for the table in settings['asim_input_columns'], only its columns, the
+    keys of settings['asim_from_usim_col_maps'] and the columns added by
+    PILATES are kept. Otherwise every column is kept. Geometry columns are
+    never written.
+    """
+    whitelist = (settings.get('asim_input_columns', None) or {}).get(
+        table_name, None)
+    columns = [
+        col for col in df.columns
+        if (col != 'geometry') and (df[col].dtype.name != 'geometry')]
+    if whitelist is None:
+        return columns
+
+    missing = [col for col in whitelist if col not in df.columns]
+    if missing:
+        logger.warning(
+            "Columns {0} of the {1} column whitelist not found!".format(
+                missing, table_name))
+    col_map = settings.get('asim_from_usim_col_maps', {}).get(table_name, {})
+    keep = set(whitelist) | set(col_map.keys()) | set(
+        ASIM_ANNOTATED_COLUMNS.get(table_name, []))
+    return [col for col in columns if col in keep]
+
 def create_asim_data_from_h5(
         settings, year, warm_start=False, output_dir=None):
     # warm start: year = start_year
@@ -1177,8 +2157,7 @@ def create_asim_data_from_h5(
     # update jobs
     jobs_cols = jobs.columns
     num_reassigned, jobs = _update_jobs_table(
-        jobs, blocks, state_fips, county_codes, local_crs,
-        asim_zone_id_col)
+        jobs, blocks, local_crs, asim_zone_id_col)
 
     if num_reassigned > 0:
         # update data store with new block_id's to avoid triggering
@@ -1195,6 +2174,15 @@ def create_asim_data_from_h5(
         settings, region, zones, state_fips, county_codes, local_crs,
         households, persons, jobs, blocks)
 
-    households.to_csv(os.path.join(output_dir, 'households.csv'))
-    persons.to_csv(os.path.join(output_dir, 'persons.csv'))
-    land_use.to_csv(os.path.join(output_dir, 'land_use.csv'))
+    tables = {
+        'households': households, 'persons': persons, 'land_use': land_use}
+    for table_name, df in tables.items():
+        columns = _asim_input_columns(settings, table_name, df)
+        if len(columns) < len(df.columns):
+            logger.info("Writing {0} of {1} {2} columns.".format(
+                len(columns), len(df.columns), table_name))
+            tables[table_name] = pd.DataFrame(df[columns])
+
+    write_tables(
+        tables, output_dir, formats=settings.get('asim_input_formats', None),
+        num_threads=settings.get('asim_input_write_threads', None))
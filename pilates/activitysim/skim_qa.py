@@ -0,0 +1,282 @@
+import argparse
+import hashlib
+import logging
+import numpy as np
+import openmatrix as omx
+import pandas as pd
+
+logger = logging.getLogger("activitysim.qa")
+
+# Matrix attributes holding the summary statistics of `matrix_stats`
+QA_ATTRS = ['qa_nan', 'qa_zero', 'qa_inf', 'qa_min', 'qa_max', 'qa_mean',
+            'qa_sha1']
+
+# Number of matrix cells read at a time
+DEFAULT_BLOCK_SIZE = 1000000
+
+
+def _rows_per_block(matrix, block_size):
+    return max(1, block_size // max(1, matrix.shape[1]))
+
+
+def _row_blocks(matrix, block_size):
+    num_rows = matrix.shape[0]
+    rows_per_block = _rows_per_block(matrix, block_size)
+    for lo in range(0, num_rows, rows_per_block):
+        yield matrix[lo:min(lo + rows_per_block, num_rows)]
+
+
+class _StatsAccumulator(object):
+    """ Summary statistics of a matrix, updated one block at a time. """
+
+    def __init__(self):
+        self.nan = 0
+        self.zero = 0
+        self.inf = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.sha1 = hashlib.sha1()
+
+    def update(self, block):
+        block = np.ascontiguousarray(block)
+        self.sha1.update(block.tobytes())
+        finite = np.isfinite(block)
+        self.nan += int(np.isnan(block).sum())
+        self.inf += int(np.isinf(block).sum())
+        self.zero += int((block == 0).sum())
+        values = block[finite]
+        if len(values):
+            self.count += len(values)
+            self.total += float(values.sum())
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+
+    def result(self):
+        return {
+            'qa_nan': self.nan,
+            'qa_zero': self.zero,
+            'qa_inf': self.inf,
+            'qa_min': self.min if self.count else np.nan,
+            'qa_max': self.max if self.count else np.nan,
+            'qa_mean': self.total / self.count if self.count else np.nan,
+            'qa_sha1': self.sha1.hexdigest()}
+
+
+def stored_stats(matrix):
+    """
+    Returns the summary statistics stored in the matrix attributes, or None
+    if they were never computed or were invalidated.
+    """
+    attrs = matrix.attrs
+    if not all(attr in attrs for attr in QA_ATTRS):
+        return None
+    return {attr: attrs[attr] for attr in QA_ATTRS}
+
+
+def store_stats(matrix, stats):
+    for attr in QA_ATTRS:
+        matrix.attrs[attr] = stats[attr]
+
+
+def clear_stats(matrix):
+    """ Invalidates the stored summary statistics of a matrix. Called
+    whenever matrix values are modified in place. """
+    for attr in QA_ATTRS:
+        if attr in matrix.attrs:
+            del matrix.attrs[attr]
+
+
+def matrix_stats(matrix, block_size=DEFAULT_BLOCK_SIZE, store=False):
+    """
+    Computes NaN/zero/inf counts, min/max/mean of finite values and a content
+    hash of an OMX matrix, reading `block_size` cells at a time.
+
+    Parameters:
+    ------------
+    - matrix: OMX matrix (PyTables CArray)
+    - block_size: int. Maximum number of cells held in memory.
+    - store: bool. Store the statistics in the matrix attributes, the file
+        must be open in append mode.
+
+    Returns:
+    ---------
+    dict of statistics, keyed by `QA_ATTRS`.
+    """
+    acc = _StatsAccumulator()
+    for block in _row_blocks(matrix, block_size):
+        acc.update(block)
+    stats = acc.result()
+    if store:
+        store_stats(matrix, stats)
+    return stats
+
+
+def summarize_skims(path, block_size=DEFAULT_BLOCK_SIZE, store=False,
+                    recompute=False):
+    """
+    Summary statistics of every matrix of an OMX file.
+
+    Parameters:
+    ------------
+    - path: str. Path to the OMX file.
+    - block_size: int. Maximum number of cells held in memory.
+    - store: bool. Store the statistics in the matrix attributes. The file
+        is only opened for writing if set.
+    - recompute: bool. Ignore previously stored statistics.
+
+    Returns:
+    ---------
+    pandas DataFrame indexed by matrix name.
+    """
+    skims = omx.open_file(path, 'a' if store else 'r')
+    try:
+        summary = {}
+        for name in skims.list_matrices():
+            matrix = skims[name]
+            stats = None if recompute else stored_stats(matrix)
+            if stats is None:
+                stats = matrix_stats(matrix, block_size, store)
+            summary[name] = stats
+    finally:
+        skims.close()
+    summary = pd.DataFrame.from_dict(summary, orient='index', columns=QA_ATTRS)
+    summary.index.name = 'matrix'
+    return summary
+
+
+def _compare_matrices(matrix_a, matrix_b, block_size):
+    """ Statistics of both matrices and of their differences, from a single
+    pass over both. """
+    acc_a = _StatsAccumulator()
+    acc_b = _StatsAccumulator()
+    sq_error = 0.0
+    max_abs_delta = 0.0
+    num_compared = 0
+    nan_mismatch = 0
+    rows_per_block = _rows_per_block(matrix_a, block_size)
+    num_rows = matrix_a.shape[0]
+    for lo in range(0, num_rows, rows_per_block):
+        hi = min(lo + rows_per_block, num_rows)
+        block_a = matrix_a[lo:hi]
+        block_b = matrix_b[lo:hi]
+        acc_a.update(block_a)
+        acc_b.update(block_b)
+        nan_mismatch += int((np.isnan(block_a) != np.isnan(block_b)).sum())
+        both = np.isfinite(block_a) & np.isfinite(block_b)
+        delta = block_a[both].astype(float) - block_b[both]
+        if len(delta):
+            num_compared += len(delta)
+            sq_error += float(np.dot(delta, delta))
+            max_abs_delta = max(max_abs_delta, float(np.abs(delta).max()))
+    rmse = np.sqrt(sq_error / num_compared) if num_compared else np.nan
+    return acc_a.result(), acc_b.result(), {
+        'rmse': rmse,
+        'max_abs_delta': max_abs_delta if num_compared else np.nan,
+        'nan_mismatch': nan_mismatch}
+
+
+def compare_skims(path_a, path_b, block_size=DEFAULT_BLOCK_SIZE, store=False):
+    """
+    Compares every matrix of two OMX files, e.g. skims of successive
+    travel model years or replanning iterations. Matrices whose stored
+    content hashes match are reported as unchanged without being read.
+
+    Parameters:
+    ------------
+    - path_a: str. Path to the reference OMX file.
+    - path_b: str. Path to the compared OMX file.
+    - block_size: int. Maximum number of cells held in memory per matrix.
+    - store: bool. Store the statistics computed along the way in the matrix
+        attributes of both files. The files are only opened for writing if
+        set.
+
+    Returns:
+    ---------
+    pandas DataFrame indexed by matrix name, with a status column (one of
+    unchanged, changed, added or removed), the statistics of both matrices
+    (suffixed _a and _b) and rmse, max_abs_delta and nan_mismatch over the
+    cells where both matrices are defined.
+    """
+    mode = 'a' if store else 'r'
+    skims_a = omx.open_file(path_a, mode)
+    skims_b = omx.open_file(path_b, mode)
+    try:
+        names_a = skims_a.list_matrices()
+        names_b = skims_b.list_matrices()
+        rows = {}
+        for name in sorted(set(names_a) | set(names_b)):
+            if name not in names_b:
+                rows[name] = {'status': 'removed'}
+                continue
+            if name not in names_a:
+                rows[name] = {'status': 'added'}
+                continue
+            matrix_a = skims_a[name]
+            matrix_b = skims_b[name]
+            stats_a = stored_stats(matrix_a)
+            stats_b = stored_stats(matrix_b)
+            if (stats_a is not None) and (stats_b is not None) and \
+                    (matrix_a.shape == matrix_b.shape) and \
+                    (stats_a['qa_sha1'] == stats_b['qa_sha1']):
+                deltas = {'rmse': 0.0, 'max_abs_delta': 0.0, 'nan_mismatch': 0}
+            elif matrix_a.shape != matrix_b.shape:
+                logger.warning(
+                    "Matrix {0} shape changed from {1} to {2}.".format(
+                        name, matrix_a.shape, matrix_b.shape))
+                stats_a = stats_a or matrix_stats(matrix_a, block_size, store)
+                stats_b = stats_b or matrix_stats(matrix_b, block_size, store)
+                deltas = {}
+            else:
+                stats_a, stats_b, deltas = _compare_matrices(
+                    matrix_a, matrix_b, block_size)
+                if store:
+                    store_stats(matrix_a, stats_a)
+                    store_stats(matrix_b, stats_b)
+            row = {'status': 'unchanged' if (
+                stats_a['qa_sha1'] == stats_b['qa_sha1']) else 'changed'}
+            row.update({k + '_a': v for k, v in stats_a.items()})
+            row.update({k + '_b': v for k, v in stats_b.items()})
+            row.update(deltas)
+            rows[name] = row
+    finally:
+        skims_a.close()
+        skims_b.close()
+
+    columns = ['status'] + [attr + '_a' for attr in QA_ATTRS] + \
+        [attr + '_b' for attr in QA_ATTRS] + \
+        ['rmse', 'max_abs_delta', 'nan_mismatch']
+    report = pd.DataFrame.from_dict(rows, orient='index', columns=columns)
+    report.index.name = 'matrix'
+    num_changed = (report['status'] != 'unchanged').sum()
+    logger.info("{0} of {1} skim matrices changed.".format(
+        num_changed, len(report)))
+    return report
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description='Summarize an OMX skims file, or compare two of them')
+    parser.add_argument('skims', nargs='+', help='One OMX file to summarize, or two OMX files to compare')
+    parser.add_argument('-output', default='', help='CSV file to write the report to. Printed to stdout if omitted')
+    parser.add_argument('-block_size', type=int, default=DEFAULT_BLOCK_SIZE, help='Maximum number of matrix cells held in memory')
+    parser.add_argument('-store', action='store_true', help='Store summary statistics in the OMX matrix attributes, so later runs can skip unchanged matrices')
+    args = parser.parse_args()
+
+    if len(args.skims) == 1:
+        report = summarize_skims(
+            args.skims[0], args.block_size, store=args.store)
+    elif len(args.skims) == 2:
+        report = compare_skims(
+            args.skims[0], args.skims[1], args.block_size,
+            store=args.store)
+    else:
+        parser.error('Expected one or two OMX files')
+
+    if args.output:
+        report.to_csv(args.output)
+    else:
+        with pd.option_context('display.max_rows', None):
+            print(report)
@@ -1,6 +1,8 @@
 import pandas as pd
 import os
 
+from pilates.utils.io import read_cached_skims, update_skims_cache
+
 def find_latest_beam_iteration(beam_output_dir):
     iter_dirs = [os.path.join(root, dir) for root, dirs, files in os.walk(beam_output_dir) for dir in dirs if
                  dir == "ITERS"]
@@ -26,7 +28,26 @@ def find_produced_skims(beam_output_dir):
         return None
 
 
-def merge_current_skims(all_skims_path, previous_skims_path, beam_output_dir):
+def skims_patch_path(current_skims_path):
+    """ Path of the merged skims of the OD pairs of a partial BEAM skims
+    file, see `merge_current_skims`. """
+    return current_skims_path.split('.csv')[0] + '_patch.csv.gz'
+
+
+def merge_current_skims(all_skims_path, previous_skims_path, beam_output_dir,
+                        cache_dir=None, max_bytes=None, write_patch=False):
+    """
+    Merges the partial skims of the last BEAM run into the BEAM skims:
+    records of existing keys are updated in place and new keys appended.
+
+    If `write_patch` is set, every merged record of the OD pairs found in
+    the partial skims is also written to `skims_patch_path`, with its row
+    position in the merged skims as a merged_pos column. ActivitySim skims
+    of those OD pairs can be patched from this file alone.
+
+    Returns the path of the partial skims, or the previous one if BEAM did
+    not produce new skims.
+    """
     current_skims_path = find_produced_skims(beam_output_dir)
     if (current_skims_path is None) | (previous_skims_path == current_skims_path):
         # this means beam has not produced the skims
@@ -39,10 +60,25 @@ def merge_current_skims(all_skims_path, previous_skims_path, beam_output_dir):
     }
     index_columns = ['timePeriod', 'pathType', 'origin', 'destination']
 
-    all_skims = pd.read_csv(all_skims_path, dtype=schema, index_col=index_columns)
-    cur_skims = pd.read_csv(current_skims_path, dtype=schema, index_col=index_columns)
+    all_skims = read_cached_skims(
+        all_skims_path, cache_dir, dtype=schema, max_bytes=max_bytes
+    ).set_index(index_columns)
+    cur_skims = read_cached_skims(
+        current_skims_path, cache_dir, dtype=schema, max_bytes=max_bytes
+    ).set_index(index_columns)
     all_skims.loc[cur_skims.index.intersection(all_skims.index)] = cur_skims
     all_skims = pd.concat([all_skims, cur_skims.loc[cur_skims.index.difference(all_skims.index)]])
     all_skims = all_skims.reset_index()
     all_skims.to_csv(all_skims_path, index=False)
+    if write_patch:
+        od_columns = ['origin', 'destination']
+        touched = pd.MultiIndex.from_frame(all_skims[od_columns]).isin(
+            cur_skims.index.droplevel(['timePeriod', 'pathType']))
+        patch = all_skims[touched].copy()
+        patch['merged_pos'] = patch.index
+        patch.to_csv(skims_patch_path(current_skims_path), index=False)
+    # the merged skims are read again by activitysim and urbansim, cache
+    # them now so nobody has to parse them from text
+    update_skims_cache(
+        all_skims, all_skims_path, cache_dir, max_bytes, dtype=schema)
     return current_skims_path
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+from pilates.activitysim.postprocessor import _load_asim_outputs
+from pilates.benchmarks.harness import timer
+
+NUM_HOUSEHOLDS = 200000
+PERSONS_PER_HOUSEHOLD = 2.5
+TRIPS_PER_PERSON = 4
+PURPOSES = ['Home', 'work', 'school', 'shopping', 'othmaint', 'eatout']
+MODES = ['DRIVEALONEFREE', 'SHARED2FREE', 'WALK', 'BIKE', 'WALK_LOC']
+
+
+def synthetic_outputs(output_dir, seed=0):
+    """ Writes final_*.csv ActivitySim outputs, trips and plans the largest. """
+    rng = np.random.default_rng(seed)
+    num_persons = int(NUM_HOUSEHOLDS * PERSONS_PER_HOUSEHOLD)
+    num_trips = num_persons * TRIPS_PER_PERSON
+    households = pd.DataFrame({
+        'household_id': np.arange(NUM_HOUSEHOLDS) + 1,
+        'home_zone_id': rng.integers(1, 1455, NUM_HOUSEHOLDS),
+        'income': rng.integers(0, 300000, NUM_HOUSEHOLDS),
+        'auto_ownership': rng.integers(0, 4, NUM_HOUSEHOLDS),
+        'block_id': rng.integers(6e13, 7e13, NUM_HOUSEHOLDS)})
+    persons = pd.DataFrame({
+        'person_id': np.arange(num_persons) + 1,
+        'household_id': rng.integers(1, NUM_HOUSEHOLDS + 1, num_persons),
+        'age': rng.integers(0, 90, num_persons),
+        'workplace_zone_id': rng.integers(-1, 1455, num_persons),
+        'value_of_time': rng.random(num_persons) * 30})
+    trips = pd.DataFrame({
+        'trip_id': np.arange(num_trips) * 8 + 1,
+        'person_id': rng.integers(1, num_persons + 1, num_trips),
+        'tour_id': rng.integers(1, num_trips, num_trips),
+        'purpose': rng.choice(PURPOSES, num_trips),
+        'trip_mode': rng.choice(MODES, num_trips),
+        'depart': rng.integers(5, 23, num_trips),
+        'mode_choice_logsum': rng.normal(size=num_trips)})
+    plans = pd.DataFrame({
+        'trip_id': np.where(
+            rng.random(num_trips) < 0.5, trips['trip_id'], np.nan),
+        'person_id': trips['person_id'],
+        'PlanElementIndex': rng.integers(1, 10, num_trips),
+        'ActivityElement': rng.choice(['activity', 'leg'], num_trips),
+        'ActivityType': rng.choice(PURPOSES, num_trips),
+        'x': rng.uniform(-122.5, -122, num_trips),
+        'y': rng.uniform(37.5, 38, num_trips)})
+    tables = {
+        'households': households, 'persons': persons, 'trips': trips,
+        'plans': plans}
+    for table_name, df in tables.items():
+        df.to_csv(
+            os.path.join(output_dir, 'final_{0}.csv'.format(table_name)),
+            index=False)
+    return list(tables.keys())
+
+
+def load_asim_outputs_pandas(settings):
+    """ Reference eager loader (pre-AsimOutputTables). """
+    output_tables_settings = settings['asim_output_tables']
+    prefix = output_tables_settings['prefix']
+    asim_output_dict = {}
+    for table_name in output_tables_settings['tables']:
+        file_path = os.path.join(
+            settings['asim_local_output_folder'],
+            "%s%s.csv" % (prefix, table_name))
+        index_col = {
+            'persons': 'person_id', 'households': 'household_id'}.get(
+                table_name, None)
+        table = pd.read_csv(file_path, index_col=index_col)
+        if 'block_id' in table.columns:
+            table['block_id'] = table['block_id'].astype(str).str.zfill(15)
+        asim_output_dict[table_name] = table
+    return asim_output_dict
+
+
+if __name__ == '__main__':
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        table_names = synthetic_outputs(output_dir)
+        settings = {
+            'asim_local_output_folder': output_dir,
+            'asim_output_tables': {'prefix': 'final_', 'tables': table_names}}
+        print("{0} households, {1} trips".format(
+            NUM_HOUSEHOLDS,
+            int(NUM_HOUSEHOLDS * PERSONS_PER_HOUSEHOLD * TRIPS_PER_PERSON)))
+
+        with timer('pandas'):
+            expected = load_asim_outputs_pandas(settings)
+
+        with timer('lazy (usim)'):
+            result = _load_asim_outputs(settings)
+            result.load(['households', 'persons'])
+        assert not result.is_loaded('trips')
+
+        with timer('rest'):
+            result.load()
+
+    assert list(expected.keys()) == list(result.keys())
+    for table_name in table_names:
+        pd.testing.assert_frame_equal(
+            expected[table_name], result[table_name], check_dtype=False,
+            check_categorical=False)
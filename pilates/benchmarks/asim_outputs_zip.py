@@ -0,0 +1,72 @@
+import os
+import tempfile
+import zipfile
+
+from pilates.activitysim.postprocessor import (
+    _load_asim_outputs, create_beam_input_data)
+from pilates.benchmarks import asim_outputs
+from pilates.benchmarks.asim_outputs import synthetic_outputs
+from pilates.benchmarks.harness import peak_memory, timer
+
+FORECAST_YEAR = 2015
+NUM_HOUSEHOLDS = 50000  # memory tracing slows pandas down a lot
+
+
+def create_beam_input_data_writestr(settings, asim_output_dict):
+    """ Reference archive writer (pre-streaming). """
+    outpath = os.path.join(
+        settings['asim_local_output_folder'], 'reference.zip')
+    with zipfile.ZipFile(outpath, 'w') as csv_zip:
+        for table_name in asim_output_dict.keys():
+            csv_zip.writestr(
+                table_name + ".csv", asim_output_dict[table_name].to_csv())
+    return outpath
+
+
+def measure(label, func, *args):
+    """ Peak traced memory, then run time of a second run. """
+    _, peak = peak_memory(func, *args)
+    with timer(label, '{0:.0f} MB peak'.format(peak / 1e6)):
+        result = func(*args)
+    return result
+
+
+if __name__ == '__main__':
+
+    asim_outputs.NUM_HOUSEHOLDS = NUM_HOUSEHOLDS
+    with tempfile.TemporaryDirectory() as output_dir:
+        table_names = synthetic_outputs(output_dir)
+        settings = {
+            'asim_local_output_folder': output_dir,
+            'asim_output_tables': {'prefix': 'final_', 'tables': table_names}}
+        outpath = os.path.join(
+            output_dir, 'asim_outputs_{0}.zip'.format(FORECAST_YEAR))
+
+        # only the tables UrbanSim updates are parsed, as in
+        # create_next_iter_inputs. The reference writer needs all of them.
+        asim_output_dict = _load_asim_outputs(settings)
+        asim_output_dict.load(['households', 'persons'])
+
+        expected = measure(
+            'writestr', create_beam_input_data_writestr, settings,
+            {table_name: asim_output_dict[table_name]
+             for table_name in table_names})
+
+        asim_output_dict = _load_asim_outputs(settings)
+        asim_output_dict.load(['households', 'persons'])
+        measure(
+            'streaming', create_beam_input_data, settings, FORECAST_YEAR,
+            asim_output_dict)
+
+        with zipfile.ZipFile(expected) as expected_zip, \
+                zipfile.ZipFile(outpath) as result_zip:
+            assert expected_zip.namelist() == result_zip.namelist()
+            # parsed tables as to_csv wrote them, the others copied as is
+            for table_name in table_names:
+                name = table_name + ".csv"
+                if asim_output_dict.is_loaded(table_name):
+                    expected_bytes = expected_zip.read(name)
+                else:
+                    with open(asim_output_dict.paths[table_name], 'rb') as f:
+                        expected_bytes = f.read()
+                assert expected_bytes == result_zip.read(name), name
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+from pilates.utils.io import write_tables
+from pilates.benchmarks.harness import timer
+
+NUM_PERSONS = 3000000
+NUM_HOUSEHOLDS = 1200000
+FORMATS = ['csv', 'arrow_csv', 'parquet', 'hdf5']
+
+
+def synthetic_tables(seed=0):
+    rng = np.random.default_rng(seed)
+    households = pd.DataFrame({
+        'TAZ': rng.integers(1, 2001, NUM_HOUSEHOLDS).astype(str),
+        'block_id': np.char.zfill(
+            rng.integers(0, 100000, NUM_HOUSEHOLDS).astype(str), 15),
+        'persons': rng.integers(1, 7, NUM_HOUSEHOLDS),
+        'cars': rng.integers(0, 4, NUM_HOUSEHOLDS),
+        'income': rng.lognormal(11, 0.8, NUM_HOUSEHOLDS).round(),
+        'workers': rng.integers(0, 4, NUM_HOUSEHOLDS),
+        'HHT': rng.integers(1, 5, NUM_HOUSEHOLDS)},
+        index=pd.Index(np.arange(NUM_HOUSEHOLDS), name='household_id'))
+    persons = pd.DataFrame({
+        'household_id': rng.integers(0, NUM_HOUSEHOLDS, NUM_PERSONS),
+        'member_id': rng.integers(1, 7, NUM_PERSONS),
+        'TAZ': rng.integers(1, 2001, NUM_PERSONS).astype(str),
+        'age': rng.integers(0, 100, NUM_PERSONS),
+        'sex': rng.integers(1, 3, NUM_PERSONS),
+        'worker': rng.integers(0, 2, NUM_PERSONS),
+        'student': rng.integers(0, 2, NUM_PERSONS),
+        'ptype': rng.integers(1, 9, NUM_PERSONS),
+        'pemploy': rng.integers(1, 5, NUM_PERSONS),
+        'pstudent': rng.integers(1, 4, NUM_PERSONS),
+        'home_x': rng.uniform(-98, -97, NUM_PERSONS),
+        'home_y': rng.uniform(30, 31, NUM_PERSONS)},
+        index=pd.Index(np.arange(NUM_PERSONS), name='person_id'))
+    return {'households': households, 'persons': persons}
+
+
+def read_table(path, table_name):
+    if path.endswith('.csv'):
+        return pd.read_csv(path, index_col=0)
+    elif path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_hdf(path, table_name)
+
+
+if __name__ == '__main__':
+
+    tables = synthetic_tables()
+    print("{0} households, {1} persons".format(NUM_HOUSEHOLDS, NUM_PERSONS))
+
+    output_dir = tempfile.mkdtemp()
+    try:
+        for fmt in FORMATS:
+            formats = {table_name: fmt for table_name in tables.keys()}
+            with timer('{0} write'.format(fmt)) as run:
+                paths = write_tables(tables, output_dir, formats)
+                run.note = '{0:.0f} MB'.format(sum(
+                    os.path.getsize(path) for path in paths.values()) / 1e6)
+
+            with timer('{0} read'.format(fmt)):
+                for table_name, path in paths.items():
+                    read_table(path, table_name)
+            for path in paths.values():
+                os.remove(path)
+    finally:
+        shutil.rmtree(output_dir)
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import Polygon
+
+from pilates.utils.geog import features_to_gdf
+from pilates.benchmarks.harness import timer
+
+NUM_FEATURES = 50000
+NUM_REFERENCE_FEATURES = 2000  # the reference concat loop is quadratic
+SHARE_WITH_HOLES = 0.1
+
+
+def synthetic_features(seed=0):
+    """ ArcGIS JSON features of blocks, some of them with a hole. """
+    rng = np.random.default_rng(seed)
+    features = []
+    for i in range(NUM_FEATURES):
+        x, y = rng.uniform(-98, -97), rng.uniform(30, 31)
+        num_vertices = int(rng.integers(4, 40))
+        angles = np.sort(rng.uniform(0, 2 * np.pi, num_vertices))
+        shell = np.column_stack([
+            x + 0.01 * np.cos(angles), y + 0.01 * np.sin(angles)]).tolist()
+        rings = [shell + shell[:1]]
+        if rng.random() < SHARE_WITH_HOLES:
+            rings.append([[x - 1e-3, y - 1e-3], [x + 1e-3, y - 1e-3],
+                          [x + 1e-3, y + 1e-3], [x - 1e-3, y - 1e-3]])
+        features.append({
+            'attributes': {
+                'GEOID': '48453{0:010d}'.format(i), 'STATE': '48',
+                'COUNTY': '453', 'TRACT': '000100', 'BLKGRP': '1',
+                'BLOCK': '{0:04d}'.format(i % 10000),
+                'CENTLAT': '+{0:.7f}'.format(y), 'CENTLON': '{0:.7f}'.format(x)},
+            'geometry': {'rings': rings}})
+    return features
+
+
+def features_to_gdf_concat(features):
+    """ Reference feature parsing (pre-vectorization). """
+    df = pd.DataFrame()
+    for feature in features:
+        tmp = pd.DataFrame([feature['attributes']])
+        tmp['geometry'] = Polygon(
+            feature['geometry']['rings'][0],
+            feature['geometry']['rings'][1:])
+        df = pd.concat((df, tmp))
+    gdf = gpd.GeoDataFrame(df, crs="EPSG:4326")
+    return gdf
+
+
+def assert_gdf_equal(expected, result):
+    pd.testing.assert_frame_equal(
+        pd.DataFrame(expected.drop(columns='geometry')).reset_index(drop=True),
+        pd.DataFrame(result.drop(columns='geometry')))
+    assert list(expected.columns) == list(result.columns)
+    assert (expected.geometry.values == result.geometry.values).all()
+    assert expected.crs == result.crs
+
+
+if __name__ == '__main__':
+
+    features = synthetic_features()
+    print("{0} features".format(NUM_FEATURES))
+
+    with timer('concat', 'for {0} features'.format(NUM_REFERENCE_FEATURES)):
+        expected = features_to_gdf_concat(features[:NUM_REFERENCE_FEATURES])
+    assert_gdf_equal(
+        expected, features_to_gdf(features[:NUM_REFERENCE_FEATURES]))
+
+    note = 'for {0} features'.format(NUM_FEATURES)
+    with timer('vectorized', note):
+        result = features_to_gdf(features)
+
+    with timer('Polygon loop', note):
+        geometry = [
+            Polygon(f['geometry']['rings'][0], f['geometry']['rings'][1:])
+            for f in features]
+    assert (result.geometry.values == np.array(geometry)).all()
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import box
+
+from pilates.utils.geog import get_taz_from_block_geoms
+from pilates.benchmarks.harness import timer
+
+LOCAL_CRS = 'EPSG:32140'
+GRID_SIZE = 40  # zones per side
+ZONE_SIZE = 1000  # meters
+NUM_BLOCKS = 20000
+SHARE_MISSING_ZONES = 0.3  # zones removed so some blocks fall in gaps
+
+
+def synthetic_geoms(seed=0):
+    rng = np.random.default_rng(seed)
+    x0, y0 = 950000, 4200000
+    cells = [(i, j) for i in range(GRID_SIZE) for j in range(GRID_SIZE)
+             if rng.random() >= SHARE_MISSING_ZONES]
+    zones = gpd.GeoDataFrame(
+        {'zone_id': [str(k + 1) for k in range(len(cells))]},
+        geometry=[
+            box(x0 + i * ZONE_SIZE, y0 + j * ZONE_SIZE,
+                x0 + (i + 1) * ZONE_SIZE, y0 + (j + 1) * ZONE_SIZE)
+            for i, j in cells], crs=LOCAL_CRS)
+    # index labels equal to the zone IDs, so the reference nearest centroid
+    # assignment (which returns zone index labels) is comparable
+    zones.index = zones['zone_id'].values
+
+    extent = GRID_SIZE * ZONE_SIZE
+    xs = x0 + rng.uniform(0, extent, NUM_BLOCKS)
+    ys = y0 + rng.uniform(0, extent, NUM_BLOCKS)
+    sizes = rng.uniform(50, 400, NUM_BLOCKS)
+    blocks = gpd.GeoDataFrame(
+        {'GEOID': ['48453{0:010d}'.format(i) for i in range(NUM_BLOCKS)]},
+        geometry=[box(x, y, x + s, y + s) for x, y, s in zip(xs, ys, sizes)],
+        crs=LOCAL_CRS)
+    return blocks.to_crs('EPSG:4326'), zones.to_crs('EPSG:4326')
+
+
+def get_taz_from_block_geoms_overlay(blocks_gdf, zones_gdf, local_crs,
+                                     zone_col_name):
+    """ Reference overlay-based assignment (pre-spatial index). """
+    block_to_taz_results = pd.DataFrame()
+    zones_gdf = zones_gdf[~zones_gdf['geometry'].is_empty]
+    zones_gdf = zones_gdf.to_crs(local_crs)
+    blocks_gdf = blocks_gdf.to_crs(local_crs)
+    zones_gdf['zone_area'] = zones_gdf.geometry.area
+    intx = gpd.overlay(blocks_gdf, zones_gdf.reset_index(), how='intersection')
+    intx['intx_area'] = intx['geometry'].area
+    intx = intx.sort_values(['GEOID', 'intx_area'], ascending=False)
+    intx = intx.drop_duplicates('GEOID', keep='first')
+    block_to_taz_results = pd.concat((
+        block_to_taz_results, intx[['GEOID', zone_col_name]]))
+    unassigned_mask = ~blocks_gdf['GEOID'].isin(block_to_taz_results['GEOID'])
+    if any(unassigned_mask):
+        blocks_gdf['geometry'] = blocks_gdf['geometry'].centroid
+        zones_gdf['geometry'] = zones_gdf['geometry'].centroid
+        all_dists = blocks_gdf.loc[unassigned_mask, 'geometry'].apply(
+            lambda x: zones_gdf['geometry'].distance(x))
+        nearest = all_dists.idxmin(axis=1).reset_index()
+        nearest.columns = ['blocks_idx', zone_col_name]
+        nearest.set_index('blocks_idx', inplace=True)
+        nearest['GEOID'] = blocks_gdf.reindex(nearest.index)['GEOID']
+        block_to_taz_results = pd.concat((
+            block_to_taz_results, nearest[['GEOID', zone_col_name]]))
+    return block_to_taz_results.set_index('GEOID')[zone_col_name]
+
+
+if __name__ == '__main__':
+
+    blocks, zones = synthetic_geoms()
+    print("{0} blocks, {1} zones".format(len(blocks), len(zones)))
+
+    with timer('overlay'):
+        expected = get_taz_from_block_geoms_overlay(
+            blocks, zones, LOCAL_CRS, 'zone_id')
+
+    with timer('sindex'):
+        result = get_taz_from_block_geoms(blocks, zones, LOCAL_CRS, 'zone_id')
+
+    pd.testing.assert_series_equal(
+        expected.sort_index(), result.sort_index(), check_dtype=False)
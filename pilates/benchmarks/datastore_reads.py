@@ -0,0 +1,51 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+from pilates.utils.io import convert_to_table_format, read_table
+from pilates.benchmarks.harness import timer
+
+NUM_PERSONS = 2000000
+NUM_COLUMNS = 30
+NUM_READS = 3  # e.g. one per consumer of the same forecast year datastore
+COLUMNS = ['household_id', 'age', 'worker']
+WHERE = 'age >= 85 & worker == 1'  # queries pay off when they are selective
+
+
+def synthetic_persons(seed=0):
+    rng = np.random.default_rng(seed)
+    persons = pd.DataFrame({
+        'household_id': rng.integers(0, NUM_PERSONS // 2, NUM_PERSONS),
+        'age': rng.integers(0, 90, NUM_PERSONS),
+        'worker': rng.integers(0, 2, NUM_PERSONS)},
+        index=pd.Index(np.arange(NUM_PERSONS), name='person_id'))
+    for i in range(NUM_COLUMNS - len(persons.columns)):
+        persons['col_{0}'.format(i)] = rng.random(NUM_PERSONS)
+    return persons
+
+
+if __name__ == '__main__':
+
+    persons = synthetic_persons()
+    print("{0} persons, {1} columns, {2} reads".format(
+        NUM_PERSONS, NUM_COLUMNS, NUM_READS))
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = pd.HDFStore(os.path.join(data_dir, 'model_data.h5'))
+        store.put('2010/persons', persons)
+
+        with timer('full read'):
+            for i in range(NUM_READS):
+                expected = store['2010/persons'].query(WHERE)[COLUMNS]
+
+        with timer('conversion'):
+            convert_to_table_format(store, ['2010/persons'])
+
+        with timer('projected'):
+            for i in range(NUM_READS):
+                result = read_table(
+                    store, '2010/persons', columns=COLUMNS, where=WHERE)
+        store.close()
+
+    pd.testing.assert_frame_equal(expected, result)
@@ -0,0 +1,53 @@
+""" Shared helpers of the benchmarks in this package. Every benchmark
+checks its results against a reference implementation and prints timings,
+and is run from the repo root as a module, e.g.
+
+    python -m pilates.benchmarks.persons_table
+"""
+import os
+import time
+import tracemalloc
+import yaml
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+def load_settings():
+    """ The settings.yaml of the repo. """
+    with open(os.path.join(REPO_DIR, 'settings.yaml')) as f:
+        return yaml.safe_load(f)
+
+
+class timer:
+    """ Context manager that prints the wall time of its block under a label,
+    followed by an optional note. The time is kept in `elapsed`. """
+
+    def __init__(self, label, note=''):
+        self.label = label
+        self.note = note
+        self.elapsed = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        if exc[0] is None:
+            print("{0:>12}: {1:.2f}s{2}".format(
+                self.label, self.elapsed, ' ' + self.note if self.note else ''))
+        return False
+
+
+def peak_memory(func, *args, **kwargs):
+    """ Calls func and returns its result and the peak memory traced during
+    the call, in bytes. Memory tracing slows pandas down a lot, so time the
+    call in a separate run. """
+    tracemalloc.start()
+    try:
+        result = func(*args, **kwargs)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, peak
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+from pilates.activitysim.preprocessor import aggregate_by_zone, \
+    LAND_USE_ZONE_AGGREGATIONS
+from pilates.benchmarks.harness import timer
+
+NUM_ZONES = 2000
+NUM_PERSONS = 3000000
+NUM_HOUSEHOLDS = 1200000
+NUM_JOBS = 1500000
+NUM_BLOCKS = 20000
+SECTORS = ['11', '21', '22', '23', '31-33', '32', '42', '44-45', '48-49',
+           '51', '52', '53', '54', '55', '56', '61', '62', '71', '72', '81',
+           '92']
+
+
+def land_use_groupby(zones, households, persons, jobs, blocks, schools,
+                     colleges, asim_zone_id_col='TAZ'):
+    """ Reference groupby-based zone attributes (pre-vectorization). """
+    zones = zones.copy()
+    zones['TOTHH'] = households[asim_zone_id_col].groupby(households[asim_zone_id_col]).count().reindex(zones.index).fillna(0)
+    zones['TOTPOP'] = persons[asim_zone_id_col].groupby(persons[asim_zone_id_col]).count().reindex(zones.index).fillna(0)
+    zones['EMPRES'] = households[[asim_zone_id_col,'workers']].groupby(asim_zone_id_col)['workers'].sum().reindex(zones.index).fillna(0)
+    zones['HHINCQ1'] = households.loc[households['income'] < 30000, [asim_zone_id_col,'income']].groupby(asim_zone_id_col)['income'].count().reindex(zones.index).fillna(0)
+    zones['HHINCQ2'] = households.loc[households['income'].between(30000, 59999), [asim_zone_id_col,'income']].groupby(asim_zone_id_col)['income'].count().reindex(zones.index).fillna(0)
+    zones['HHINCQ3'] = households.loc[households['income'].between(60000, 99999), [asim_zone_id_col,'income']].groupby(asim_zone_id_col)['income'].count().reindex(zones.index).fillna(0)
+    zones['HHINCQ4'] = households.loc[households['income'] >= 100000, [asim_zone_id_col,'income']].groupby(asim_zone_id_col)['income'].count().reindex(zones.index).fillna(0)
+    zones['AGE0004'] = persons.loc[persons['age'].between(0,4), [asim_zone_id_col, 'age']].groupby(asim_zone_id_col)['age'].count().reindex(zones.index).fillna(0)
+    zones['AGE0519'] = persons.loc[persons['age'].between(5,19), [asim_zone_id_col, 'age']].groupby(asim_zone_id_col)['age'].count().reindex(zones.index).fillna(0)
+    zones['AGE2044'] = persons.loc[persons['age'].between(20,44), [asim_zone_id_col, 'age']].groupby(asim_zone_id_col)['age'].count().reindex(zones.index).fillna(0)
+    zones['AGE4564'] = persons.loc[persons['age'].between(45,64), [asim_zone_id_col, 'age']].groupby(asim_zone_id_col)['age'].count().reindex(zones.index).fillna(0)
+    zones['AGE64P'] = persons.loc[persons['age'] >= 65, [asim_zone_id_col, 'age']].groupby(asim_zone_id_col)['age'].count().reindex(zones.index).fillna(0)
+    zones['AGE62P'] = persons.loc[persons['age'] >= 62, [asim_zone_id_col, 'age']].groupby(asim_zone_id_col)['age'].count().reindex(zones.index).fillna(0)
+    zones['TOTEMP'] = jobs[asim_zone_id_col].groupby(jobs[asim_zone_id_col]).count().reindex(zones.index).fillna(0)
+    zones['RETEMPN'] = jobs.loc[jobs['sector_id'].isin(['44-45']), [asim_zone_id_col, 'sector_id']].groupby(asim_zone_id_col)['sector_id'].count().reindex(zones.index).fillna(0)
+    zones['FPSEMPN'] = jobs.loc[jobs['sector_id'].isin(['52', '54']), [asim_zone_id_col, 'sector_id']].groupby(asim_zone_id_col)['sector_id'].count().reindex(zones.index).fillna(0)
+    zones['HEREMPN'] = jobs.loc[jobs['sector_id'].isin(['61', '62', '71']), [asim_zone_id_col, 'sector_id']].groupby(asim_zone_id_col)['sector_id'].count().reindex(zones.index).fillna(0)
+    zones['AGREMPN'] = jobs.loc[jobs['sector_id'].isin(['11']), [asim_zone_id_col, 'sector_id']].groupby(asim_zone_id_col)['sector_id'].count().reindex(zones.index).fillna(0)
+    zones['MWTEMPN'] = jobs.loc[jobs['sector_id'].isin(['42', '31-33', '32', '48-49']), [asim_zone_id_col, 'sector_id']].groupby(asim_zone_id_col)['sector_id'].count().reindex(zones.index).fillna(0)
+    zones['OTHEMPN'] = jobs.loc[~jobs['sector_id'].isin(['44-45', '52', '54', '61', '62', '71', '11', '42', '31-33', '32', '48-49']), [asim_zone_id_col, 'sector_id']].groupby(asim_zone_id_col)['sector_id'].count().reindex(zones.index).fillna(0)
+    zones['TOTACRE'] = blocks[['TOTACRE', asim_zone_id_col]].groupby(asim_zone_id_col)['TOTACRE'].sum().reindex(zones.index).fillna(0)
+    zones['HSENROLL'] = schools[['enrollment', asim_zone_id_col]].groupby(asim_zone_id_col)['enrollment'].sum().reindex(zones.index).fillna(0)
+    zones['COLLFTE'] = colleges[[asim_zone_id_col, 'full_time_enrollment']].groupby(asim_zone_id_col)['full_time_enrollment'].sum().reindex(zones.index).fillna(0)
+    zones['COLLPTE'] = colleges[[asim_zone_id_col, 'part_time_enrollment']].groupby(asim_zone_id_col)['part_time_enrollment'].sum().reindex(zones.index).fillna(0)
+    return zones
+
+
+def synthetic_population(seed=0):
+    rng = np.random.default_rng(seed)
+    zone_ids = np.arange(1, NUM_ZONES + 1).astype(str)
+    zones = pd.DataFrame(index=pd.Index(zone_ids, name='TAZ'))
+
+    def zone_col(size, share_missing=0.0):
+        # skip the last zone so some attributes are floats
+        col = zone_ids[rng.integers(0, NUM_ZONES - 1, size)].astype(object)
+        col[rng.random(size) < share_missing] = np.nan
+        return col
+
+    households = pd.DataFrame({
+        'TAZ': zone_col(NUM_HOUSEHOLDS),
+        'income': rng.lognormal(11, 0.8, NUM_HOUSEHOLDS).round(),
+        'workers': rng.integers(0, 4, NUM_HOUSEHOLDS)})
+    households.loc[rng.random(NUM_HOUSEHOLDS) < 0.01, 'income'] = np.nan
+    persons = pd.DataFrame({
+        'TAZ': zone_col(NUM_PERSONS),
+        'age': rng.integers(0, 100, NUM_PERSONS)})
+    jobs = pd.DataFrame({
+        'TAZ': zone_col(NUM_JOBS, 0.001),
+        'sector_id': np.array(SECTORS, dtype=object)[
+            rng.integers(0, len(SECTORS), NUM_JOBS)]})
+    jobs.loc[rng.random(NUM_JOBS) < 0.001, 'sector_id'] = np.nan
+    blocks = pd.DataFrame({
+        'TAZ': zone_ids[rng.integers(0, NUM_ZONES, NUM_BLOCKS)],
+        'TOTACRE': rng.uniform(1, 500, NUM_BLOCKS)})
+    schools = pd.DataFrame({
+        'TAZ': zone_col(500),
+        'enrollment': rng.integers(100, 3000, 500).astype(float)})
+    colleges = pd.DataFrame({
+        'TAZ': zone_col(50),
+        'full_time_enrollment': rng.integers(100, 30000, 50),
+        'part_time_enrollment': rng.integers(100, 10000, 50)})
+    return zones, households, persons, jobs, blocks, schools, colleges
+
+
+if __name__ == '__main__':
+
+    zones, households, persons, jobs, blocks, schools, colleges = \
+        synthetic_population()
+    tables = {
+        'households': households, 'persons': persons, 'jobs': jobs,
+        'blocks': blocks, 'schools': schools, 'colleges': colleges}
+    print("{0} zones, {1} households, {2} persons, {3} jobs".format(
+        NUM_ZONES, NUM_HOUSEHOLDS, NUM_PERSONS, NUM_JOBS))
+
+    with timer('groupby'):
+        expected = land_use_groupby(zones, **tables)
+
+    with timer('bincount'):
+        result = aggregate_by_zone(
+            zones.index, tables, LAND_USE_ZONE_AGGREGATIONS)
+
+    for attr, values in result.items():
+        pd.testing.assert_series_equal(
+            expected[attr], values, check_names=False, check_exact=True)
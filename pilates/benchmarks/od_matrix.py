@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from pilates.activitysim.preprocessor import _build_od_matrix
+from pilates.benchmarks.harness import timer
+
+NUM_ZONES = 2000
+OD_SHARE = 0.6
+NUM_MEASURES = 10
+
+
+def build_od_matrix_pivot(df, origin, destination, metric, order, fill_na=0):
+    """ Reference pivot-based OD matrix builder (pre-vectorization). """
+    vals = df.pivot(index=origin, columns=destination, values=metric)
+    num_zones = len(order)
+
+    if (num_zones, num_zones) != vals.shape:
+        missing_rows = list(set(order) - set(vals.index))
+        missing_cols = list(set(order) - set(vals.columns))
+        axis = 0
+        if len(missing_rows) == 0:
+            missing_rows = vals.index
+        if len(missing_cols) == 0:
+            missing_cols = vals.columns
+        else:
+            axis = 1
+        array = np.empty((len(missing_rows), len(missing_cols)))
+        array[:] = np.nan
+        empty_df = pd.DataFrame(array, index=missing_rows, columns=missing_cols)
+        vals = pd.concat((vals, empty_df), axis=axis)
+
+    return vals.loc[order, order].fillna(fill_na).values
+
+
+def synthetic_skims(num_zones, od_share, seed=0):
+    rng = np.random.default_rng(seed)
+    order = np.arange(1, num_zones + 1).astype(str)
+    num_pairs = int(num_zones * num_zones * od_share)
+    flat = rng.choice(num_zones * num_zones, num_pairs, replace=False)
+    df = pd.DataFrame({
+        'origin': order[flat // num_zones],
+        'destination': order[flat % num_zones],
+        'TIME_minutes': rng.uniform(1, 90, num_pairs)})
+    df.loc[df.sample(frac=0.01, random_state=seed).index, 'TIME_minutes'] = np.nan
+    return df, order
+
+
+if __name__ == '__main__':
+
+    df, order = synthetic_skims(NUM_ZONES, OD_SHARE)
+    print("{0} zones, {1} OD pairs, {2} measures".format(
+        NUM_ZONES, len(df), NUM_MEASURES))
+
+    for fill_na in [0, np.nan]:
+        expected = build_od_matrix_pivot(
+            df, 'origin', 'destination', 'TIME_minutes', order, fill_na)
+        result = _build_od_matrix(
+            df, 'origin', 'destination', 'TIME_minutes', order, fill_na)
+        np.testing.assert_array_equal(expected, result)
+
+    for name, func in [
+            ('pivot', build_od_matrix_pivot),
+            ('vectorized', _build_od_matrix)]:
+        with timer(name):
+            for _ in range(NUM_MEASURES):
+                func(df, 'origin', 'destination', 'TIME_minutes', order, 0)
@@ -0,0 +1,82 @@
+import tempfile
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import Polygon
+
+from pilates.utils import geog
+from pilates.benchmarks.harness import timer
+
+LOCAL_CRS = 'EPSG:32140'
+GRID_SIZE = 250  # zones per side
+ZONE_SIZE = 200  # meters
+VERTICES_PER_SIDE = 10
+NUM_POINTS = 5000
+NUM_YEARS = 3  # forecast years, each assigning schools and colleges
+
+
+def synthetic_zones():
+    """ Square zones with vertices along their sides, like real boundaries. """
+    x0, y0 = 950000, 4200000
+    steps = np.arange(VERTICES_PER_SIDE) / VERTICES_PER_SIDE * ZONE_SIZE
+    side = np.zeros(VERTICES_PER_SIDE)
+    square = np.column_stack([
+        np.concatenate([steps, side + ZONE_SIZE, ZONE_SIZE - steps, side]),
+        np.concatenate([side, steps, side + ZONE_SIZE, ZONE_SIZE - steps])])
+    cells = [(i, j) for i in range(GRID_SIZE) for j in range(GRID_SIZE)]
+    zones = gpd.GeoDataFrame(
+        geometry=[
+            Polygon(square + [x0 + i * ZONE_SIZE, y0 + j * ZONE_SIZE])
+            for i, j in cells], crs=LOCAL_CRS,
+        index=pd.Index([str(k + 1) for k in range(len(cells))], name='TAZ'))
+    return zones.to_crs('EPSG:4326')
+
+
+def get_zone_from_points_sjoin(df, zones_gdf, local_crs):
+    """ Reference point-in-zone assignment (reprojects the zones). """
+    zone_id_col = zones_gdf.index.name
+    gdf = gpd.GeoDataFrame(
+        df, geometry=gpd.points_from_xy(df.x, df.y), crs="EPSG:4326")
+    gdf = gdf.to_crs(local_crs)
+    zones_gdf = zones_gdf.to_crs(local_crs)
+    intx = gpd.sjoin(
+        gdf, zones_gdf.reset_index(), how='left', predicate='intersects')
+    assert len(intx) == len(gdf)
+    return intx[zone_id_col]
+
+
+if __name__ == '__main__':
+
+    zones = synthetic_zones()
+    rng = np.random.default_rng(1)
+    minx, miny, maxx, maxy = zones.total_bounds
+    points = pd.DataFrame({
+        'x': rng.uniform(minx, maxx, NUM_POINTS),
+        'y': rng.uniform(miny, maxy, NUM_POINTS)},
+        index=pd.Index(np.arange(NUM_POINTS), name='school_id'))
+    print("{0} zones, {1} points, {2} years".format(
+        len(zones), NUM_POINTS, NUM_YEARS))
+
+    with timer('to_crs each'):
+        for year in range(NUM_YEARS):
+            for enrollment_type in ['schools', 'colleges']:
+                expected = get_zone_from_points_sjoin(points, zones, LOCAL_CRS)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        with timer('cached'):
+            for year in range(NUM_YEARS):
+                geog._projected_zones.clear()  # new process every forecast year
+                geog._geoms_cache.clear()
+                projected = geog.project_zones(
+                    zones, LOCAL_CRS, 'synthetic', data_dir)
+                for enrollment_type in ['schools', 'colleges']:
+                    result = geog.get_zone_from_points(
+                        points, zones, LOCAL_CRS, 'synthetic')
+
+    pd.testing.assert_series_equal(
+        expected.astype(object), result, check_names=False)
+    reference = zones.to_crs(LOCAL_CRS)
+    np.testing.assert_array_equal(
+        projected.areas, reference.geometry.area.values)
+    np.testing.assert_array_equal(
+        projected.centroids[:, 0], reference.geometry.centroid.x.values)
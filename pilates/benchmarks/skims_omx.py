@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+from pilates.activitysim import preprocessor
+from pilates.benchmarks.harness import load_settings, timer
+
+NUM_ZONES = 300
+OD_SHARE = 0.6
+CONFIGS = [
+    {'skims_num_processes': 1},
+    {'skims_num_processes': 4},
+    {'skims_num_processes': 4, 'skims_complib': 'blosc:lz4',
+     'skims_complevel': 5},
+    {'skims_num_processes': 4, 'skims_complib': 'blosc:zstd',
+     'skims_complevel': 5},
+    {'skims_num_processes': 4, 'skims_complevel': 0},
+]
+
+
+def synthetic_beam_skims(settings, num_zones, od_share, seed=0):
+    """ Raw BEAM skims with the columns of the measure maps, for every
+    period and BEAM path. Auto skims cover every OD pair so that no
+    distances need to be imputed from zone geometries. """
+    rng = np.random.default_rng(seed)
+    order = np.arange(1, num_zones + 1)
+    num_pairs = int(num_zones * num_zones * od_share)
+    measures = set(settings['beam_asim_hwy_measure_map'].values())
+    measures |= set(settings['beam_asim_transit_measure_map'].values())
+    measures = sorted(
+        m.replace('_miles', '_meters') for m in measures if m)
+    beam_paths = sorted(set(
+        p.replace('EXP', 'LOC').replace('TRN', 'LOC')
+        for p in settings['transit_paths']))
+
+    frames = []
+    for path in ['SOV'] + beam_paths:
+        for period in settings['periods']:
+            if path == 'SOV':
+                flat = np.arange(num_zones * num_zones)
+            else:
+                flat = rng.choice(
+                    num_zones * num_zones, num_pairs, replace=False)
+            df = pd.DataFrame({
+                'timePeriod': period,
+                'pathType': path,
+                'origin': order[flat // num_zones],
+                'destination': order[flat % num_zones]})
+            for measure in measures:
+                df[measure] = rng.uniform(1, 90, len(flat))
+            df['DIST_meters'] = (
+                np.abs(df['origin'] - df['destination']) + 1) * 800.0
+            frames.append(df)
+    return pd.concat(frames, ignore_index=True), order
+
+
+if __name__ == '__main__':
+
+    settings = load_settings()
+
+    df, order = synthetic_beam_skims(settings, NUM_ZONES, OD_SHARE)
+    print("{0} zones, {1} BEAM skim records".format(NUM_ZONES, len(df)))
+
+    # skip zone geometries and raw file reads
+    preprocessor.zone_order = lambda settings, year: order
+    preprocessor._load_raw_beam_skims = lambda settings: df.copy()
+
+    output_dir = tempfile.mkdtemp()
+    try:
+        for config in CONFIGS:
+            run_settings = dict(settings, skims_chunk_size=None, **config)
+            with timer(str(config)) as run:
+                preprocessor.create_skims_from_beam(
+                    run_settings, settings['start_year'], output_dir=output_dir)
+                run.note = '{0:.1f} MB'.format(os.path.getsize(
+                    os.path.join(output_dir, 'skims.omx')) / 1e6)
+    finally:
+        shutil.rmtree(output_dir)
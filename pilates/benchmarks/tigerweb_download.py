@@ -0,0 +1,123 @@
+import json
+import tempfile
+import threading
+import time
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from pilates.utils.geog import download_block_features
+from pilates.benchmarks.harness import timer
+
+STATE = '48'
+COUNTIES = ['021', '053', '055', '209', '453', '491']
+BLOCKS_PER_COUNTY = 3000
+RESULT_SIZE = 500
+LATENCY = 0.05  # seconds per response
+FAILURE_EVERY = 7  # every n-th request fails with a 503
+
+
+def canned_features(state, county):
+    """ ArcGIS JSON features of square blocks, in GEOID order. """
+    features = []
+    for i in range(BLOCKS_PER_COUNTY):
+        x, y = -98 + int(county) / 1000 + (i % 100) / 1e4, 30 + i // 100 / 1e4
+        ring = [[x, y], [x + 1e-4, y], [x + 1e-4, y + 1e-4], [x, y + 1e-4],
+                [x, y]]
+        features.append({
+            'attributes': {
+                'GEOID': '{0}{1}{2:010d}'.format(state, county, i),
+                'STATE': state, 'COUNTY': county, 'TRACT': '000100',
+                'BLKGRP': '1', 'BLOCK': '{0:04d}'.format(i),
+                'CENTLAT': '+{0:.7f}'.format(y), 'CENTLON': '{0:.7f}'.format(x)},
+            'geometry': {'rings': [ring]}})
+    return features
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """ Serves canned TIGERweb MapServer query responses. """
+    features = {county: canned_features(STATE, county) for county in COUNTIES}
+    num_requests = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            StandInHandler.num_requests += 1
+            fail = StandInHandler.num_requests % FAILURE_EVERY == 0
+        time.sleep(LATENCY)
+        if fail:
+            self.send_error(503)
+            return
+        query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        county = query['where'].split('COUNTY=')[1]
+        features = self.features[county]
+        if query.get('returnCountOnly') == 'true':
+            response = {'count': len(features)}
+        else:
+            offset = int(query['resultOffset'])
+            size = int(query['resultRecordCount'])
+            response = {
+                'features': features[offset:offset + size],
+                'exceededTransferLimit': offset + size < len(features)}
+        body = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def download_serial(base_url, county, result_size=RESULT_SIZE):
+    """ Reference page-by-page download (pre-concurrency), with retries so it
+    survives the stand-in server failures. """
+    url = base_url + 'tigerWMS_Census2010/MapServer/18/query'
+    all_features = []
+    page = 0
+    while True:
+        params = {
+            'where': 'STATE={0} and COUNTY={1}'.format(STATE, county),
+            'resultRecordCount': result_size,
+            'resultOffset': page * result_size, 'f': 'json'}
+        result = requests.get(url, params=params)
+        if result.status_code != 200:
+            continue
+        all_features += result.json()['features']
+        if not result.json()['exceededTransferLimit']:
+            return all_features
+        page += 1
+
+
+if __name__ == '__main__':
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = 'http://127.0.0.1:{0}/'.format(server.server_address[1])
+    print("{0} counties, {1} blocks each, {2} per page, {3:.0f}ms latency".format(
+        len(COUNTIES), BLOCKS_PER_COUNTY, RESULT_SIZE, LATENCY * 1000))
+
+    with timer('serial'):
+        expected = {county: download_serial(base_url, county) for county in COUNTIES}
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        kwargs = {
+            'zone_type': 'block', 'result_size': RESULT_SIZE,
+            'base_url': base_url, 'backoff': 0.01}
+        for num_threads in [1, 8]:
+            with timer('{0} threads'.format(num_threads)):
+                result = download_block_features(
+                    STATE, COUNTIES, num_threads=num_threads, **kwargs)
+            assert result == expected
+
+        download_block_features(
+            STATE, COUNTIES, cache_dir=cache_dir, **kwargs)
+        server.shutdown()
+        server.server_close()
+
+        # reruns are served from the response cache
+        with timer('cached'):
+            result = download_block_features(
+                STATE, COUNTIES, cache_dir=cache_dir, max_retries=1, **kwargs)
+        assert result == expected
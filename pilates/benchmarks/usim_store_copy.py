@@ -0,0 +1,82 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+from pilates.utils.io import copy_table
+from pilates.benchmarks.harness import timer
+
+NUM_ROWS = {'jobs': 2000000, 'buildings': 1000000, 'blocks': 100000}
+NUM_COLUMNS = 10
+YEAR = 2015
+
+
+def synthetic_tables(seed=0):
+    rng = np.random.default_rng(seed)
+    tables = {}
+    for table_name, num_rows in NUM_ROWS.items():
+        df = pd.DataFrame({
+            'block_id': np.char.zfill(
+                rng.integers(0, 10 ** 6, num_rows).astype(str), 15),
+            'sector_id': rng.choice(['11', '42', '31-33'], num_rows)},
+            index=pd.Index(np.arange(num_rows), name=table_name[:-1] + '_id'))
+        for i in range(NUM_COLUMNS - len(df.columns)):
+            df['col_{0}'.format(i)] = rng.random(num_rows)
+        tables[table_name] = df
+    return tables
+
+
+def write_stores(tables, data_dir):
+    """ An UrbanSim output store and an archived input store. """
+    output_store = pd.HDFStore(os.path.join(data_dir, 'model_data_out.h5'))
+    og_input_store = pd.HDFStore(os.path.join(data_dir, 'input_data.h5'))
+    for table_name, df in tables.items():
+        output_store[os.path.join(str(YEAR), table_name)] = df
+        og_input_store[table_name] = df
+    og_input_store['static'] = df
+    return output_store, og_input_store
+
+
+def create_store(output_store, og_input_store, path, copy):
+    new_input_store = pd.HDFStore(path)
+    updated_tables = []
+    for h5_key in output_store.keys():
+        table_name = h5_key.split('/')[-1]
+        updated_tables.append(table_name)
+        copy(output_store, h5_key, new_input_store, table_name)
+    for h5_key in og_input_store.keys():
+        table_name = h5_key.split('/')[-1]
+        if table_name not in updated_tables:
+            copy(og_input_store, h5_key, new_input_store, table_name)
+    return new_input_store
+
+
+def copy_with_pandas(src_store, src_key, dst_store, dst_key):
+    """ Reference table pass-through (pre-copy_table). """
+    dst_store[dst_key] = src_store[src_key]
+
+
+if __name__ == '__main__':
+
+    tables = synthetic_tables()
+    print("{0} rows, {1} columns".format(
+        sum(NUM_ROWS.values()), NUM_COLUMNS))
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        output_store, og_input_store = write_stores(tables, data_dir)
+
+        with timer('pandas'):
+            expected = create_store(
+                output_store, og_input_store,
+                os.path.join(data_dir, 'expected.h5'), copy_with_pandas)
+
+        with timer('copy_table'):
+            result = create_store(
+                output_store, og_input_store,
+                os.path.join(data_dir, 'result.h5'), copy_table)
+
+        assert expected.keys() == result.keys()
+        for key in expected.keys():
+            pd.testing.assert_frame_equal(expected[key], result[key])
+        for store in [output_store, og_input_store, expected, result]:
+            store.close()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely import wkt
+from shapely.geometry import Polygon
+
+from pilates.utils import geog
+from pilates.benchmarks.harness import timer
+
+NUM_ZONES = 100000
+VERTICES_PER_ZONE = 24
+
+
+def synthetic_zones(seed=0):
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * np.pi, VERTICES_PER_ZONE, endpoint=False)
+    centers = np.column_stack([
+        rng.uniform(-123, -121, NUM_ZONES), rng.uniform(37, 38.5, NUM_ZONES)])
+    radii = rng.uniform(0.001, 0.01, (NUM_ZONES, VERTICES_PER_ZONE))
+    geoms = [
+        Polygon(np.column_stack([
+            x + r * np.cos(angles), y + r * np.sin(angles)]))
+        for (x, y), r in zip(centers, radii)]
+    zones = gpd.GeoDataFrame(
+        {'GEOID': np.char.zfill(np.arange(NUM_ZONES).astype(str), 15)},
+        geometry=geoms, crs='EPSG:4326',
+        index=pd.Index((np.arange(NUM_ZONES) + 1).astype(str), name='zone_id'))
+    return zones
+
+
+def read_wkt_h5(fpath, key):
+    """ Reference zone geometry load (pre-cache). """
+    zones = pd.read_hdf(fpath, key)
+    zones['geometry'] = zones['geometry'].apply(wkt.loads)
+    return gpd.GeoDataFrame(zones, geometry='geometry', crs='EPSG:4326')
+
+
+if __name__ == '__main__':
+
+    zones = synthetic_zones()
+    print("{0} zones, {1} vertices each".format(NUM_ZONES, VERTICES_PER_ZONE))
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        h5_fpath = os.path.join(data_dir, 'model_data.h5')
+        out_zones = pd.DataFrame(zones.copy())
+        out_zones['geometry'] = out_zones['geometry'].apply(lambda x: x.wkt)
+        out_zones.to_hdf(h5_fpath, key='block_zone_geoms')
+        cache_fpath = os.path.join(data_dir, 'block_zone_geoms.parquet')
+        geog.write_geoms_cache(
+            read_wkt_h5(h5_fpath, 'block_zone_geoms'), cache_fpath)
+
+        with timer('wkt h5'):
+            expected = read_wkt_h5(h5_fpath, 'block_zone_geoms')
+
+        geog._geoms_cache.clear()
+        with timer('geoparquet'):
+            result = geog.read_geoms_cache(cache_fpath)
+
+        with timer('memoized'):
+            geog.read_geoms_cache(cache_fpath)
+
+        print("{0:>12}: {1:.1f} MB, {2:.1f} MB".format(
+            'size h5, pq', os.path.getsize(h5_fpath) / 1e6,
+            os.path.getsize(cache_fpath) / 1e6))
+
+    pd.testing.assert_frame_equal(
+        pd.DataFrame(expected.drop(columns='geometry')),
+        pd.DataFrame(result.drop(columns='geometry')))
+    assert expected.geometry.geom_equals_exact(result.geometry, 0).all()
+    assert expected.crs == result.crs
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from pilates.utils.geog import ZoneIndex
+from pilates.benchmarks.harness import timer
+
+NUM_GEOIDS = 100000
+NUM_LOOKUPS = 2000000
+NUM_REPLACE_LOOKUPS = 2000  # dict replace scales with GEOIDs x lookups
+SHARE_MISSING = 0.01
+
+
+def synthetic_mapping(seed=0):
+    rng = np.random.default_rng(seed)
+    geoids = np.char.add('48453', np.char.zfill(
+        rng.permutation(NUM_GEOIDS * 10)[:NUM_GEOIDS].astype(str), 10))
+    zone_ids = (rng.permutation(NUM_GEOIDS) + 1).astype(str)
+    values = geoids[rng.integers(0, NUM_GEOIDS, NUM_LOOKUPS)].astype(object)
+    values[rng.random(NUM_LOOKUPS) < SHARE_MISSING] = '484530000000000'
+    return geoids, zone_ids, pd.Series(values)
+
+
+def zone_order_dict(mapping):
+    """ Reference skims zone order (pre-ZoneIndex). """
+    order = pd.DataFrame.from_dict(
+        mapping, orient='index', columns=['zone_id']).astype(int)
+    return np.array(order.sort_values('zone_id').index)
+
+
+if __name__ == '__main__':
+
+    geoids, zone_ids, values = synthetic_mapping()
+    mapping = dict(zip(geoids, zone_ids))
+    print("{0} GEOIDs, {1} lookups".format(NUM_GEOIDS, NUM_LOOKUPS))
+
+    with timer('replace', 'for {0} lookups'.format(NUM_REPLACE_LOOKUPS)):
+        replaced = values[:NUM_REPLACE_LOOKUPS].replace(mapping)
+
+    with timer('map'):
+        mapped = values.map(mapping)
+
+    with timer('build'):
+        zone_index = ZoneIndex(geoids, zone_ids, 'block')
+
+    with timer('lookup'):
+        kept = zone_index.lookup(values, keep_missing=True)
+
+    assert (replaced.values == kept[:NUM_REPLACE_LOOKUPS]).all()
+    result = pd.Series(zone_index.lookup(values))
+    pd.testing.assert_series_equal(
+        mapped.astype(object), result, check_dtype=False)
+    assert (zone_order_dict(mapping) == zone_index.order).all()
+    assert zone_index.mapping == mapping
@@ -9,6 +9,7 @@ import random
 # from collections import OrderedDict
 import logging
 from sortedcontainers import SortedDict
+from pilates.utils.io import read_table, table_schema
 
 logger = logging.getLogger("polaris.pre")
 
@@ -329,6 +330,10 @@ def clean_db(DbCon, clear_agents=True):
 
 
 class Usim_Data:
+	hh_columns = ['serialno', 'block_id', 'cars', 'persons', 'income', 'workers', 'hh_type', 'sf_detached']
+	job_columns = ['block_id', 'sector_id']
+	block_columns = ['county_id', 'tract_id']
+
 	def __init__(self, forecast_year, usim_output):
 		self.block_hh_count = {}
 		self.hh_data = None
@@ -361,12 +366,17 @@ class Usim_Data:
 
 		self.usim_data = pd.HDFStore(usim_output)
 
-		self.hh_data = self.usim_data[self.households_data_lbl]
+		# only read the columns used to build the POLARIS records, except for
+		# persons, which are written back to the datastore on Close()
+		hh_cols = self.hh_columns
+		if 'time_in_home' in table_schema(self.usim_data, self.households_data_lbl).columns:
+			hh_cols = hh_cols + ['time_in_home']
+		self.hh_data = read_table(self.usim_data, self.households_data_lbl, columns=hh_cols)
 		self.hh_idx = self.hh_data.index
 		self.per_data = self.usim_data[self.persons_data_lbl]
 		self.per_idx = self.per_data.index
-		self.job_data = self.usim_data[self.jobs_data_lbl]
-		self.block_data = self.usim_data[self.blocks_data_lbl]
+		self.job_data = read_table(self.usim_data, self.jobs_data_lbl, columns=self.job_columns)
+		self.block_data = read_table(self.usim_data, self.blocks_data_lbl, columns=self.block_columns)
 
 	def Fill_From_Usim_Output(self):
 
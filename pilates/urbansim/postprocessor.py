@@ -1,7 +1,8 @@
 import os
 import logging
 import pandas as pd
-from pilates.utils.io import read_datastore
+from pilates.utils.io import (
+    convert_to_table_format, copy_table, read_datastore)
 
 logger = logging.getLogger("urbansim.post")
 
@@ -49,22 +50,27 @@ def create_next_iter_usim_data(settings, year, forecast_year):
     logger.info('Merging results back into UrbanSim and storing as .h5!')
     output_store, table_prefix_year = read_datastore(settings, forecast_year)
 
+    # none of the tables change here, so they are copied at the HDF5 level
+    # without going through pandas
     for h5_key in output_store.keys():
         table_name = h5_key.split('/')[-1]
         if os.path.join('/', table_prefix_year, table_name) == h5_key:
             updated_tables.append(table_name)
-            new_input_store[table_name] = output_store[h5_key]
+            copy_table(output_store, h5_key, new_input_store, table_name)
 
     # copy missing tables from original usim inputs into new input data store
     for h5_key in og_input_store.keys():
         table_name = h5_key.split('/')[-1]
         if table_name not in updated_tables:
             logger.info(f"Copying {table_name} input table to output store!")
-            new_input_store[table_name] = og_input_store[h5_key]
+            copy_table(og_input_store, h5_key, new_input_store, table_name)
 
     if new_input_store.keys() != og_input_store.keys():
         logger.error(f"inputs store keys ({new_input_store.keys()}) do not match original input keys ({og_input_store.keys()})")
 
+    convert_to_table_format(
+        new_input_store, settings.get('usim_table_format_tables', None) or [])
+
     og_input_store.close()
     new_input_store.close()
     output_store.close()
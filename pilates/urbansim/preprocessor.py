@@ -3,7 +3,9 @@ import logging
 import os
 import h5py
 
-from pilates.utils.geog import geoid_to_zone_map
+from pilates.utils.geog import get_zone_index
+from pilates.utils.io import (
+    read_cached_skims, skims_cache_settings, table_schema)
 
 logger = logging.getLogger("urbansim.pre")
 
@@ -37,7 +39,11 @@ def _load_raw_skims(settings, skim_format):
             path_to_skims = os.path.join(
                 settings['beam_local_output_folder'], skims_fname)
             # load skims from disk or url
-            skims = pd.read_csv(path_to_skims, dtype=skim_dtypes)
+            skims = read_cached_skims(
+                path_to_skims, dtype=skim_dtypes, usecols=[
+                    'timePeriod', 'pathType', 'origin', 'destination',
+                    'TOTIVT_IVT_minutes', 'DIST_meters'],
+                **skims_cache_settings(settings))
             skims = skims.loc[(
                 skims['pathType'] == 'SOV') & (
                 skims['timePeriod'] == 'AM')]
@@ -71,9 +77,9 @@ def _load_raw_skims(settings, skim_format):
 
     # for GEOID/FIPS-based skims, we have to convert the zone IDs
     if settings['skims_zone_type'] in ['block', 'block_group']:
-        mapping = geoid_to_zone_map(settings)
+        zone_index = get_zone_index(settings)
         for col in ['from_zone_id', 'to_zone_id']:
-            skims[col] = skims[col].map(mapping)
+            skims[col] = zone_index.lookup(skims[col])
 
     skims = skims.set_index(['from_zone_id', 'to_zone_id'])
 
@@ -110,20 +116,21 @@ def add_skims_to_model_data(settings):
     # the base year urbansim data is touched by pilates
     zone_id_col = 'zone_id'
     logger.debug(f"{model_data_fpath} has the following keys: {store.keys()}")
-    if zone_id_col not in store['blocks'].columns:
+    if zone_id_col not in table_schema(store, 'blocks').columns:
 
         blocks = store['blocks'].copy()
-        mapping = geoid_to_zone_map(settings)
+        zone_index = get_zone_index(settings)
         zone_type = settings['skims_zone_type']
 
         if zone_type == 'block':
             logger.info("Mapping block IDs")
-            blocks[zone_id_col] = blocks.index.astype(str).replace(mapping)
+            blocks[zone_id_col] = zone_index.lookup(
+                blocks.index.astype(str), keep_missing=True)
 
         elif zone_type == 'block_group':
             logger.info("Mapping blocks to block group IDS")
-            blocks[zone_id_col] = blocks.block_group_id.astype(str).replace(
-                mapping)
+            blocks[zone_id_col] = zone_index.lookup(
+                blocks.block_group_id.astype(str), keep_missing=True)
 
         elif zone_type == 'taz':
             logger.info("Mapping block IDs to TAZ")
@@ -1,15 +1,76 @@
 import geopandas as gpd
+import numpy as np
 import pandas as pd
+import hashlib
+import json
 import logging
 import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from scipy.spatial import cKDTree
 from shapely.geometry import Polygon
 from tqdm import tqdm
 import os
 
-from pilates.utils.io import read_datastore
+from pilates.utils.io import read_datastore, read_table
 
 logger = logging.getLogger("pilates.utils")
 
+#############################
+#### ZONE GEOMETRY CACHE ####
+#############################
+
+# Geometries read or written in this process, by cache file path
+_geoms_cache = {}
+
+
+def geoms_cache_path(settings, zone_type):
+    """
+    Path of the GeoParquet file caching the `zone_type` geometries of the
+    region. The cache folder is relative to the data folder, like the
+    TIGERweb cache.
+    """
+    cache_dir = settings.get('geoms_cache_folder', None) or 'tmp'
+    data_dir = settings.get('data_folder', None)
+    if data_dir is not None:
+        cache_dir = os.path.join(data_dir, cache_dir)
+    file_name = '{0}_{1}.parquet'.format(zone_type, settings['region'])
+    return os.path.join(cache_dir, file_name)
+
+
+def read_geoms_cache(fpath):
+    """
+    Reads a GeoParquet geometry cache. Geometries are stored as WKB and
+    decoded in a single vectorized pass. The GeoDataFrame is memoized so
+    later calls in the same process do not touch the disk.
+
+    Returns:
+    --------
+    A copy of the cached GeoDataFrame, or None if there is no cache.
+    """
+    if fpath not in _geoms_cache:
+        if not os.path.exists(fpath):
+            return None
+        _geoms_cache[fpath] = gpd.read_parquet(fpath)
+    return _geoms_cache[fpath].copy()
+
+
+def write_geoms_cache(gdf, fpath):
+    """ Stores a GeoDataFrame in the GeoParquet geometry cache. """
+    os.makedirs(os.path.dirname(fpath) or '.', exist_ok=True)
+    gdf.to_parquet(fpath)
+    _geoms_cache[fpath] = gdf.copy()
+
+
+def _read_legacy_shapefile(fpath, cache_fpath):
+    """ Migrates geometries cached as a shapefile by earlier runs. """
+    gdf = gpd.read_file(fpath)
+    write_geoms_cache(gdf, cache_fpath)
+    return gdf
+
+
 def get_taz_geoms(settings, taz_id_col_in='taz1454', zone_id_col_out='zone_id',
                   data_dir='./tmp/' ):
 
@@ -18,10 +79,15 @@ def get_taz_geoms(settings, taz_id_col_in='taz1454', zone_id_col_out='zone_id',
 
     file_name =  '{0}_{1}.shp'.format(zone_type, region)
     taz_geoms_fpath = os.path.join(data_dir, file_name)
+    cache_fpath = geoms_cache_path(settings, zone_type)
+    gdf = read_geoms_cache(cache_fpath)
+
+    if gdf is not None:
+        logger.info("Loading taz geoms from cache!")
 
-    if os.path.exists(taz_geoms_fpath):
+    elif os.path.exists(taz_geoms_fpath):
         logger.info("Loading taz geoms from disk!")
-        gdf = gpd.read_file(taz_geoms_fpath)
+        gdf = _read_legacy_shapefile(taz_geoms_fpath, cache_fpath)
 
     else:
         logger.info("Downloading {} geoms".format(zone_type))
@@ -37,66 +103,366 @@ def get_taz_geoms(settings, taz_id_col_in='taz1454', zone_id_col_out='zone_id',
 
         # zone_id col must be str
         gdf[zone_id_col_out] = gdf[zone_id_col_out].astype(str)
-        gdf.to_file(taz_geoms_fpath)
+        write_geoms_cache(gdf, cache_fpath)
 
     return gdf
 
 
-def get_county_block_geoms(
-        state_fips, county_fips, zone_type='block', result_size=10000):
-
-    if (zone_type == 'block') or (zone_type == 'taz'): #to map blocks to taz.
-        base_url = (
-            'https://tigerweb.geo.census.gov/arcgis/rest/services/TIGERweb/'
-#             'Tracts_Blocks/MapServer/12/query?where=STATE%3D{0}+and+COUNTY%3D{1}' #2020 census
-            'tigerWMS_Census2010/MapServer/18/query?where=STATE%3D{0}+and+COUNTY%3D{1}'#2010 census
-            '&resultRecordCount={2}&resultOffset={3}&orderBy=GEOID'
-            '&outFields=GEOID%2CSTATE%2CCOUNTY%2CTRACT%2CBLKGRP%2CBLOCK%2CCENTLAT'
-            '%2CCENTLON&outSR=%7B"wkid"+%3A+4326%7D&f=json')
-
-    elif zone_type == 'block_group':
-        base_url = (
-            'https://tigerweb.geo.census.gov/arcgis/rest/services/TIGERweb/'
-#             'Tracts_Blocks/MapServer/11/query?where=STATE%3D{0}+and+COUNTY%3D{1}' #2020 census
-            'tigerWMS_Census2010/MapServer/16/query?where=STATE%3D{0}+and+COUNTY%3D{1}'#2010 census
-            '&resultRecordCount={2}&resultOffset={3}&orderBy=GEOID'
-            '&outFields=GEOID%2CSTATE%2CCOUNTY%2CTRACT%2CBLKGRP%2CCENTLAT'
-            '%2CCENTLON&outSR=%7B"wkid"+%3A+4326%7D&f=json')
-
-    blocks_remaining = True
-    all_features = []
-    page = 0
-    while blocks_remaining:
-        offset = page * result_size
-        url = base_url.format(state_fips, county_fips, result_size, offset)
-        result = requests.get(url)
-        try:
-            features = result.json()['features']
-        except KeyError:
-            logger.error("No features returned. Try a smaller result size.")
-        all_features += features
-        if 'exceededTransferLimit' in result.json().keys():
-            if result.json()['exceededTransferLimit']:
-                page += 1
-            else:
-                blocks_remaining = False
+###############################
+#### PROJECTED ZONES CACHE ####
+###############################
+
+class ProjectedZones(object):
+    """
+    Zone geometries projected to a CRS, with their centroids, areas and a
+    spatial index, in the order of the zones GeoDataFrame.
+
+    Parameters:
+    ------------
+    - zones: GeoPandas GeoDataFrame. Geometries without a CRS are assumed
+        to be in EPSG:4326.
+    - crs: str. CRS to project the zones to.
+    """
+
+    def __init__(self, zones, crs):
+        if zones.crs is None:
+            zones = zones.set_crs('EPSG:4326')
+        self.crs = crs
+        self.zones = gpd.GeoDataFrame(
+            geometry=zones.geometry.to_crs(crs), index=zones.index)
+        centroids = self.zones.geometry.centroid
+        self.zones['centroid_x'] = centroids.x.values
+        self.zones['centroid_y'] = centroids.y.values
+        self.zones['area'] = self.zones.geometry.area.values
+
+    @classmethod
+    def from_projected(cls, projected):
+        """ Wraps a GeoDataFrame previously built by `ProjectedZones`. """
+        obj = cls.__new__(cls)
+        obj.crs = projected.crs
+        obj.zones = projected
+        return obj
+
+    def __len__(self):
+        return len(self.zones)
+
+    @property
+    def index(self):
+        return self.zones.index
+
+    @property
+    def geometry(self):
+        return self.zones.geometry
+
+    @property
+    def centroids(self):
+        """ numpy array of shape (num_zones, 2) of centroid x, y. """
+        return self.zones[['centroid_x', 'centroid_y']].values
+
+    @property
+    def areas(self):
+        return self.zones['area'].values
+
+    @property
+    def sindex(self):
+        """ Spatial index of the projected geometries, built on first use. """
+        return self.zones.sindex
+
+    def query(self, geometry, predicate='intersects'):
+        """
+        Pairs of (geometry position, zone position) satisfying `predicate`.
+        `geometry` must be in the projected CRS.
+        """
+        sindex = self.sindex
+        query = getattr(sindex, 'query_bulk', sindex.query)
+        return query(geometry, predicate=predicate)
+
+    def nearest_centroids(self, xy):
+        """ Position of the zone with the nearest centroid of each point. """
+        centroids = self.centroids
+        valid = np.flatnonzero(np.isfinite(centroids).all(axis=1))
+        _, nearest = cKDTree(centroids[valid]).query(xy)
+        return valid[nearest]
+
+
+def _zones_fingerprint(zones):
+    """ Short hash of the zone IDs and bounding boxes, so cached projected
+    zones are not reused after the zone geometries change. """
+    sha = hashlib.sha1()
+    sha.update('\n'.join(zones.index.astype(str)).encode())
+    sha.update(np.ascontiguousarray(zones.geometry.bounds.values).tobytes())
+    sha.update(str(zones.crs).encode())
+    return sha.hexdigest()[:12]
+
+
+# Projected zones built in this process, by (zone system, crs)
+_projected_zones = {}
+
+
+def _evict_projected_zones(data_dir, prefix, keep):
+    """
+    Deletes the cached projected zones of earlier zone geometries, i.e. the
+    files of the same zone system and crs with another fingerprint, so a
+    single file is kept per zone system and crs.
+    """
+    for fname in os.listdir(data_dir):
+        fingerprint = fname[len(prefix):-len('.parquet')]
+        fpath = os.path.join(data_dir, fname)
+        if fname.startswith(prefix) and fname.endswith('.parquet') and \
+                len(fingerprint) == 12 and '_' not in fingerprint and \
+                fpath != keep:
+            logger.info("Removing stale projected zones {0}.".format(fpath))
+            os.remove(fpath)
+            _geoms_cache.pop(fpath, None)
+
+
+def zone_system_name(settings, zone_type=None):
+    """ Name of a zone system of the region, e.g. 'austin_block_group'. """
+    return '{0}_{1}'.format(
+        settings['region'], zone_type or settings['skims_zone_type'])
+
+
+def project_zones(zones, crs, zone_system=None, data_dir='./tmp/'):
+    """
+    Returns the `ProjectedZones` of a zones GeoDataFrame. When a zone system
+    name is given, projected geometries, centroids and areas are cached in
+    memory and in a GeoParquet file keyed by (zone system, crs) and a
+    fingerprint of the zones, so they are computed once instead of every
+    call and every forecast year. The file replaces those of earlier
+    fingerprints. The spatial index is rebuilt from the cached projected
+    geometries.
+
+    Parameters:
+    ------------
+    - zones: GeoPandas GeoDataFrame.
+    - crs: str. CRS to project the zones to.
+    - zone_system: str. Name of the zone system, see `zone_system_name`.
+        None disables caching.
+    - data_dir: str. Folder of the cache files.
+    """
+    if zone_system is None:
+        return ProjectedZones(zones, crs)
+
+    key = (zone_system, crs)
+    projected = _projected_zones.get(key)
+    if (projected is None) or not projected.index.equals(zones.index):
+        prefix = 'projected_{0}_{1}_'.format(zone_system, crs.replace(':', ''))
+        fpath = os.path.join(
+            data_dir, prefix + _zones_fingerprint(zones) + '.parquet')
+        cached = read_geoms_cache(fpath)
+        if cached is not None:
+            logger.info("Loading projected {0} zones from cache!".format(
+                zone_system))
+            projected = ProjectedZones.from_projected(cached)
         else:
-            if len(features) == 0:
-                blocks_remaining = False
-            else:
-                page += 1
-
-    df = pd.DataFrame()
-    for feature in all_features:
-        tmp = pd.DataFrame([feature['attributes']])
-        tmp['geometry'] = Polygon(
-            feature['geometry']['rings'][0],
-            feature['geometry']['rings'][1:])
-        df = pd.concat((df, tmp))
-    gdf = gpd.GeoDataFrame(df, crs="EPSG:4326")
+            projected = ProjectedZones(zones, crs)
+            write_geoms_cache(projected.zones, fpath)
+            _evict_projected_zones(data_dir, prefix, keep=fpath)
+        _projected_zones[key] = projected
+    return projected
+
+
+##############################
+#### TIGERWEB BLOCK GEOMS ####
+##############################
+
+TIGERWEB_URL = 'https://tigerweb.geo.census.gov/arcgis/rest/services/TIGERweb/'
+
+# MapServer layer and attribute fields of the geometries, by zone type
+TIGERWEB_LAYERS = {
+    # 'Tracts_Blocks/MapServer/12' for the 2020 census
+    'block': (
+        'tigerWMS_Census2010/MapServer/18',
+        'GEOID,STATE,COUNTY,TRACT,BLKGRP,BLOCK,CENTLAT,CENTLON'),
+    # 'Tracts_Blocks/MapServer/11' for the 2020 census
+    'block_group': (
+        'tigerWMS_Census2010/MapServer/16',
+        'GEOID,STATE,COUNTY,TRACT,BLKGRP,CENTLAT,CENTLON')}
+TIGERWEB_LAYERS['taz'] = TIGERWEB_LAYERS['block']  # to map blocks to taz.
+
+
+def tigerweb_settings(settings):
+    """
+    Keyword arguments for `download_block_features` taken from the settings.
+    The cache folder is relative to the data folder, like the skims cache.
+    Response caching is disabled if no cache folder is set.
+    """
+    cache_dir = settings.get('tigerweb_cache_folder', None)
+    if cache_dir:
+        data_dir = settings.get('data_folder', None)
+        if data_dir is not None:
+            cache_dir = os.path.join(data_dir, cache_dir)
+    else:
+        cache_dir = None
+    return {
+        'base_url': settings.get('tigerweb_url', None) or TIGERWEB_URL,
+        'cache_dir': cache_dir,
+        'num_threads': settings.get('tigerweb_num_threads', 8),
+        'max_retries': settings.get('tigerweb_max_retries', 5)}
+
+
+def _get_json(url, params, cache_fpath=None, max_retries=5, backoff=1.0,
+              timeout=120):
+    """
+    GETs an ArcGIS JSON response, retrying failed requests with exponential
+    backoff. Responses are read from and written to `cache_fpath` if given.
+    """
+    if (cache_fpath is not None) and os.path.exists(cache_fpath):
+        with open(cache_fpath) as f:
+            return json.load(f)
+
+    for attempt in range(max_retries):
+        try:
+            result = requests.get(url, params=params, timeout=timeout)
+            result.raise_for_status()
+            response = result.json()
+            if 'error' in response:
+                raise ValueError(response['error'])
+            break
+        except (requests.RequestException, ValueError) as e:
+            if attempt == max_retries - 1:
+                raise
+            wait = backoff * 2 ** attempt
+            logger.warning(
+                "TIGERweb request failed ({0}). Retrying in {1:.0f}s.".format(
+                    e, wait))
+            time.sleep(wait)
+
+    if cache_fpath is not None:
+        tmp_fpath = '{0}.{1}.tmp'.format(cache_fpath, threading.get_ident())
+        with open(tmp_fpath, 'w') as f:
+            json.dump(response, f)
+        os.replace(tmp_fpath, cache_fpath)
+    return response
+
+
+def download_block_features(
+        state_fips, county_codes, zone_type='block', result_size=10000,
+        base_url=TIGERWEB_URL, cache_dir=None, num_threads=8, max_retries=5,
+        backoff=1.0):
+    """
+    Downloads the ArcGIS features of the blocks (or block groups) of a list
+    of counties from the TIGERweb REST API. The feature count of each county
+    is queried first, then all the pages of all the counties are fetched
+    concurrently.
+
+    Parameters:
+    ------------
+    - state_fips: str. State FIPS code.
+    - county_codes: list of str. County FIPS codes.
+    - zone_type: str. One of the `TIGERWEB_LAYERS` keys.
+    - result_size: int. Number of features per page.
+    - base_url: str. ArcGIS REST services root, e.g. a local stand-in server.
+    - cache_dir: str. Folder raw responses are cached in, so reruns are
+        offline. None disables the cache.
+    - num_threads: int. Maximum number of concurrent requests.
+    - max_retries: int. Attempts per request.
+    - backoff: float. Seconds to wait after the first failed attempt, doubled
+        after each further failure.
+
+    Returns:
+    ---------
+    dict of county code to list of features, in GEOID order.
+    """
+    layer, out_fields = TIGERWEB_LAYERS[zone_type]
+    url = base_url.rstrip('/') + '/' + layer + '/query'
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def fetch(county, cache_name, **params):
+        query = {
+            'where': 'STATE={0} and COUNTY={1}'.format(state_fips, county),
+            'f': 'json'}
+        query.update(params)
+        cache_fpath = None
+        if cache_dir is not None:
+            cache_fpath = os.path.join(cache_dir, '{0}_{1}_{2}_{3}.json'.format(
+                layer.replace('/', '_'), state_fips, county, cache_name))
+        return _get_json(url, query, cache_fpath, max_retries, backoff)
+
+    def fetch_count(county):
+        return fetch(county, 'count', returnCountOnly='true')['count']
+
+    def fetch_page(page):
+        county, offset = page
+        return fetch(
+            county, '{0}_{1}'.format(result_size, offset),
+            resultRecordCount=result_size, resultOffset=offset,
+            orderBy='GEOID', outFields=out_fields,
+            outSR='{"wkid" : 4326}')
+
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        counts = dict(zip(county_codes, executor.map(
+            fetch_count, county_codes)))
+        pages = [
+            (county, offset) for county in county_codes
+            for offset in range(0, counts[county], result_size)]
+        responses = list(tqdm(
+            executor.map(fetch_page, pages),
+            total=len(pages), desc='Getting {0} geoms for {1} counties'.format(
+                zone_type, len(county_codes))))
+
+    features = {county: [] for county in county_codes}
+    for (county, offset), response in zip(pages, responses):
+        page_features = response.get('features', [])
+        if response.get('exceededTransferLimit', False) and \
+                len(page_features) < result_size:
+            raise ValueError(
+                "TIGERweb returned {0} of {1} features per page. Try a "
+                "smaller result size.".format(len(page_features), result_size))
+        features[county] += page_features
+
+    for county in county_codes:
+        if len(features[county]) != counts[county]:
+            logger.error(
+                "Got {0} of {1} features for county {2}.".format(
+                    len(features[county]), counts[county], county))
+    return features
+
+
+def _feature_polygons(rings):
+    """
+    Polygons of the ArcGIS geometry rings of each feature. The first ring
+    is the shell and the others are holes. With shapely 2 all polygons are
+    built at once from the flattened ring coordinates.
+    """
+    try:
+        from shapely import linearrings, polygons
+    except ImportError:  # shapely < 2
+        return [Polygon(r[0], r[1:]) for r in rings]
+    if len(rings) == 0:
+        return []
+
+    num_rings = np.fromiter(map(len, rings), dtype=int, count=len(rings))
+    all_rings = list(chain.from_iterable(rings))
+    ring_sizes = np.fromiter(
+        map(len, all_rings), dtype=int, count=len(all_rings))
+    coords = np.array(list(chain.from_iterable(all_rings)), dtype=float)
+    all_rings = linearrings(
+        coords, indices=np.repeat(np.arange(len(all_rings)), ring_sizes))
+    return polygons(
+        all_rings, indices=np.repeat(np.arange(len(rings)), num_rings))
+
+
+def features_to_gdf(features):
+    """ GeoDataFrame of the polygons and attributes of ArcGIS features. """
+    df = pd.DataFrame.from_records(
+        [feature['attributes'] for feature in features])
+    geometry = _feature_polygons(
+        [feature['geometry']['rings'] for feature in features])
+    gdf = gpd.GeoDataFrame(df, geometry=geometry, crs="EPSG:4326")
     return gdf
 
 
+def get_county_block_geoms(
+        state_fips, county_fips, zone_type='block', result_size=10000,
+        **kwargs):
+
+    features = download_block_features(
+        state_fips, [county_fips], zone_type, result_size, **kwargs)
+    return features_to_gdf(features[county_fips])
+
+
 def get_block_geoms(settings, data_dir='./tmp/'):
 
     region = settings['region']
@@ -112,81 +478,112 @@ def get_block_geoms(settings, data_dir='./tmp/'):
 
     all_block_geoms = []
     file_name = '{0}_{1}.shp'.format(zone_type_v1, region)
+    cache_fpath = geoms_cache_path(settings, zone_type_v1)
+    blocks_gdf = read_geoms_cache(cache_fpath)
+
+    if blocks_gdf is not None:
+        logger.info("Loading block geoms from cache!")
 
-    if os.path.exists(os.path.join(data_dir, file_name)):
+    elif os.path.exists(os.path.join(data_dir, file_name)):
         logger.info("Loading block geoms from disk!")
-        blocks_gdf = gpd.read_file(os.path.join(data_dir, file_name))
+        blocks_gdf = _read_legacy_shapefile(
+            os.path.join(data_dir, file_name), cache_fpath)
 
     else:
         logger.info("Downloading {} geoms from Census TIGERweb API!".format(zone_type))
 
         # get block geoms from census tigerweb API
-        for county in tqdm(
-                county_codes, total=len(county_codes),
-                desc='Getting block geoms for {0} counties'.format(
-                    len(county_codes))):
-            county_gdf = get_county_block_geoms(state_fips, county, zone_type)
-            all_block_geoms.append(county_gdf)
+        features = download_block_features(
+            state_fips, county_codes, zone_type, **tigerweb_settings(settings))
+        for county in county_codes:
+            all_block_geoms.append(features_to_gdf(features[county]))
 
         blocks_gdf = gpd.GeoDataFrame(
             pd.concat(all_block_geoms, ignore_index=True), crs="EPSG:4326")
 
         # make sure geometries match with geometries in blocks table
         if zone_type in ['block','block_group']:
-            geoids = list(geoid_to_zone_map(settings, year=None).keys())
-            blocks_gdf = blocks_gdf[blocks_gdf.GEOID.isin(geoids)]
+            zone_index = get_zone_index(settings, year=None)
+            blocks_gdf = blocks_gdf[zone_index.contains(blocks_gdf.GEOID)]
+        blocks_gdf = blocks_gdf.reset_index(drop=True)
 
         # save to disk
         logger.info(
             "Got {0} block geometries. Saving to disk.".format(
-                len(all_block_geoms)))
-        blocks_gdf.to_file(os.path.join(data_dir, file_name))
+                len(blocks_gdf)))
+        write_geoms_cache(blocks_gdf, cache_fpath)
 
     return blocks_gdf
 
 
-def get_taz_from_block_geoms(blocks_gdf, zones_gdf, local_crs, zone_col_name):
+def get_taz_from_block_geoms(blocks_gdf, zones_gdf, local_crs, zone_col_name,
+                             zone_system=None):
+    """
+    Assigns every block to the zone it shares the largest area with. Only
+    the block-zone pairs whose bounding boxes intersect in the zones spatial
+    index are intersected. Blocks that don't intersect any zone are
+    assigned to the zone with the nearest centroid.
 
-    logger.info("Assigning blocks to TAZs!")
+    Parameters:
+    ------------
+    - blocks_gdf: GeoPandas GeoDataFrame with a GEOID column.
+    - zones_gdf: GeoPandas GeoDataFrame with `zone_col_name` as a column
+        or as the index.
+    - local_crs: str. CRS in meters areas and distances are computed in.
+    - zone_col_name: str. Name of the zone ID.
+    - zone_system: str. Name of the zone system, to reuse its projected
+        geometries and spatial index, see `project_zones`.
 
-    # df to store GEOID to TAZ results
-    block_to_taz_results = pd.DataFrame()
+    Returns:
+    ---------
+        A series of zone IDs named `zone_col_name` with 'GEOID' as index
+    """
+    logger.info("Assigning blocks to TAZs!")
 
-    # ignore empty geoms
-    zones_gdf = zones_gdf[~zones_gdf['geometry'].is_empty]
+    if zone_col_name not in zones_gdf.columns:
+        zones_gdf = zones_gdf.reset_index()
 
     # convert to meter-based proj
-    zones_gdf = zones_gdf.to_crs(local_crs)
+    zones = project_zones(zones_gdf, local_crs, zone_system)
     blocks_gdf = blocks_gdf.to_crs(local_crs)
+    zone_ids = zones_gdf[zone_col_name].values
+    geoids = blocks_gdf['GEOID'].values
 
-    zones_gdf['zone_area'] = zones_gdf.geometry.area
+    # candidate block-zone pairs from the zones spatial index. empty zone
+    # geoms never intersect a block
+    block_pos, zone_pos = zones.query(
+        blocks_gdf.geometry, predicate='intersects')
 
     # assign zone ID's to blocks based on max area of intersection
-    intx = gpd.overlay(blocks_gdf, zones_gdf.reset_index(), how='intersection')
-    intx['intx_area'] = intx['geometry'].area
-    intx = intx.sort_values(['GEOID', 'intx_area'], ascending=False)
+    intx = pd.DataFrame({
+        'GEOID': geoids[block_pos], zone_col_name: zone_ids[zone_pos]})
+    intx['intx_area'] = blocks_gdf.geometry.iloc[block_pos].reset_index(
+        drop=True).intersection(zones.geometry.iloc[zone_pos].reset_index(
+            drop=True)).area.values
+    intx = intx[intx['intx_area'] > 0]
+    intx = intx.sort_values(
+        ['GEOID', 'intx_area'], ascending=False, kind='mergesort')
     intx = intx.drop_duplicates('GEOID', keep='first')
-
-    # add to results df
-    block_to_taz_results = pd.concat((
-        block_to_taz_results, intx[['GEOID', zone_col_name]]))
+    block_to_taz_results = intx[['GEOID', zone_col_name]]
 
     # assign zone ID's to remaining blocks based on shortest
     # distance between block and zone centroids
-    unassigned_mask = ~blocks_gdf['GEOID'].isin(block_to_taz_results['GEOID'])
-
-    if any(unassigned_mask):
+    unassigned = ~blocks_gdf['GEOID'].isin(block_to_taz_results['GEOID']).values
 
-        blocks_gdf['geometry'] = blocks_gdf['geometry'].centroid
-        zones_gdf['geometry'] = zones_gdf['geometry'].centroid
+    if unassigned.any():
 
-        all_dists = blocks_gdf.loc[unassigned_mask, 'geometry'].apply(
-            lambda x: zones_gdf['geometry'].distance(x))
+        block_centroids = blocks_gdf.geometry.iloc[unassigned].centroid
+        block_xy = np.column_stack([block_centroids.x, block_centroids.y])
+        finite = np.isfinite(block_xy).all(axis=1)
+        if not finite.all():
+            logger.warning(
+                "{0} blocks without geometry were not assigned to "
+                "a zone.".format((~finite).sum()))
 
-        nearest = all_dists.idxmin(axis=1).reset_index()
-        nearest.columns = ['blocks_idx', zone_col_name]
-        nearest.set_index('blocks_idx', inplace=True)
-        nearest['GEOID'] = blocks_gdf.reindex(nearest.index)['GEOID']
+        nearest = zones.nearest_centroids(block_xy[finite])
+        nearest = pd.DataFrame({
+            'GEOID': geoids[unassigned][finite],
+            zone_col_name: zone_ids[nearest]})
 
         block_to_taz_results = pd.concat((
             block_to_taz_results, nearest[['GEOID', zone_col_name]]))
@@ -209,17 +606,20 @@ def map_block_to_taz(
     blocks_gdf = get_block_geoms(settings, data_dir)
     blocks_gdf.crs = 'EPSG:4326'
     blocks_to_taz = get_taz_from_block_geoms(
-        blocks_gdf, zones_gdf, local_crs, zone_id_col)
+        blocks_gdf, zones_gdf, local_crs, zone_id_col,
+        zone_system=zone_system_name(settings, 'taz'))
     return blocks_to_taz.astype(str)
 
 
-def get_zone_from_points(df, zones_gdf, local_crs):
+def get_zone_from_points(df, zones_gdf, local_crs, zone_system=None):
     '''
     Assigns the gdf index (zone_id) for each index in df
     Parameters:
     -----------
     - df columns names x, and y. The index is the ID of the point feature.
     - zones_gdf: GeoPandas GeoDataFrame with zone_id as index, geometry, area.
+    - zone_system: str. Name of the zone system, to reuse its projected
+        geometries and spatial index, see `project_zones`.
 
     Returns:
     -----------
@@ -228,23 +628,127 @@ def get_zone_from_points(df, zones_gdf, local_crs):
     logger.info("Assigning zone IDs to {0}".format(df.index.name))
     zone_id_col = zones_gdf.index.name
 
-    gdf = gpd.GeoDataFrame(
-        df, geometry=gpd.points_from_xy(df.x, df.y), crs="EPSG:4326")
-
-    zones_gdf.geometry.crs = "EPSG:4326"
-
     # convert to meters-based local crs
-    gdf = gdf.to_crs(local_crs)
-    zones_gdf = zones_gdf.to_crs(local_crs)
+    points = gpd.GeoSeries(
+        gpd.points_from_xy(df.x, df.y), crs="EPSG:4326").to_crs(local_crs)
+    zones = project_zones(zones_gdf, local_crs, zone_system)
 
     # Spatial join
-    intx = gpd.sjoin(
-        gdf, zones_gdf.reset_index(),
-        how='left', op='intersects')
+    point_pos, zone_pos = zones.query(points, predicate='intersects')
+    assert len(np.unique(point_pos)) == len(point_pos), \
+        "Points intersecting more than one zone"
+
+    zone_ids = pd.Series(np.nan, index=df.index, dtype=object, name=zone_id_col)
+    zone_ids.iloc[point_pos] = zones.index.values[zone_pos]
+    return zone_ids
 
-    assert len(intx) == len(gdf)
 
-    return intx[zone_id_col]
+class ZoneIndex(object):
+    """
+    GEOID to zone_id mapping of a zone system. Lookups are vectorized over
+    a hash index of the GEOIDs instead of going through a Python dict.
+
+    Parameters:
+    ------------
+    - geoids: array-like of str. GEOIDs (block or block group FIPS codes).
+    - zone_ids: array-like of str. Zone ID of each GEOID.
+    - zone_type: str. One of ['taz', 'block_group', 'block'].
+    """
+
+    def __init__(self, geoids, zone_ids, zone_type):
+        geoid_to_zone = pd.Series(
+            np.asarray(zone_ids, dtype=str).astype(object),
+            index=np.asarray(geoids, dtype=str).astype(object))
+        geoid_to_zone = geoid_to_zone[
+            ~geoid_to_zone.index.duplicated(keep='last')]
+        self.zone_type = zone_type
+        self.geoids = geoid_to_zone.index.values
+        self.zone_ids = geoid_to_zone.values
+        self._index = pd.Index(self.geoids)
+        self._mapping = None
+        self._order = None
+
+    def __len__(self):
+        return len(self.geoids)
+
+    @property
+    def num_zones(self):
+        return len(pd.unique(self.zone_ids))
+
+    @property
+    def mapping(self):
+        """ dict of GEOID to zone_id. """
+        if self._mapping is None:
+            self._mapping = dict(zip(self.geoids, self.zone_ids))
+        return self._mapping
+
+    @property
+    def order(self):
+        """
+        Order of the zones in the skims. Numpy array, the index of the array
+        is the position of the zone.
+        """
+        if self._order is None:
+            if self.zone_type == 'taz':
+                self._order = np.array(
+                    range(1, self.num_zones + 1)).astype(str)
+            else:
+                positions = np.argsort(
+                    self.zone_ids.astype(int), kind='stable')
+                self._order = self.geoids[positions]
+        return self._order
+
+    def positions(self, geoids):
+        """ Position of each GEOID in the index, -1 if it is missing. """
+        codes, uniques = pd.factorize(np.asarray(geoids, dtype=object))
+        positions = self._index.get_indexer(uniques)
+        positions = np.append(positions, -1)  # factorize codes NaN as -1
+        return positions[codes]
+
+    def contains(self, geoids):
+        """ Boolean array, True for the GEOIDs in the index. """
+        return self.positions(geoids) != -1
+
+    def lookup(self, geoids, keep_missing=False):
+        """
+        Zone ID of each GEOID.
+
+        Parameters:
+        ------------
+        - geoids: array-like of str.
+        - keep_missing: bool. Return GEOIDs missing from the index unchanged
+            (like `Series.replace(mapping)`) instead of NaN (like
+            `Series.map(mapping)`).
+
+        Returns:
+        ---------
+        Numpy object array.
+        """
+        geoids = np.asarray(geoids, dtype=object)
+        positions = self.positions(geoids)
+        missing = positions == -1
+        zone_ids = self.zone_ids[positions]
+        zone_ids[missing] = geoids[missing] if keep_missing else np.nan
+        return zone_ids
+
+
+# GEOID to zone indexes built in this process, by (region, travel model,
+# zone type)
+_zone_indexes = {}
+
+
+def get_zone_index(settings, year=None):
+    """
+    Returns the `ZoneIndex` of the skims zone system. It is read (or
+    created) once per run and shared by every caller.
+    """
+    key = (settings['region'], settings['travel_model'],
+           settings['skims_zone_type'])
+    if key not in _zone_indexes:
+        geoid_to_zone = _read_geoid_to_zone(settings, year)
+        _zone_indexes[key] = ZoneIndex(
+            geoid_to_zone.index, geoid_to_zone.values, key[2])
+    return _zone_indexes[key]
 
 
 def geoid_to_zone_map(settings, year=None):
@@ -256,6 +760,18 @@ def geoid_to_zone_map(settings, year=None):
     Returns a dictionary. Keys are GEOIDs and values are the
     corresponding zone_id where the GEOID belongs to.
    """
+    return get_zone_index(settings, year).mapping
+
+
+def _read_geoid_to_zone(settings, year=None):
+    """
+    Reads the GEOID to zone_id mapping, creating and saving it if it
+    does not exist yet.
+
+    Returns
+    --------
+    pandas Series of zone_id, indexed by GEOID.
+    """
     region = settings['region']
     zone_type = settings['skims_zone_type']
     travel_model = settings['travel_model']
@@ -276,7 +792,7 @@ def geoid_to_zone_map(settings, year=None):
             assert geoid_to_zone[zone_id_col].astype(int).min() == 1
             assert geoid_to_zone[zone_id_col].astype(int).max() == num_zones
 
-        mapping = geoid_to_zone.set_index('GEOID')[zone_id_col].to_dict()
+        geoid_to_zone = geoid_to_zone.set_index('GEOID')[zone_id_col]
 
     else:
         logger.info("Zone mapping not found. Creating it on the fly.")
@@ -286,17 +802,18 @@ def geoid_to_zone_map(settings, year=None):
             geoid_to_zone = map_block_to_taz(
                 settings, region, zone_id_col=zone_id_col,
                 reference_taz_id_col='taz1454')
-            mapping = geoid_to_zone.to_dict()
 
         elif zone_type == 'block_group':
             store, table_prefix_yr = read_datastore(settings, year)
-            blocks = store[os.path.join(table_prefix_yr, 'blocks')]
+            blocks = read_table(
+                store, os.path.join(table_prefix_yr, 'blocks'), columns=[])
             order = blocks.index.str[:12].unique()
             store.close()
 
         elif zone_type == 'block':
             store, table_prefix_year = read_datastore(settings, year)
-            blocks = store[os.path.join(table_prefix_year, 'blocks')]
+            blocks = read_table(
+                store, os.path.join(table_prefix_year, 'blocks'), columns=[])
             order = blocks.index.unique()
             store.close()
 
@@ -313,9 +830,8 @@ def geoid_to_zone_map(settings, year=None):
                 dtype=str)
 
             geoid_to_zone = geoid_to_zone.set_index('GEOID')[zone_id_col]
-            mapping = geoid_to_zone.to_dict()
 
         # Save file to disk
         geoid_to_zone.to_csv(geoid_to_zone_fpath)
 
-    return mapping
+    return geoid_to_zone
@@ -1,5 +1,18 @@
+import io
 import os
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+logger = logging.getLogger("pilates.utils")
+
+# BEAM skims columns that are always stored as categories in the cache
+SKIMS_STR_COLS = [
+    'timePeriod', 'pathType', 'origin', 'destination', 'DEBUG_TEXT']
 
 
 def read_datastore(settings, year=None, warm_start=False):
@@ -37,3 +50,525 @@ def read_datastore(settings, year=None, warm_start=False):
     store = pd.HDFStore(usim_datastore_fpath)
 
     return store, table_prefix_yr
+
+
+def table_schema(store, key):
+    """
+    Empty DataFrame with the columns, dtypes and index name of a datastore
+    table. No rows are read.
+    """
+    return store.select(key, start=0, stop=0)
+
+
+def convert_to_table_format(store, keys):
+    """
+    Rewrites fixed format tables in PyTables table format with every column
+    as a data column, so `read_table` can read them column by column and
+    query them instead of loading them in full. This changes the store on
+    disk, so it is only meant for the steps that write the store. Missing
+    tables are skipped, and tables that can't be converted, e.g. because a
+    column holds mixed types, are left as they are.
+
+    Parameters:
+    ------------
+    - store: pandas HDFStore open for writing.
+    - keys: list of str. Table keys, e.g. ['households', 'persons'].
+
+    Returns:
+    ---------
+    list of the converted table keys.
+    """
+    converted = []
+    for key in keys:
+        if (key not in store) or store.get_storer(key).is_table:
+            continue
+        logger.info("Converting {0} to table format.".format(key))
+        df = store[key]
+        try:
+            store.put(key, df, format='table', data_columns=True, index=False)
+        except (TypeError, ValueError) as e:
+            logger.warning(
+                "Could not convert {0} to table format ({1}).".format(key, e))
+            try:
+                store.get_storer(key)
+            except (KeyError, TypeError):  # restore a partially written table
+                if key in store:
+                    store.remove(key)
+                store.put(key, df)
+            continue
+        converted.append(key)
+    return converted
+
+
+def read_table(store, key, columns=None, where=None):
+    """
+    Reads a datastore table, optionally only some of its columns and the
+    rows matching a query. The store is never modified: table format tables
+    (see `convert_to_table_format`) are read partially, while fixed format
+    tables are read in full and filtered in memory.
+
+    Parameters:
+    ------------
+    - store: pandas HDFStore, see `read_datastore`.
+    - key: str. Table key, e.g. '2015/households'.
+    - columns: list of str. Columns to read, None reads all of them and an
+        empty list only the index.
+    - where: str. Query on the table columns or index, e.g.
+        'age >= 18 & worker == 1'. None reads all rows.
+
+    Returns:
+    ---------
+    pandas DataFrame.
+    """
+    if (columns is None) and (where is None):
+        return store[key]
+
+    if store.get_storer(key).is_table:
+        if (columns is not None) and (len(columns) == 0):
+            schema = table_schema(store, key)
+            if where is None:
+                index = store.select_column(key, 'index').values
+            else:
+                index = store.select(
+                    key, where=where, columns=list(schema.columns[:1])).index
+            return schema[[]].reindex(pd.Index(index, name=schema.index.name))
+        return store.select(key, columns=columns, where=where)
+
+    df = store[key]
+    if where is not None:
+        df = df.query(where)
+    if columns is not None:
+        df = df[columns]
+    return df
+
+
+def copy_table(src_store, src_key, dst_store, dst_key):
+    """
+    Copies a datastore table to another store at the HDF5 level, without
+    reading it into pandas. The table keeps its format, dtypes and
+    compression.
+
+    Parameters:
+    ------------
+    - src_store: pandas HDFStore to copy the table from.
+    - src_key: str. Table key in the source store, e.g. '/2015/jobs'.
+    - dst_store: pandas HDFStore to copy the table to.
+    - dst_key: str. Table key in the destination store, e.g. 'jobs'. Its
+        parent group must already exist in the destination store.
+    """
+    parent, name = os.path.split('/' + dst_key.strip('/'))
+    dst_parent = dst_store.get_node(parent)
+    if dst_parent is None:
+        raise KeyError("No group {0} in {1}.".format(parent, dst_store.filename))
+    if name in dst_parent:
+        dst_store.remove(dst_key)
+    src_store.get_node(src_key)._f_copy(
+        newparent=dst_parent, newname=name, recursive=True)
+    dst_store.flush()
+
+
+##########################
+#### PARSED SKIMS CACHE ###
+##########################
+_skims_file_keys = {}
+
+
+def skims_cache_settings(settings):
+    """
+    Keyword arguments for `read_cached_skims` and `update_skims_cache`
+    taken from the settings. Caching is disabled if no cache folder is set.
+    """
+    cache_dir = settings.get('skims_cache_folder', None)
+    if cache_dir:
+        data_dir = settings.get('data_folder', None)
+        if data_dir is not None:
+            cache_dir = os.path.join(data_dir, cache_dir)
+    else:
+        cache_dir = None
+    max_gb = settings.get('skims_cache_max_gb', None)
+    max_bytes = int(max_gb * 1024 ** 3) if max_gb else None
+    return {'cache_dir': cache_dir, 'max_bytes': max_bytes}
+
+
+def _skims_file_key(path):
+    """
+    Content-based cache key of a skims file: SHA-1 of its bytes plus size.
+    Memoized per (path, size, mtime) so a file is hashed once per run.
+    """
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _skims_file_keys:
+        sha = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(8 * 1024 * 1024), b''):
+                sha.update(block)
+        _skims_file_keys[memo_key] = '{0}_{1}'.format(
+            sha.hexdigest(), stat.st_size)
+    return _skims_file_keys[memo_key]
+
+
+def _normalized_dtype(col_dtype):
+    if col_dtype in (str, 'str', object, 'object'):
+        return 'str'
+    try:
+        return np.dtype(col_dtype).name
+    except TypeError:
+        return str(col_dtype)
+
+
+def _skims_cache_path(cache_dir, path, dtype=None, usecols=None):
+    """
+    Cache entry of a skims file parsed with the given dtypes and columns.
+    The same file read with other dtypes or columns gets its own entry, so
+    every caller gets what pandas.read_csv would have returned.
+    """
+    spec = repr((
+        sorted((col, _normalized_dtype(col_dtype))
+               for col, col_dtype in (dtype or {}).items()),
+        sorted(usecols) if usecols is not None else None))
+    spec_key = hashlib.sha1(spec.encode()).hexdigest()[:12]
+    return os.path.join(
+        cache_dir, '{0}_{1}.npz'.format(_skims_file_key(path), spec_key))
+
+
+def _evict_skims_cache(cache_dir, max_bytes, keep):
+    """
+    Deletes the least recently used cache entries until the cache fits in
+    `max_bytes`. The entry `keep` is never deleted.
+    """
+    entries = [
+        os.path.join(cache_dir, fname) for fname in os.listdir(cache_dir)
+        if fname.endswith('.npz')]
+    entries.sort(key=os.path.getmtime)
+    total = sum(os.path.getsize(entry) for entry in entries)
+    for entry in entries:
+        if total <= max_bytes:
+            break
+        if entry == keep:
+            continue
+        total -= os.path.getsize(entry)
+        logger.info("Evicting {0} from the skims cache.".format(entry))
+        os.remove(entry)
+
+
+def _write_skims_cache(df, cache_path):
+    """
+    Stores a skims table as typed columns: numeric columns as they are,
+    any other column as integer codes plus categories.
+    """
+    arrays = {'__columns__': np.array(df.columns, dtype=str)}
+    for i, col in enumerate(df.columns):
+        values = df[col]
+        if is_numeric_dtype(values) and not is_bool_dtype(values):
+            arrays['values_{0}'.format(i)] = values.values
+        else:
+            cat = pd.Categorical(values)
+            arrays['codes_{0}'.format(i)] = cat.codes.astype(np.int32)
+            arrays['categories_{0}'.format(i)] = np.asarray(
+                cat.categories.astype(str), dtype=str)
+    tmp_path = cache_path + '.tmp.npz'
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, cache_path)
+
+
+def _read_skims_cache(cache_path, dtype=None, usecols=None):
+    dtype = dtype or {}
+    data = {}
+    with np.load(cache_path) as npz:
+        columns = list(npz['__columns__'])
+        for i, col in enumerate(columns):
+            if (usecols is not None) and (col not in usecols):
+                continue
+            col_dtype = dtype.get(col, None)
+            if 'values_{0}'.format(i) in npz.files:
+                values = npz['values_{0}'.format(i)]
+                if col_dtype is not None:
+                    values = values.astype(col_dtype)
+            else:
+                codes = npz['codes_{0}'.format(i)]
+                categories = npz['categories_{0}'.format(i)]
+                if col_dtype == 'category':
+                    values = pd.Categorical.from_codes(codes, categories)
+                else:
+                    if col_dtype in (None, str, 'str', object):
+                        categories = categories.astype(object)
+                    else:
+                        categories = categories.astype(col_dtype)
+                    if (codes < 0).any():
+                        categories = np.append(
+                            categories.astype(object), np.nan)
+                    values = categories[codes]
+            data[col] = values
+    return pd.DataFrame(
+        data, columns=[col for col in columns if col in data])
+
+
+def read_cached_skims(
+        path, cache_dir=None, dtype=None, usecols=None, max_bytes=None):
+    """
+    Reads a BEAM skims .csv(.gz) file through a content-addressed cache of
+    parsed skims, so that each skims file is parsed from text only once per
+    set of dtypes and columns.
+
+    Parameters
+    ----------
+    path : str
+        Path to the skims file.
+    cache_dir : str
+        Cache folder. If None the file is read without caching.
+    dtype : dict
+        Column dtypes of the returned dataframe, as in pandas.read_csv.
+    usecols : list
+        Columns to return. All columns by default.
+    max_bytes : int
+        Disk budget of the cache. Least recently used entries are evicted
+        beyond it.
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    if cache_dir is None:
+        return pd.read_csv(path, dtype=dtype, usecols=usecols)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = _skims_cache_path(cache_dir, path, dtype, usecols)
+
+    if os.path.exists(cache_path):
+        logger.info("Loading parsed skims for {0} from cache.".format(path))
+        os.utime(cache_path)
+    else:
+        logger.info("Parsing skims {0} into the skims cache.".format(path))
+        # parse string columns straight to categoricals, they are stored as
+        # codes and categories and come out of the cache as strings
+        parse_dtype = {
+            col: 'category' for col in SKIMS_STR_COLS
+            if (usecols is None) or (col in usecols)}
+        parse_dtype.update({
+            col: 'category' if _normalized_dtype(col_dtype) == 'str'
+            else col_dtype for col, col_dtype in (dtype or {}).items()})
+        header = pd.read_csv(path, nrows=0).columns
+        parse_dtype = {
+            col: col_dtype for col, col_dtype in parse_dtype.items()
+            if col in header}
+        _write_skims_cache(
+            pd.read_csv(path, dtype=parse_dtype, usecols=usecols), cache_path)
+        if max_bytes:
+            _evict_skims_cache(cache_dir, max_bytes, keep=cache_path)
+
+    return _read_skims_cache(cache_path, dtype, usecols)
+
+
+def update_skims_cache(
+        df, path, cache_dir=None, max_bytes=None, dtype=None, usecols=None):
+    """
+    Adds a skims table that was just written to `path` to the cache, so the
+    next read of `path` with the same `dtype` and `usecols` does not need to
+    parse it again.
+    """
+    if cache_dir is None:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = _skims_cache_path(cache_dir, path, dtype, usecols)
+    if not os.path.exists(cache_path):
+        _write_skims_cache(df, cache_path)
+        if max_bytes:
+            _evict_skims_cache(cache_dir, max_bytes, keep=cache_path)
+
+
+###############################
+#### ACTIVITYSIM INPUT TABLES ###
+################################
+# File extension of every table writer
+TABLE_WRITER_EXTENSIONS = {
+    'csv': '.csv',
+    'arrow_csv': '.csv',
+    'parquet': '.parquet',
+    'hdf5': '.h5'}
+
+# Formats written in parallel threads by `write_tables`. The Arrow writers
+# release the GIL, pandas to_csv mostly holds it and HDF5 is not thread-safe.
+THREADED_TABLE_FORMATS = ['arrow_csv', 'parquet']
+
+# HDF5 builds are usually not thread-safe, even across files
+_hdf5_lock = threading.Lock()
+
+
+def _wkt_geometries(df):
+    """ Geometry columns as WKT strings, as written by `DataFrame.to_csv`,
+    for the binary writers that cannot store shapely objects. """
+    geom_cols = [
+        col for col in df.columns if df[col].dtype.name == 'geometry']
+    if not geom_cols:
+        return df
+    df = pd.DataFrame(df, copy=False)
+    return df.assign(**{col: df[col].astype(str) for col in geom_cols})
+
+
+def _write_arrow_csv(df, path):
+    from pyarrow import csv as pa_csv
+    import pyarrow as pa
+
+    # match the header of DataFrame.to_csv, index first
+    index_name = df.index.name or ''
+    df = _wkt_geometries(df).reset_index()
+    df.columns = [index_name] + df.columns[1:].tolist()
+    pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), path)
+
+
+def _arrow_type(dtype):
+    import pyarrow as pa
+
+    if dtype == 'category':
+        return pa.dictionary(pa.int32(), pa.string())
+    if dtype in (str, 'str', object):
+        return pa.string()
+    return pa.from_numpy_dtype(np.dtype(dtype))
+
+
+def read_arrow_csv(path, dtype=None, index_col=None):
+    """
+    Reads a .csv file with the multi-threaded pyarrow CSV reader, falling
+    back to pandas if pyarrow is not installed or can't parse the file.
+
+    Parameters:
+    ------------
+    - path: str. Path to the .csv file.
+    - dtype: dict of column dtypes, as in pandas.read_csv. 'category'
+        reads string columns as categoricals. Columns missing from the file
+        are ignored.
+    - index_col: str. Column to use as the index.
+
+    Returns:
+    ---------
+    pandas DataFrame.
+    """
+    dtype = dtype or {}
+    try:
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+    except ImportError:
+        return pd.read_csv(path, dtype=dtype, index_col=index_col)
+
+    convert_options = pa_csv.ConvertOptions(
+        column_types={col: _arrow_type(t) for col, t in dtype.items()},
+        strings_can_be_null=True, timestamp_parsers=[])
+    try:
+        table = pa_csv.read_csv(path, convert_options=convert_options)
+    except pa.ArrowInvalid as e:
+        logger.warning(
+            "Could not parse {0} with pyarrow ({1}). Reading it with "
+            "pandas.".format(path, e))
+        return pd.read_csv(path, dtype=dtype, index_col=index_col)
+
+    # match the pandas parser: all-null columns are floats and dates or
+    # times are left as strings
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(
+                i, field.name, table.column(i).cast(pa.float64()))
+        elif pa.types.is_temporal(field.type) and field.name not in dtype:
+            table = table.set_column(
+                i, field.name, table.column(i).cast(pa.string()))
+    df = table.to_pandas()
+    if index_col is not None:
+        df = df.set_index(index_col)
+    return df
+
+
+def write_table(df, output_dir, table_name, fmt='csv'):
+    """
+    Writes a table with its index to `output_dir`/`table_name`.<extension>.
+
+    Parameters:
+    ------------
+    - df: pandas DataFrame.
+    - output_dir: str. Output folder.
+    - table_name: str. File name without extension, also the key of the
+        table in HDF5 files.
+    - fmt: str. One of csv (pandas), arrow_csv (multi-threaded pyarrow CSV
+        writer), parquet or hdf5.
+
+    Returns:
+    ---------
+    Path of the written file.
+    """
+    if fmt not in TABLE_WRITER_EXTENSIONS:
+        raise ValueError(
+            "Unknown table format {0}, expected one of {1}".format(
+                fmt, list(TABLE_WRITER_EXTENSIONS.keys())))
+    path = os.path.join(
+        output_dir, table_name + TABLE_WRITER_EXTENSIONS[fmt])
+    logger.info("Writing {0} table to {1}".format(table_name, path))
+
+    if fmt == 'csv':
+        df.to_csv(path)
+    elif fmt == 'arrow_csv':
+        _write_arrow_csv(df, path)
+    elif fmt == 'parquet':
+        pd.DataFrame(_wkt_geometries(df), copy=False).to_parquet(path)
+    elif fmt == 'hdf5':
+        with _hdf5_lock:
+            _wkt_geometries(df).to_hdf(path, key=table_name, mode='w')
+    return path
+
+
+def write_tables(tables, output_dir, formats=None, num_threads=None):
+    """
+    Writes several tables with `write_table`. Tables in one of the
+    `THREADED_TABLE_FORMATS` are written in parallel threads, the others one
+    after another in the calling thread while those threads run.
+
+    Parameters:
+    ------------
+    - tables: dict of pandas DataFrames, by table name.
+    - output_dir: str. Output folder.
+    - formats: dict of table formats, by table name. Defaults to csv.
+    - num_threads: int. Number of tables written at once by threads,
+        defaults to all.
+
+    Returns:
+    ---------
+    dict of written file paths, by table name.
+    """
+    formats = {
+        table_name: (formats or {}).get(table_name, 'csv')
+        for table_name in tables.keys()}
+    threaded = [
+        table_name for table_name, fmt in formats.items()
+        if fmt in THREADED_TABLE_FORMATS]
+    num_threads = num_threads or len(threaded)
+    with ThreadPoolExecutor(max_workers=max(1, num_threads)) as executor:
+        futures = {
+            table_name: executor.submit(
+                write_table, tables[table_name], output_dir, table_name,
+                formats[table_name])
+            for table_name in threaded}
+        paths = {
+            table_name: write_table(df, output_dir, table_name, formats[table_name])
+            for table_name, df in tables.items() if table_name not in futures}
+        paths.update({
+            table_name: future.result()
+            for table_name, future in futures.items()})
+    return {table_name: paths[table_name] for table_name in tables.keys()}
+
+
+def write_zipped_csv(zip_file, arcname, df, index=True, chunk_rows=100000):
+    """
+    Writes a table as .csv into an open zip archive, streaming it in row
+    chunks so the text of the whole table is never held in memory.
+
+    Parameters:
+    ------------
+    - zip_file: zipfile.ZipFile open for writing. Its compression settings
+        are used.
+    - arcname: str. File name in the archive.
+    - df: pandas DataFrame.
+    - index: bool. Write the index as the first column.
+    - chunk_rows: int. Number of rows formatted at once.
+    """
+    with zip_file.open(arcname, 'w', force_zip64=True) as f, \
+            io.TextIOWrapper(f, encoding='utf-8', newline='') as text:
+        for start in range(0, max(len(df), 1), chunk_rows):
+            df.iloc[start:start + chunk_rows].to_csv(
+                text, header=(start == 0), index=index)
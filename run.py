@@ -19,6 +19,7 @@ from pilates.urbansim import preprocessor as usim_pre
 from pilates.urbansim import postprocessor as usim_post
 from pilates.beam import preprocessor as beam_pre
 from pilates.beam import postprocessor as beam_post
+from pilates.utils.io import skims_cache_settings
 
 
 
@@ -663,8 +664,10 @@ def run_traffic_assignment(
 
         # 4. POSTPROCESS
         path_to_skims = os.path.join(abs_beam_output, skims_fname)
+        incremental_skims = settings.get('incremental_skims', False)
         current_skims = beam_post.merge_current_skims(
-            path_to_skims, previous_skims, beam_local_output_folder)
+            path_to_skims, previous_skims, beam_local_output_folder,
+            write_patch=incremental_skims, **skims_cache_settings(settings))
         if current_skims == previous_skims:
             logger.error(
                 "BEAM hasn't produced the new skims for some reason. "
@@ -672,6 +675,12 @@ def run_traffic_assignment(
                 abs_beam_output)
             sys.exit(1)
 
+        # remember the partial skims so activitysim skims can be patched
+        # instead of rebuilt (see settings `incremental_skims`)
+        if incremental_skims:
+            asim_pre.add_skims_delta(
+                settings, beam_post.skims_patch_path(current_skims))
+
     return
 
 
@@ -0,0 +1,101 @@
+import os
+import numpy as np
+import openmatrix as omx
+import pandas as pd
+import pytest
+import yaml
+
+from pilates.activitysim import preprocessor as asim_pre
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NUM_ZONES = 40
+SKIMS_COLUMNS = [
+    'TIME_minutes', 'TOTIVT_IVT_minutes', 'VTOLL_FAR', 'DIST_meters',
+    'WACC_minutes', 'WAUX_minutes', 'WEGR_minutes', 'DTIM_minutes',
+    'DDIST_meters', 'KEYIVT_minutes', 'FERRYIVT_minutes', 'BOARDS']
+
+
+@pytest.fixture
+def settings():
+    with open(os.path.join(REPO_DIR, 'settings.yaml')) as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture
+def skims_settings(settings, tmp_path, monkeypatch):
+    """ Settings of a synthetic NUM_ZONES zone system whose BEAM skims are
+    written to tmp_path/beam_output/skims.csv.gz. """
+    order = np.arange(1, NUM_ZONES + 1).astype(str)
+    rng = np.random.default_rng(0)
+    centroids = rng.uniform(0, 20000, (NUM_ZONES, 2))
+    monkeypatch.setattr(asim_pre, 'zone_order', lambda settings, year: order)
+    monkeypatch.setattr(
+        asim_pre, 'read_zone_centroids',
+        lambda settings, year, crs='EPSG:3857': centroids)
+
+    beam_dir = tmp_path / 'beam_output'
+    beam_dir.mkdir()
+    settings.update({
+        'beam_local_output_folder': str(beam_dir),
+        'skims_fname': 'skims.csv.gz',
+        'asim_local_input_folder': str(tmp_path / 'asim_input'),
+        'skims_cache_folder': None,
+        'skims_chunk_size': None,
+        'skims_num_processes': 1,
+        'incremental_skims': False,
+        'static_skims': False,
+        'asim_validation': False})
+    return settings
+
+
+def beam_skims(settings, keys, seed=0):
+    """ Raw BEAM skims records for (pathType, timePeriod, origin position,
+    destination position) keys, with some zero and inf values. """
+    rng = np.random.default_rng(seed)
+    order = np.arange(1, NUM_ZONES + 1).astype(str)
+    path_type, period, orig, dest = (np.asarray(k) for k in zip(*keys))
+    df = pd.DataFrame({
+        'timePeriod': period, 'pathType': path_type,
+        'origin': order[orig], 'destination': order[dest]})
+    for col in SKIMS_COLUMNS:
+        values = rng.uniform(1, 5000, len(df)).round(3)
+        values[rng.random(len(df)) < 0.05] = 0
+        values[rng.random(len(df)) < 0.02] = np.inf
+        df[col] = values
+    df['DDIST_meters'] = rng.uniform(100, 5000, len(df)).round(3)
+    df['DEBUG_TEXT'] = ''
+    return df
+
+
+def sample_skims_keys(settings, share, seed=0):
+    """ A share of every (pathType, timePeriod) OD matrix, for the auto path
+    and the first two BEAM transit paths. """
+    rng = np.random.default_rng(seed)
+    transit_paths = list(
+        asim_pre._transit_paths_by_beam_path(settings).keys())[:2]
+    keys = []
+    for period in settings['periods']:
+        for path in ['SOV'] + transit_paths:
+            flat = rng.choice(
+                NUM_ZONES * NUM_ZONES, int(NUM_ZONES * NUM_ZONES * share),
+                replace=False)
+            keys += [
+                (path, period, f // NUM_ZONES, f % NUM_ZONES) for f in flat]
+    return keys
+
+
+def assert_skims_equal(expected_path, result_path):
+    expected, result = omx.open_file(expected_path), omx.open_file(result_path)
+    try:
+        names = sorted(expected.list_matrices())
+        assert names == sorted(result.list_matrices())
+        different = [
+            name for name in names
+            if not np.array_equal(
+                np.array(expected[name]), np.array(result[name]),
+                equal_nan=True)]
+        assert different == []
+        assert expected.list_mappings() == result.list_mappings()
+    finally:
+        expected.close()
+        result.close()
@@ -0,0 +1,67 @@
+import zipfile
+
+import pytest
+
+from pilates.activitysim.postprocessor import _load_asim_outputs, \
+    create_beam_input_data
+from pilates.benchmarks import asim_outputs
+from pilates.benchmarks.asim_outputs import synthetic_outputs
+
+FORECAST_YEAR = 2015
+
+
+@pytest.fixture
+def asim_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(asim_outputs, 'NUM_HOUSEHOLDS', 2000)
+    table_names = synthetic_outputs(str(tmp_path))
+    return {
+        'asim_local_output_folder': str(tmp_path),
+        'asim_output_tables': {'prefix': 'final_', 'tables': table_names}}
+
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('compresslevel', [None, 6])
+def test_archive_copies_unparsed_tables_and_writes_parsed_ones(
+        asim_settings, compresslevel):
+    settings = dict(
+        asim_settings, asim_outputs_zip_compression_level=compresslevel)
+    asim_output_dict = _load_asim_outputs(settings)
+    asim_output_dict.load(['households', 'persons'])
+    asim_output_dict['households']['updated'] = 1
+    # parsed tables as writestr(table.to_csv()) stored them, the .csv files
+    # of the others as they are
+    expected = {
+        table_name + '.csv': asim_output_dict[table_name].to_csv().encode()
+        if asim_output_dict.is_loaded(table_name)
+        else read_file(asim_output_dict.paths[table_name])
+        for table_name in asim_output_dict}
+
+    create_beam_input_data(settings, FORECAST_YEAR, asim_output_dict)
+    assert not asim_output_dict.is_loaded('trips')
+
+    outpath = '{0}/asim_outputs_{1}.zip'.format(
+        settings['asim_local_output_folder'], FORECAST_YEAR)
+    with zipfile.ZipFile(outpath) as csv_zip:
+        assert csv_zip.namelist() == list(expected.keys())
+        for name, content in expected.items():
+            assert csv_zip.read(name) == content, name
+
+
+def test_unparsed_tables_are_not_parsed(asim_settings, monkeypatch):
+    asim_output_dict = _load_asim_outputs(asim_settings)
+
+    def fail(table_name):
+        raise AssertionError("{0} was parsed".format(table_name))
+
+    monkeypatch.setattr(asim_output_dict, '_read', fail)
+    create_beam_input_data(asim_settings, FORECAST_YEAR, asim_output_dict)
+
+    outpath = '{0}/asim_outputs_{1}.zip'.format(
+        asim_settings['asim_local_output_folder'], FORECAST_YEAR)
+    with zipfile.ZipFile(outpath) as csv_zip:
+        for table_name, path in asim_output_dict.paths.items():
+            assert csv_zip.read(table_name + '.csv') == read_file(path)
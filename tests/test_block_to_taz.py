@@ -0,0 +1,71 @@
+import os
+
+import pandas as pd
+
+from pilates.benchmarks.block_to_taz import LOCAL_CRS, synthetic_geoms
+from pilates.utils import geog
+
+
+def test_map_block_to_taz_reuses_projected_zones(tmp_path, monkeypatch):
+    blocks, zones = synthetic_geoms()
+    zones = zones.reset_index(drop=True)
+    settings = {
+        'region': 'austin', 'skims_zone_type': 'taz',
+        'local_crs': {'austin': LOCAL_CRS}}
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(geog, '_projected_zones', {})
+    monkeypatch.setattr(
+        geog, 'get_taz_geoms', lambda *args, **kwargs: zones.copy())
+    monkeypatch.setattr(
+        geog, 'get_block_geoms', lambda *args, **kwargs: blocks.copy())
+
+    zone_systems = []
+    project_zones = geog.project_zones
+
+    def spy(zones, crs, zone_system=None, *args, **kwargs):
+        zone_systems.append(zone_system)
+        return project_zones(zones, crs, zone_system, *args, **kwargs)
+
+    monkeypatch.setattr(geog, 'project_zones', spy)
+    result = geog.map_block_to_taz(settings, 'austin')
+    projected = geog._projected_zones[('austin_taz', LOCAL_CRS)]
+    assert geog.map_block_to_taz(settings, 'austin').equals(result)
+
+    assert zone_systems == ['austin_taz', 'austin_taz']
+    assert geog._projected_zones[('austin_taz', LOCAL_CRS)] is projected
+    expected = geog.get_taz_from_block_geoms(
+        blocks, zones, LOCAL_CRS, 'zone_id').astype(str)
+    pd.testing.assert_series_equal(result, expected)
+
+
+def test_geoms_cache_is_under_the_data_folder(tmp_path, monkeypatch):
+    blocks, _ = synthetic_geoms()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(geog, '_geoms_cache', {})
+    data_dir = str(tmp_path / 'data')
+    settings = {'region': 'austin', 'data_folder': data_dir}
+
+    fpath = geog.geoms_cache_path(settings, 'block')
+    assert fpath == '{0}/tmp/block_austin.parquet'.format(data_dir)
+    geog.write_geoms_cache(blocks, fpath)
+    assert os.path.exists(fpath)
+    assert not os.path.exists(str(tmp_path / 'tmp'))
+
+
+def test_projected_zones_of_earlier_geometries_are_removed(
+        tmp_path, monkeypatch):
+    _, zones = synthetic_geoms()
+    monkeypatch.setattr(geog, '_projected_zones', {})
+    monkeypatch.setattr(geog, '_geoms_cache', {})
+    data_dir = str(tmp_path)
+
+    geog.project_zones(zones, LOCAL_CRS, 'austin_taz', data_dir)
+    geog.project_zones(zones, LOCAL_CRS, 'austin', data_dir)
+    changed = zones.iloc[:-1]
+    geog.project_zones(changed, LOCAL_CRS, 'austin_taz', data_dir)
+
+    fnames = sorted(os.listdir(data_dir))
+    assert len(fnames) == 2
+    assert fnames[0].startswith('projected_austin_EPSG')
+    assert fnames[1] == 'projected_austin_taz_{0}_{1}.parquet'.format(
+        LOCAL_CRS.replace(':', ''), geog._zones_fingerprint(changed))
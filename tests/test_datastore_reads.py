@@ -0,0 +1,76 @@
+import hashlib
+import numpy as np
+import pandas as pd
+import pytest
+
+from pilates.utils.io import convert_to_table_format, read_table
+
+NUM_PERSONS = 1000
+
+
+def _md5(path):
+    with open(path, 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+@pytest.fixture
+def persons():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'household_id': rng.integers(0, NUM_PERSONS // 2, NUM_PERSONS),
+        'age': rng.integers(0, 90, NUM_PERSONS),
+        'worker': rng.integers(0, 2, NUM_PERSONS),
+        'earning': rng.random(NUM_PERSONS)},
+        index=pd.Index(np.arange(NUM_PERSONS), name='person_id'))
+
+
+@pytest.fixture
+def store_path(tmp_path, persons):
+    path = str(tmp_path / 'model_data.h5')
+    persons.to_hdf(path, key='persons')
+    return path
+
+
+@pytest.mark.parametrize('columns, where', [
+    (['household_id', 'age'], None),
+    (None, 'age >= 18 & worker == 1'),
+    (['age'], 'age >= 85'),
+    ([], None),
+    ([], 'worker == 1')])
+def test_fixed_format_reads_leave_the_store_unchanged(
+        store_path, persons, columns, where):
+    before = _md5(store_path)
+    with pd.HDFStore(store_path, mode='r') as store:
+        result = read_table(store, 'persons', columns=columns, where=where)
+        assert not store.get_storer('persons').is_table
+
+    expected = persons if where is None else persons.query(where)
+    expected = expected if columns is None else expected[columns]
+    pd.testing.assert_frame_equal(expected, result)
+    assert _md5(store_path) == before
+
+
+@pytest.mark.parametrize('columns, where', [
+    (['household_id', 'age'], None),
+    (None, 'age >= 18 & worker == 1'),
+    ([], None),
+    ([], 'worker == 1')])
+def test_table_format_reads_match_fixed_format(
+        store_path, persons, columns, where):
+    with pd.HDFStore(store_path) as store:
+        expected = read_table(store, 'persons', columns=columns, where=where)
+        assert convert_to_table_format(store, ['persons', 'jobs']) == [
+            'persons']
+        assert store.get_storer('persons').is_table
+        result = read_table(store, 'persons', columns=columns, where=where)
+    pd.testing.assert_frame_equal(expected, result, check_index_type=False)
+
+
+def test_convert_skips_unconvertible_tables(tmp_path):
+    path = str(tmp_path / 'model_data.h5')
+    mixed = pd.DataFrame({'block_id': ['060014001001000', 1]})
+    mixed.to_hdf(path, key='blocks')
+    with pd.HDFStore(path) as store:
+        assert convert_to_table_format(store, ['blocks']) == []
+        assert not store.get_storer('blocks').is_table
+        pd.testing.assert_frame_equal(store['blocks'], mixed)
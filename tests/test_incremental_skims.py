@@ -0,0 +1,149 @@
+import os
+
+import numpy as np
+
+from pilates.activitysim import preprocessor as asim_pre
+from pilates.beam.postprocessor import merge_current_skims, \
+    skims_patch_path
+from conftest import assert_skims_equal, beam_skims, sample_skims_keys
+
+YEAR = 2010
+
+
+def write_delta(settings, tmp_path, iteration, seed):
+    """ Partial BEAM skims of one iteration: updated records of existing
+    keys plus new keys, merged into the BEAM skims like run.py does. """
+    keys = sample_skims_keys(settings, 0.15, seed=seed)
+    delta = beam_skims(settings, keys, seed=seed)
+    beam_output_dir = tmp_path / 'beam_iteration_{0}'.format(iteration)
+    iteration_dir = beam_output_dir / 'ITERS' / 'it.0'
+    iteration_dir.mkdir(parents=True)
+    delta.to_csv(
+        iteration_dir / '0.activitySimODSkims_current.csv.gz', index=False)
+    current_skims = merge_current_skims(
+        os.path.join(settings['beam_local_output_folder'], 'skims.csv.gz'),
+        None, str(beam_output_dir), write_patch=True)
+    return skims_patch_path(current_skims)
+
+
+def build_skims(settings, output_dir, deltas=(), **kwargs):
+    os.makedirs(output_dir, exist_ok=True)
+    settings = dict(settings, asim_local_input_folder=output_dir, **kwargs)
+    for delta in deltas:
+        asim_pre.add_skims_delta(settings, delta)
+    asim_pre.create_skims_from_beam(settings, YEAR, output_dir=output_dir)
+    return settings
+
+
+def fail(*args, **kwargs):
+    raise AssertionError("patching read the full BEAM skims")
+
+
+def test_patched_skims_match_rebuilt_skims(skims_settings, tmp_path,
+                                           monkeypatch):
+    settings = skims_settings
+    skims = beam_skims(settings, sample_skims_keys(settings, 0.6))
+    skims.to_csv(
+        os.path.join(settings['beam_local_output_folder'], 'skims.csv.gz'),
+        index=False)
+
+    patched_dir = str(tmp_path / 'patched')
+    build_skims(settings, patched_dir)
+    deltas = [
+        write_delta(settings, tmp_path, iteration, seed=iteration + 1)
+        for iteration in range(2)]
+    with monkeypatch.context() as m:
+        m.setattr(asim_pre, '_load_raw_beam_skims', fail)
+        build_skims(settings, patched_dir, deltas, incremental_skims=True)
+    assert asim_pre.read_skims_deltas(patched_dir) == []
+
+    rebuilt_dir = str(tmp_path / 'rebuilt')
+    build_skims(settings, rebuilt_dir)
+    assert_skims_equal(
+        os.path.join(rebuilt_dir, 'skims.omx'),
+        os.path.join(patched_dir, 'skims.omx'))
+
+
+def test_linked_matrices_are_patched_once(skims_settings, tmp_path,
+                                          monkeypatch):
+    settings = skims_settings
+    skims = beam_skims(settings, sample_skims_keys(settings, 0.6))
+    skims.to_csv(
+        os.path.join(settings['beam_local_output_folder'], 'skims.csv.gz'),
+        index=False)
+    patched_dir = str(tmp_path / 'patched')
+    build_skims(settings, patched_dir)
+    deltas = [write_delta(settings, tmp_path, 0, seed=1)]
+
+    patched = []
+    patch_omx_matrix = asim_pre._patch_omx_matrix
+
+    def spy(matrix, *args):
+        patched.append(matrix._v_pathname)
+        return patch_omx_matrix(matrix, *args)
+
+    monkeypatch.setattr(asim_pre, '_patch_omx_matrix', spy)
+    build_skims(settings, patched_dir, deltas, incremental_skims=True)
+
+    assert len(patched) == len(set(patched))
+    distance_names = {'/data/DIST', '/data/DISTBIKE', '/data/DISTWALK'}
+    assert len(distance_names.intersection(patched)) == 1
+    # every hwy path of a period shares the same auto skims
+    auto_time = [name for name in patched if '_TIME__' in name]
+    assert len(auto_time) == len(settings['periods'])
+
+
+def test_pending_deltas_survive_a_restart(skims_settings, tmp_path,
+                                          monkeypatch):
+    settings = skims_settings
+    skims = beam_skims(settings, sample_skims_keys(settings, 0.6))
+    skims.to_csv(
+        os.path.join(settings['beam_local_output_folder'], 'skims.csv.gz'),
+        index=False)
+    patched_dir = str(tmp_path / 'patched')
+    build_skims(settings, patched_dir)
+
+    # BEAM ran, then the process stopped before ActivitySim
+    delta = write_delta(settings, tmp_path, 0, seed=1)
+    asim_pre.add_skims_delta(
+        dict(settings, asim_local_input_folder=patched_dir), delta)
+    assert asim_pre.read_skims_deltas(patched_dir) == [delta]
+
+    with monkeypatch.context() as m:
+        m.setattr(asim_pre, '_load_raw_beam_skims', fail)
+        build_skims(settings, patched_dir, incremental_skims=True)
+    rebuilt_dir = str(tmp_path / 'rebuilt')
+    build_skims(settings, rebuilt_dir)
+    assert_skims_equal(
+        os.path.join(rebuilt_dir, 'skims.omx'),
+        os.path.join(patched_dir, 'skims.omx'))
+
+
+class RecordingMatrix:
+    """ In-memory matrix that records the rows written to it. """
+
+    def __init__(self, mtx):
+        self.mtx = mtx
+        self.attrs = {}
+        self.shape = mtx.shape
+        self.written = []
+
+    def __getitem__(self, key):
+        return self.mtx[key].copy()
+
+    def __setitem__(self, key, value):
+        self.written += list(range(key.start, key.stop))
+        self.mtx[key] = value
+
+
+def test_only_rows_with_changed_cells_are_written():
+    matrix = RecordingMatrix(np.zeros((100, 100)))
+    orig_idx = np.array([70, 3, 4, 4, 90, 5, 71])
+    dest_idx = np.array([1, 2, 3, 4, 5, 6, 7])
+    values = np.arange(1, 8, dtype=float)
+    asim_pre._patch_omx_matrix(matrix, orig_idx, dest_idx, values, 2)
+
+    assert sorted(matrix.written) == [3, 4, 5, 70, 71, 90]
+    expected = np.zeros((100, 100))
+    expected[orig_idx, dest_idx] = values
+    np.testing.assert_array_equal(matrix.mtx, expected)
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from pilates.activitysim.preprocessor import _update_jobs_table
+
+LOCAL_CRS = 'EPSG:32140'
+
+
+def blocks_and_jobs():
+    blocks = pd.DataFrame({
+        'TAZ': ['1', '1', '2', '2', '3'],
+        'square_meters_land': [100.0, 0.0, 200.0, 0.0, 300.0],
+        'x': [-97.70, -97.701, -97.60, np.nan, -97.50],
+        'y': [30.20, 30.201, 30.30, np.nan, 30.40]},
+        index=['b0', 'b1', 'b2', 'b3', 'b4'])
+    jobs = pd.DataFrame({
+        'block_id': ['b0', 'b1', 'b1', 'b3', 'b4'],
+        'sector_id': [1, 2, 3, 4, 5]})
+    return blocks, jobs
+
+
+def test_jobs_move_to_the_nearest_block_with_land():
+    blocks, jobs = blocks_and_jobs()
+    blocks.loc['b3', ['x', 'y']] = [-97.499, 30.401]
+    num_reassigned, jobs = _update_jobs_table(jobs, blocks, LOCAL_CRS)
+    assert num_reassigned == 2
+    assert list(jobs['block_id']) == ['b0', 'b0', 'b0', 'b4', 'b4']
+
+
+def test_blocks_without_coordinates_keep_their_jobs(caplog):
+    blocks, jobs = blocks_and_jobs()
+    num_reassigned, jobs = _update_jobs_table(jobs, blocks, LOCAL_CRS)
+    assert num_reassigned == 1
+    assert list(jobs['block_id']) == ['b0', 'b0', 'b0', 'b3', 'b4']
+    assert "no coordinates" in caplog.text
+
+
+def test_jobs_stay_if_no_block_has_land_and_coordinates(caplog):
+    blocks, jobs = blocks_and_jobs()
+    blocks.loc['b3', ['x', 'y']] = [-97.499, 30.401]
+    blocks.loc[blocks['square_meters_land'] > 0, ['x', 'y']] = np.nan
+    num_reassigned, jobs = _update_jobs_table(jobs, blocks, LOCAL_CRS)
+    assert num_reassigned == 0
+    assert list(jobs['block_id']) == ['b0', 'b1', 'b1', 'b3', 'b4']
+    assert "no block has both land area and coordinates" in caplog.text
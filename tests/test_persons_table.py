@@ -0,0 +1,13 @@
+import pandas as pd
+
+from pilates.activitysim.preprocessor import _update_persons_table
+from pilates.benchmarks.persons_table import (
+    synthetic_population, update_persons_table_where)
+
+
+def test_persons_table_matches_reference():
+    persons, households, blocks = synthetic_population(
+        num_persons=100000, num_households=40000, num_blocks=5000)
+    expected = update_persons_table_where(persons.copy(), households, blocks)
+    result = _update_persons_table(persons.copy(), households, blocks)
+    pd.testing.assert_frame_equal(expected, result, check_exact=True)
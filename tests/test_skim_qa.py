@@ -0,0 +1,68 @@
+import hashlib
+
+import numpy as np
+import openmatrix as omx
+
+from pilates.activitysim.skim_qa import QA_ATTRS, compare_skims, \
+    summarize_skims
+
+
+def write_skims(path, matrices):
+    skims = omx.open_file(path, 'w')
+    try:
+        for name, mtx in matrices.items():
+            skims[name] = mtx
+    finally:
+        skims.close()
+
+
+def md5(path):
+    with open(path, 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+def stored_attrs(path):
+    skims = omx.open_file(path, 'r')
+    try:
+        return {
+            name: [attr for attr in QA_ATTRS if attr in skims[name].attrs]
+            for name in skims.list_matrices()}
+    finally:
+        skims.close()
+
+
+def skims_pair(tmp_path):
+    rng = np.random.default_rng(0)
+    time = rng.uniform(0, 60, (30, 30))
+    dist = rng.uniform(0, 20, (30, 30))
+    path_a, path_b = str(tmp_path / 'a.omx'), str(tmp_path / 'b.omx')
+    write_skims(path_a, {'TIME': time, 'DIST': dist})
+    write_skims(path_b, {'TIME': time + 1, 'DIST': dist})
+    return path_a, path_b
+
+
+def test_compare_skims_leaves_inputs_untouched(tmp_path):
+    path_a, path_b = skims_pair(tmp_path)
+    checksums = md5(path_a), md5(path_b)
+
+    report = compare_skims(path_a, path_b, block_size=100)
+    assert report['status'].to_dict() == {
+        'DIST': 'unchanged', 'TIME': 'changed'}
+    assert np.isclose(report.loc['TIME', 'rmse'], 1.0)
+    summarize_skims(path_a, block_size=100)
+
+    assert (md5(path_a), md5(path_b)) == checksums
+    assert stored_attrs(path_a) == {'DIST': [], 'TIME': []}
+
+
+def test_compare_skims_stores_stats_on_request(tmp_path):
+    path_a, path_b = skims_pair(tmp_path)
+    expected = compare_skims(path_a, path_b, block_size=100)
+
+    report = compare_skims(path_a, path_b, block_size=100, store=True)
+    assert stored_attrs(path_b) == {'DIST': QA_ATTRS, 'TIME': QA_ATTRS}
+    assert report['status'].equals(expected['status'])
+    # stored hashes are reused
+    report = compare_skims(path_a, path_b, block_size=100)
+    assert report.loc['DIST', 'rmse'] == 0.0
+    assert report['status'].equals(expected['status'])
@@ -0,0 +1,42 @@
+import os
+
+import pandas as pd
+
+from pilates.utils.io import read_cached_skims
+
+SKIMS = pd.DataFrame({
+    'timePeriod': ['AM', 'AM', 'PM'],
+    'pathType': ['SOV', 'WLK_LOC_WLK', 'SOV'],
+    'origin': ['01', '02', '10'],
+    'destination': ['02', '01', '10'],
+    'DIST_meters': [1200.5, 830.0, 0.0]})
+
+
+def test_callers_with_different_dtypes_get_their_own_parse(tmp_path):
+    path = str(tmp_path / 'skims.csv.gz')
+    SKIMS.to_csv(path, index=False)
+    cache_dir = str(tmp_path / 'cache')
+    int_dtype = {'origin': int, 'destination': int}
+    str_dtype = {'origin': str, 'destination': str}
+
+    # the urbansim preprocessor reads zone ids as ints, the beam
+    # postprocessor as strings, from the same file
+    as_int = read_cached_skims(
+        path, cache_dir, dtype=int_dtype,
+        usecols=['origin', 'destination', 'DIST_meters'])
+    as_str = read_cached_skims(path, cache_dir, dtype=str_dtype)
+    assert len(os.listdir(cache_dir)) == 2
+
+    for dtype, usecols, result in [
+            (int_dtype, ['origin', 'destination', 'DIST_meters'], as_int),
+            (str_dtype, None, as_str)]:
+        expected = pd.read_csv(path, dtype=dtype, usecols=usecols)
+        assert list(result.columns) == list(expected.columns)
+        for col in expected.columns:
+            assert list(result[col]) == list(expected[col])
+    assert list(as_str['origin']) == ['01', '02', '10']
+
+    # and served from the cache the second time
+    again = read_cached_skims(path, cache_dir, dtype=str_dtype)
+    assert len(os.listdir(cache_dir)) == 2
+    pd.testing.assert_frame_equal(again, as_str)
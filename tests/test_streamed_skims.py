@@ -0,0 +1,39 @@
+import os
+
+from pilates.activitysim import preprocessor as asim_pre
+from conftest import assert_skims_equal, beam_skims, sample_skims_keys
+
+YEAR = 2010
+
+
+def build_skims(settings, output_dir, **kwargs):
+    os.makedirs(output_dir, exist_ok=True)
+    settings = dict(settings, asim_local_input_folder=output_dir, **kwargs)
+    asim_pre.create_skims_from_beam(settings, YEAR, output_dir=output_dir)
+
+
+def test_streamed_skims_match_in_memory_skims(skims_settings, tmp_path,
+                                              monkeypatch):
+    settings = skims_settings
+    # BEAM skims are not sorted by origin
+    skims = beam_skims(settings, sample_skims_keys(settings, 0.6)).sample(
+        frac=1, random_state=0)
+    skims.to_csv(
+        os.path.join(settings['beam_local_output_folder'], 'skims.csv.gz'),
+        index=False)
+
+    in_memory_dir = str(tmp_path / 'in_memory')
+    build_skims(settings, in_memory_dir)
+
+    def patch_omx_matrix(*args):
+        raise AssertionError("streamed skims rewrote a staged matrix")
+
+    monkeypatch.setattr(asim_pre, '_patch_omx_matrix', patch_omx_matrix)
+    streamed_dir = str(tmp_path / 'streamed')
+    # 7 rows per block, every chunk spans all blocks
+    build_skims(settings, streamed_dir, skims_chunk_size=7 * 40 + 3)
+
+    assert not os.path.exists(os.path.join(streamed_dir, 'skims_staging.h5'))
+    assert_skims_equal(
+        os.path.join(in_memory_dir, 'skims.omx'),
+        os.path.join(streamed_dir, 'skims.omx'))
@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+import requests
+
+from pilates.utils import geog
+
+STATE = '48'
+COUNTIES = ['021', '453']
+BLOCKS_PER_COUNTY = 25
+RESULT_SIZE = 10
+
+
+def canned_features(county):
+    return [
+        {'attributes': {'GEOID': '{0}{1}{2:010d}'.format(STATE, county, i)},
+         'geometry': {'rings': [[[0, 0], [1, 0], [1, 1], [0, 0]]]}}
+        for i in range(BLOCKS_PER_COUNTY)]
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """ Serves canned TIGERweb MapServer query responses. The first
+    `failures` requests fail with a 503. """
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.num_requests += 1
+            fail = server.num_requests <= server.failures
+        if fail:
+            self.send_error(503)
+            return
+        query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        features = canned_features(query['where'].split('COUNTY=')[1])
+        if query.get('returnCountOnly') == 'true':
+            response = {'count': len(features)}
+        else:
+            offset = int(query['resultOffset'])
+            size = int(query['resultRecordCount'])
+            response = {
+                'features': features[offset:offset + size],
+                'exceededTransferLimit': offset + size < len(features)}
+        body = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.lock = threading.Lock()
+    server.num_requests = 0
+    server.failures = 0
+    server.base_url = 'http://127.0.0.1:{0}/'.format(server.server_address[1])
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(geog.time, 'sleep', sleeps.append)
+    return sleeps
+
+
+def download(server, **kwargs):
+    kwargs = dict(
+        zone_type='block', result_size=RESULT_SIZE, base_url=server.base_url,
+        num_threads=1, **kwargs)
+    return geog.download_block_features(STATE, COUNTIES, **kwargs)
+
+
+def test_download_pages_all_features(server, sleeps):
+    result = download(server)
+    assert result == {county: canned_features(county) for county in COUNTIES}
+    # a count and three pages per county
+    assert server.num_requests == len(COUNTIES) * 4
+    assert sleeps == []
+
+
+def test_failed_requests_are_retried_with_backoff(server, sleeps):
+    server.failures = 3
+    result = download(server, max_retries=4, backoff=0.5)
+    assert result == {county: canned_features(county) for county in COUNTIES}
+    assert sleeps == [0.5, 1.0, 2.0]
+    assert server.num_requests == len(COUNTIES) * 4 + 3
+
+
+def test_exhausted_retries_raise(server, sleeps):
+    server.failures = 100
+    with pytest.raises(requests.HTTPError):
+        download(server, max_retries=3, backoff=0.5)
+    # the feature count of every county is requested max_retries times
+    assert server.num_requests == 3 * len(COUNTIES)
+    assert sleeps == [0.5, 1.0] * len(COUNTIES)
+
+
+def test_cached_responses_are_not_requested(server, sleeps, tmp_path):
+    cache_dir = str(tmp_path / 'tigerweb_cache')
+    expected = download(server, cache_dir=cache_dir)
+    num_requests = server.num_requests
+    assert len(os.listdir(cache_dir)) == num_requests
+
+    server.failures = num_requests + 100
+    result = download(server, cache_dir=cache_dir, max_retries=1)
+    assert result == expected
+    assert server.num_requests == num_requests
+
+
+def test_cache_folder_is_relative_to_data_folder(tmp_path):
+    settings = {
+        'data_folder': str(tmp_path), 'tigerweb_cache_folder': 'tmp/cache'}
+    assert geog.tigerweb_settings(settings)['cache_dir'] == os.path.join(
+        str(tmp_path), 'tmp/cache')
+    settings['tigerweb_cache_folder'] = None
+    assert geog.tigerweb_settings(settings)['cache_dir'] is None
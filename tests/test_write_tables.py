@@ -0,0 +1,55 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from pilates.utils import io
+
+
+def make_tables(num_tables=4):
+    rng = np.random.default_rng(0)
+    return {
+        'table_{0}'.format(i): pd.DataFrame(
+            rng.random((100, 3)), columns=['a', 'b', 'c'])
+        for i in range(num_tables)}
+
+
+def test_tables_round_trip_in_every_format(tmp_path):
+    tables = make_tables()
+    formats = dict(zip(tables.keys(), ['csv', 'arrow_csv', 'parquet', 'hdf5']))
+    paths = io.write_tables(tables, str(tmp_path), formats=formats)
+
+    assert list(paths.keys()) == list(tables.keys())
+    for table_name, path in paths.items():
+        assert path.endswith(io.TABLE_WRITER_EXTENSIONS[formats[table_name]])
+    pd.testing.assert_frame_equal(
+        pd.read_parquet(paths['table_2']), tables['table_2'])
+    pd.testing.assert_frame_equal(
+        pd.read_hdf(paths['table_3'], 'table_3'), tables['table_3'])
+
+
+def test_hdf5_tables_are_not_written_concurrently(tmp_path, monkeypatch):
+    running = []
+    overlaps = []
+    lock = threading.Lock()
+    to_hdf = pd.DataFrame.to_hdf
+
+    def recording_to_hdf(self, *args, **kwargs):
+        with lock:
+            running.append(1)
+            overlaps.append(len(running) > 1)
+        time.sleep(0.05)
+        try:
+            return to_hdf(self, *args, **kwargs)
+        finally:
+            with lock:
+                running.pop()
+
+    monkeypatch.setattr(pd.DataFrame, 'to_hdf', recording_to_hdf)
+    tables = make_tables()
+    io.write_tables(
+        tables, str(tmp_path), formats={name: 'hdf5' for name in tables})
+
+    assert len(overlaps) == len(tables)
+    assert not any(overlaps)